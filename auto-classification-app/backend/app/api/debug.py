@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Depends, HTTPException, Header
+from fastapi.responses import FileResponse
+from pydantic import BaseModel
+from typing import Optional
+from ..core.request_profiler import request_profiler
+
+def require_profiling_token(x_profile_token: Optional[str] = Header(None)):
+    # Profiling (and its reports) only exists when PROFILING_TOKEN is configured
+    if not request_profiler.enabled():
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    if not request_profiler.token_valid(x_profile_token):
+        raise HTTPException(status_code=403, detail="Invalid profiling token")
+
+router = APIRouter(dependencies=[Depends(require_profiling_token)])
+
+class ProfilingToggle(BaseModel):
+    # Profile the next N requests (0 disarms)
+    requests: int = 1
+    # Only count requests whose path starts with this, e.g. "/api/ai/query"
+    path_prefix: Optional[str] = None
+
+@router.get("/profiling")
+def profiling_status():
+    return request_profiler.status()
+
+@router.post("/profiling")
+def toggle_profiling(toggle: ProfilingToggle):
+    request_profiler.arm(toggle.requests, toggle.path_prefix)
+    return request_profiler.status()
+
+@router.get("/profiles")
+def list_profiles():
+    return request_profiler.list()
+
+@router.get("/profiles/{request_id}")
+def get_profile(request_id: str):
+    path, fmt = request_profiler.report_path(request_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return FileResponse(path, media_type="text/html" if fmt == "html" else "text/plain")
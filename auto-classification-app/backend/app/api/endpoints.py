@@ -1,7 +1,7 @@
 from fastapi import APIRouter, HTTPException, UploadFile, File, BackgroundTasks, Form
 from typing import List
-import shutil
 import os
+import tempfile
 import pandas as pd
 import asyncio
 
@@ -11,6 +11,12 @@ from ..integration.minio_client import MinioClient
 from ..integration.vector_client import VectorClient
 from ..integration.aws_client import AWSClient
 from ..core.ws_manager import manager
+from ..core.query_cache import query_cache
+from ..core.tag_index import tag_index
+from ..core.job_manager import job_manager
+from ..core.uploads import save_upload
+from ..core.pipeline import Pipeline
+from ..core.metrics import track
 from ..schemas import data as schemas
 
 router = APIRouter()
@@ -19,32 +25,36 @@ os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 from fastapi.concurrency import run_in_threadpool
 
-async def run_background_ingestion(client_id: str, file_name: str, file_path: str, df: pd.DataFrame, tags: list = None):
-    """Async heavy lifting for storage and vector indexing"""
-    
-    # B. Raw Feed (MinIO Object Store)
+async def _archive_to_minio(client_id: str, file_name: str, file_path: str, df: pd.DataFrame):
+    """Raw Feed (MinIO Object Store)"""
     await manager.send_update(client_id, "Archiving raw data in MinIO AI Store (as Parquet)...")
+    # CONVERT TO PARQUET:
+    # We enforce Parquet format in the Data Lake for performance (Columnar storage)
+    parquet_path = file_path + ".parquet"
     try:
-        # CONVERT TO PARQUET:
-        # We enforce Parquet format in the Data Lake for performance (Columnar storage)
-        parquet_path = file_path + ".parquet"
         # Use run_in_threadpool for blocking IO
-        await run_in_threadpool(df.to_parquet, parquet_path, index=False)
+        with track("parquet_convert", rows=len(df)) as timer:
+            await run_in_threadpool(df.to_parquet, parquet_path, index=False)
+            timer.bytes = os.path.getsize(parquet_path)
         
         minio_client = MinioClient()
         # Store as [filename].parquet in MinIO
         object_name = os.path.splitext(file_name)[0] + ".parquet"
         
-        await run_in_threadpool(minio_client.upload_file, parquet_path, object_name)
-        
+        with track("minio_upload", nbytes=timer.bytes):
+            await run_in_threadpool(minio_client.upload_file, parquet_path, object_name)
+        # Cached PromptIQ answers include exact counts over the lake tables
+        query_cache.invalidate()
+
+    except Exception as e:
+        print(f"ERROR: MinIO Upload failed: {e}")
+    finally:
         # Cleanup temp file
         if os.path.exists(parquet_path):
             os.remove(parquet_path)
-            
-    except Exception as e:
-        print(f"ERROR: MinIO Upload failed: {e}")
 
-    # C. Vector Feed (ChromaDB / VectorDB)
+async def _index_vectors(client_id: str, file_name: str, df: pd.DataFrame, tags: list = None):
+    """Vector Feed (ChromaDB / VectorDB)"""
     await manager.send_update(client_id, "Building semantic index in ChromaDB...")
     try:
         vector_client = VectorClient()
@@ -52,14 +62,18 @@ async def run_background_ingestion(client_id: str, file_name: str, file_path: st
         await run_in_threadpool(vector_client.index_dataset, file_name, df, tags)
     except Exception as e:
         print(f"ERROR: VectorDB Indexing failed: {e}")
-    
-    await manager.send_update(client_id, "Success! Dataset fully ingested.", status="complete")
+
+async def _finish_ingestion(client_id: str, pipeline: Pipeline):
+    timings = await pipeline.wait()
+    await manager.send_update(client_id, "Success! Dataset fully ingested.", status="complete", data={"timings": timings})
 
 def _classify_columns_sync(columns):
-    """Helper to run classification loop in threadpool"""
+    """Helper to run classification loop in threadpool (columns: profiler.ColumnProfile)"""
     processed = []
     for col_data in columns:
-        classification = classifier.classify(col_data["name"], col_data["series"])
+        classification = classifier.classify(col_data.name, col_data.values)
+        # The profile outlives this stage (archive/index run later); keep only samples + stats
+        col_data.release()
         
         col_tags = []
         if classification:
@@ -72,57 +86,95 @@ def _classify_columns_sync(columns):
                 col_tags.append({"tag_fqn": m_tag, "label_type": "Automated"})
 
         processed.append({
-            "name": col_data["name"],
-            "datatype": col_data["datatype"],
+            "name": col_data.name,
+            "datatype": col_data.datatype,
             "tags": col_tags
         })
     return processed
 
-async def process_dataset_ingestion(client_id: str, file_path: str, original_filename: str, background_tasks: BackgroundTasks):
+async def process_dataset_ingestion(client_id: str, file_path: str, original_filename: str, background_tasks: BackgroundTasks = None):
     """
-    Shared logic for processing a local file (uploaded or downloaded):
-    - Profile
-    - Classify
-    - Ingest to OM (Sync)
-    - Ingest to MinIO/VectorDB (Background)
+    Shared logic for processing a local file (uploaded or downloaded), as a DAG of stages:
+
+        profile -> classify -> om_sync   (Governance; its result is returned to the UI)
+           |           \-----> index     (VectorDB; needs the classification tags, not OM)
+           \-----------------> archive   (MinIO; needs only the data)
+
+    The response is sent once OM sync is done; archive/index keep running as a background
+    task (or are awaited inline when no background_tasks are given, e.g. inside a job).
     """
-    # 2. Profile & Classify
-    await manager.send_update(client_id, "Profiling dataset structure...")
-    try:
+    async def profile_stage(_):
+        await manager.send_update(client_id, "Profiling dataset structure...")
         # Offload profiling
-        profile, df = await run_in_threadpool(profiler.profile_dataset, file_path)
+        with track("profile", nbytes=os.path.getsize(file_path)) as timer:
+            result = await run_in_threadpool(profiler.profile_dataset, file_path)
+            timer.rows = result[0]["row_count"]
+        return result
+
+    async def classify_stage(results):
+        await manager.send_update(client_id, "Analyzing columns with AI Classifier...")
+        profile, _ = results["profile"]
+        # Offload classification loop
+        with track("classify", rows=profile["row_count"]):
+            return await run_in_threadpool(_classify_columns_sync, profile["columns"])
+
+    async def om_sync_stage(results):
+        # SINGLE SHOT Integration
+        await manager.send_update(client_id, "Syncing metadata to OpenMetadata Governance...")
+        try:
+            # Offload OM ingestion
+            with track("om_sync"):
+                om_table = await run_in_threadpool(OMClient().ingest_dataset_with_all_metadata, original_filename, results["classify"])
+            # Cached PromptIQ answers embed OM classifications
+            query_cache.invalidate()
+            return om_table
+        except Exception as e:
+            await manager.send_update(client_id, "Governance sync failed, but continuing...", status="warning")
+            return None
+
+    async def archive_stage(results):
+        _, df = results["profile"]
+        await _archive_to_minio(client_id, original_filename, file_path, df)
+
+    async def index_stage(results):
+        _, df = results["profile"]
+        # Extract Tags for AI Context
+        dataset_tags = set()
+        for col in results["classify"] or []:
+            for t in col.get("tags", []):
+                dataset_tags.add(t["tag_fqn"])
+        await _index_vectors(client_id, original_filename, df, list(dataset_tags))
+
+    pipeline = Pipeline(client_id)
+    pipeline.add("profile", profile_stage)
+    pipeline.add("classify", classify_stage, ["profile"])
+    pipeline.add("om_sync", om_sync_stage, ["classify"])
+    pipeline.add("archive", archive_stage, ["profile"])
+    pipeline.add("index", index_stage, ["classify"])
+    pipeline.start()
+
+    try:
+        await pipeline.result("profile")
     except Exception as e:
+        # Dependent stages fail with the same error; collect them before reporting
+        await asyncio.gather(*pipeline.tasks.values(), return_exceptions=True)
         await manager.send_update(client_id, f"Error: {str(e)}", status="error")
         raise HTTPException(status_code=400, detail=str(e))
-    
-    # 3. Batch Build Metadata
-    await manager.send_update(client_id, "Analyzing columns with AI Classifier...")
-    
-    # Offload classification loop
-    processed_columns = await run_in_threadpool(_classify_columns_sync, profile["columns"])
 
-    # 4. SINGLE SHOT Integration
-    await manager.send_update(client_id, "Syncing metadata to OpenMetadata Governance...")
-    om_client = OMClient()
     try:
-        # Offload OM ingestion
-        om_table = await run_in_threadpool(om_client.ingest_dataset_with_all_metadata, original_filename, processed_columns)
-    except Exception as e:
-        await manager.send_update(client_id, "Governance sync failed, but continuing...", status="warning")
-        om_table = None
-
-    # 5. Background Heavy Storage Tasks
-    # Extract Tags for AI Context
-    dataset_tags = set()
-    if processed_columns:
-        for col in processed_columns:
-            for t in col.get("tags", []):
-                dataset_tags.add(t["tag_fqn"])
-    
-    background_tasks.add_task(run_background_ingestion, client_id, original_filename, file_path, df, list(dataset_tags))
+        om_table = await pipeline.result("om_sync")
+    except Exception:
+        await asyncio.gather(*pipeline.tasks.values(), return_exceptions=True)
+        raise
+
+    if background_tasks is not None:
+        background_tasks.add_task(_finish_ingestion, client_id, pipeline)
+    else:
+        await _finish_ingestion(client_id, pipeline)
             
     # Return translated OM table for UI
     if om_table:
+        om_client = OMClient()
         # Pydantic Compatibility (some versions wrap strings in __root__, others don't)
         fqn = getattr(om_table.fullyQualifiedName, '__root__', om_table.fullyQualifiedName)
         return om_client.get_dataset(fqn)
@@ -139,9 +191,14 @@ async def upload_dataset(
     await manager.send_update(client_id, "Initializing Secure Ingestion...")
     
     file_path = os.path.join(UPLOAD_DIR, file.filename)
-    # File IO is blocking but fast for small files, sticking to sync or wrapping if huge
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+
+    async def announce_columns(columns):
+        names = ", ".join(c["name"] for c in columns[:10])
+        await manager.send_update(client_id, f"Detected {len(columns)} columns: {names}...", data={"columns": columns})
+
+    # Chunked, off the event loop; hashed and format-sniffed as it streams
+    upload_info = await save_upload(file, file_path, on_preview=announce_columns)
+    await manager.send_update(client_id, f"Received {upload_info['size'] / (1024 * 1024):.1f} MB ({upload_info['format']}).", data=upload_info)
         
     return await process_dataset_ingestion(client_id, file_path, file.filename, background_tasks)
 
@@ -177,6 +234,7 @@ async def trigger_sync():
     try:
         # Running synchronously for now to keep it simple, or use background tasks if it grows
         result = await run_in_threadpool(sync_om_to_vectordb)
+        query_cache.invalidate()
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -218,6 +276,11 @@ def apply_tag(dataset_id: str, column_name: str, tag: TagRequest):
     om_client = OMClient()
     # Apply tag using OM Client
     om_client.apply_column_tags(dataset_id, column_name, [{"tag_fqn": tag.tag_fqn, "label_type": tag.label_type}])
+    # Keep PromptIQ's local tag index in step (ids carry no table name, so resolve those once)
+    table_ref = dataset_id if "." in dataset_id else (om_client.get_dataset(dataset_id) or {}).get("name")
+    if table_ref:
+        tag_index.add_for_table(table_ref, [tag.tag_fqn])
+    query_cache.invalidate()
     return {"status": "success"}
 
 # --------------------------
@@ -279,9 +342,11 @@ async def ingest_from_s3(request: S3IngestRequest, background_tasks: BackgroundT
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.post("/sources/s3/ingest-all")
-async def ingest_all_from_s3(request: S3BatchIngestRequest, background_tasks: BackgroundTasks):
+async def ingest_all_from_s3(request: S3BatchIngestRequest):
     """
-    Iterates through ALL objects in the bucket and triggers ingestion for each.
+    Queues a durable job with one task per object in the bucket and returns its id.
+    Poll GET /jobs/{job_id} or subscribe to /ws/ingestion/{job_id}; the client's own
+    channel still receives per-file and completion updates.
     """
     client_id = request.client_id
     bucket = request.bucket
@@ -290,50 +355,49 @@ async def ingest_all_from_s3(request: S3BatchIngestRequest, background_tasks: Ba
     try:
         aws = AWSClient()
         objects = await run_in_threadpool(aws.list_objects, bucket)
-        
-        if not objects:
-             await manager.send_update(client_id, "Bucket is empty.", status="warning")
-             return {"status": "empty"}
-             
-        await manager.send_update(client_id, f"Found {len(objects)} files. Starting batch processing...")
-        
-        # We will process sequentially for safety in this demo, or loop and kickoff tasks.
-        # Ideally, we kickoff background tasks for each.
-        # But process_dataset_ingestion runs mostly deep sync logic.
-        # Let's do a loop of downloads and triggering.
-        
-        count = 0
-        count = 0
-        for obj_item in objects:
-            obj_key = obj_item["Key"]
-            if obj_key.endswith('/'): continue # Skip folders
-            
-            file_name = os.path.basename(obj_key)
-            local_path = os.path.join(UPLOAD_DIR, f"s3_batch_{file_name}")
-            
-            await manager.send_update(client_id, f"Processing {count+1}/{len(objects)}: {file_name}...")
-            
-            try:
-                await run_in_threadpool(aws.download_file, bucket, obj_key, local_path)
-                
-                # We need to AWAIT the processing so we don't overwhelm the system/OOM
-                # But we want it to be somewhat fast.
-                # Since process_dataset_ingestion pushes heavy stuff to background_tasks,
-                # the "await" part is just Profiling + Classification + OM Sync.
-                # That takes ~2-5s per file. Acceptable for batch.
-                res = await process_dataset_ingestion(client_id, local_path, file_name, background_tasks)
-                count += 1
-            except Exception as e:
-                print(f"Failed to process {file_name}: {e}")
-                await manager.send_update(client_id, f"Skipped {file_name} (Error)", status="warning")
-        
-        await manager.send_update(client_id, f"Batch Complete! Processed {count} files.", status="complete")
-        return {"status": "success", "processed": count}
-
     except Exception as e:
         await manager.send_update(client_id, f"Batch Error: {str(e)}", status="error")
         raise HTTPException(status_code=500, detail=str(e))
 
+    keys = [obj_item["Key"] for obj_item in objects or [] if not obj_item["Key"].endswith('/')] # Skip folders
+    if not keys:
+         await manager.send_update(client_id, "Bucket is empty.", status="warning")
+         return {"status": "empty"}
+
+    job_id = job_manager.create_job("s3_ingest_all", client_id, keys, {"bucket": bucket})
+    await manager.send_update(client_id, f"Found {len(keys)} files. Starting batch processing...", data={"job_id": job_id})
+    job_manager.start(job_id)
+    return {"status": "accepted", "job_id": job_id, "files": len(keys)}
+
+async def _ingest_s3_object(job: dict, obj_key: str):
+    """Job task: download one bucket object and run the full pipeline on it (detail goes to the job channel)."""
+    file_name = os.path.basename(obj_key)
+    # Unique per task: job tasks run concurrently and keys in different prefixes share basenames.
+    # The name keeps the original file name, which breaks ties when sniffing text formats.
+    fd, local_path = tempfile.mkstemp(prefix="s3_batch_", suffix=f"_{file_name}", dir=UPLOAD_DIR)
+    os.close(fd)
+    try:
+        aws = AWSClient()
+        await run_in_threadpool(aws.download_file, job["params"]["bucket"], obj_key, local_path)
+        await process_dataset_ingestion(job["id"], local_path, file_name)
+    finally:
+        # archive/index are awaited inline for jobs, so the download (and its .parquet) is no longer needed
+        if os.path.exists(local_path):
+            os.remove(local_path)
+
+job_manager.register("s3_ingest_all", _ingest_s3_object)
+
+@router.get("/jobs")
+def list_jobs(limit: int = 50):
+    return job_manager.list_jobs(limit)
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str):
+    job = job_manager.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
 class OMSyncRequest(BaseModel):
     dataset_fqn: str
     client_id: str
@@ -1,19 +1,40 @@
 from fastapi import APIRouter, HTTPException
+import json
+import re
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
-from ..integration.vector_client import VectorClient
-from ..integration.om_client import OMClient
+from typing import List, Optional
+from ..integration.vector_client import VectorClient, build_where, build_where_document
+from ..core.query_cache import query_cache, normalize_prompt
+from ..core.session_store import get_session_store
+from ..core.tag_index import tag_index
+from ..core.lake_query import LakeQueryEngine, is_aggregate_prompt, format_aggregate_answer
 
 router = APIRouter()
 
 # ... (imports remain)
 
-# Global In-Memory Context Store for Conversation History
+# Conversation History store (bounded, expiring; shareable across workers - see session_store)
 # Format: {client_id: {"last_entity": "Name"}}
-CONTEXT_STORE = {}
+CONTEXT_STORE = get_session_store()
+
+# Basic stop words to ignore (including common schema keys to avoid wildcard matching)
+STOP_WORDS = {
+    "who", "is", "are", "the", "a", "an", "tell", "me", "about", "find", "search", "details", "for", 
+    "please", "dataset", "get", "of", "in", "what", "where", "when", "give", "show", "list",
+    "email", "address", "name", "full", "phone", "cell", "number", "id", "user", "social", 
+    "security", "count", "order", "notes", "row", "record",
+    # Add pronouns to stop words so we don't filter by "his" if we have "Charlie"
+    "he", "him", "his", "she", "her", "hers", "it"
+}
 
 class QueryRequest(BaseModel):
     prompt: str
     client_id: str = "default"
+    # Optional scoping, pushed down into the vector store
+    source: Optional[str] = None
+    tags: Optional[List[str]] = None
 
 @router.post("/query")
 async def ai_query(request: QueryRequest):
@@ -21,11 +42,56 @@ async def ai_query(request: QueryRequest):
     Promptiq AI engine: 
     Consumes from VectorDB, Metadata store, and raw store to answer.
     """
-    vector_client = VectorClient()
-    
-    # --------------------------
-    # 0. Context & Pronoun Logic
-    # --------------------------
+    enhanced_prompt, forced_keywords, last_entity = _resolve_context(request)
+
+    # Identical prompts in the same conversational context share one cached / in-flight answer.
+    # The index version in the key drops answers computed against an older index.
+    resolved_entity = last_entity if forced_keywords else None
+    cache_key = (
+        normalize_prompt(request.prompt),
+        resolved_entity,
+        request.source,
+        tuple(sorted(request.tags or [])),
+        VectorClient.index_version
+    )
+    response, found_primary_entity = await query_cache.get_or_compute(
+        cache_key,
+        lambda: run_in_threadpool(_answer_query, enhanced_prompt, forced_keywords, last_entity, request.source, request.tags)
+    )
+
+    # Context update is per client, so it is applied even when the answer came from cache
+    _update_context(request.client_id, found_primary_entity)
+
+    return response
+
+@router.post("/query/stream")
+def ai_query_stream(request: QueryRequest):
+    """
+    Same answer as /query, streamed as Server-Sent Events:
+    `meta` (sources, classifications), then `chunk` events as each record is formatted, then `done`.
+    """
+    enhanced_prompt, forced_keywords, last_entity = _resolve_context(request)
+
+    def events():
+        chunks = _answer_stream(enhanced_prompt, forced_keywords, last_entity, request.source, request.tags)
+        head = next(chunks)
+        _update_context(request.client_id, head.pop("entity"))
+        yield _sse("meta", head)
+        for chunk in chunks:
+            yield _sse("chunk", {"text": chunk})
+        yield _sse("done", {})
+
+    # Sync generator: Starlette iterates it in the threadpool, so retrieval doesn't block the loop
+    return StreamingResponse(events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _resolve_context(request: QueryRequest):
+    """
+    Context & pronoun logic: rewrites "his email" into "his email regarding Alice".
+    Returns (enhanced_prompt, forced_keywords, last_entity).
+    """
     raw_prompt = request.prompt
     enhanced_prompt = raw_prompt
     
@@ -46,62 +112,96 @@ async def ai_query(request: QueryRequest):
         forced_keywords.append(last_entity.lower())
         print(f"DEBUG: Context applied. Rewrote '{raw_prompt}' to '{enhanced_prompt}'")
 
-    # 1. Semantic Search Context (Increased context window)
-    semantic_results = vector_client.search(enhanced_prompt, n_results=10)
+    return enhanced_prompt, forced_keywords, last_entity
+
+def _update_context(client_id: str, found_primary_entity: str):
+    if found_primary_entity:
+        CONTEXT_STORE.set(client_id, {"last_entity": found_primary_entity})
+        print(f"DEBUG: Updated context for {client_id} -> {found_primary_entity}")
+
+@router.get("/cache/stats")
+def cache_stats():
+    return query_cache.stats()
+
+@router.get("/sessions/stats")
+def session_stats():
+    return CONTEXT_STORE.stats()
+
+def _answer_query(enhanced_prompt: str, forced_keywords: list, last_entity: str, scope_source: str = None, tags_scope: list = None):
+    """
+    Retrieval + answer generation for one (context-resolved) prompt.
+    Returns (response, primary entity found for the next conversational turn).
+    """
+    chunks = _answer_stream(enhanced_prompt, forced_keywords, last_entity, scope_source, tags_scope)
+    head = next(chunks)
+    response = {"answer": "".join(chunks), "sources": head["sources"]}
+    if "classifications" in head:
+        response["classifications"] = head["classifications"]
+    return response, head["entity"]
+
+def _answer_stream(enhanced_prompt: str, forced_keywords: list, last_entity: str, scope_source: str = None, tags_scope: list = None):
+    """
+    Generator behind both /query and /query/stream. Yields a head dict first
+    ({"sources", "classifications", "entity"}), then the answer text piece by piece:
+    the header line before any record is formatted, then one chunk per record.
+    """
+    vector_client = VectorClient()
+    found_primary_entity = None
+
+    prompt_lower = enhanced_prompt.lower()
+
+    # 0. Aggregates ("how many ...") are answered exactly from the Parquet lake, not from top-k hits.
+    # Falls through to retrieval when the prompt names no lake table or the lake is unreachable.
+    if is_aggregate_prompt(enhanced_prompt) and not forced_keywords:
+        try:
+            outcome = LakeQueryEngine().answer(enhanced_prompt)
+        except Exception as e:
+            print(f"[LakeQuery] Data lake unavailable: {e}")
+            outcome = None
+        if outcome is not None:
+            yield {"sources": [{"source": outcome["table"], "engine": "data-lake"}], "classifications": [], "entity": None}
+            yield format_aggregate_answer(outcome)
+            return
+    # Build robust keyword list
+    keywords = [w for w in prompt_lower.split() if w not in STOP_WORDS and len(w) > 1]
+
+    # 1. Hybrid Search Context (BM25 keywords + vectors, fused)
+    # Scope and the context entity are pushed into both indexes; the entity MUST appear.
+    # Fall back to unconstrained retrieval if that is too narrow.
+    where = build_where(source=scope_source, tags=tags_scope)
+    where_document = build_where_document(all_of=[last_entity]) if forced_keywords else None
+    lexical_query = " ".join(keywords + forced_keywords)
+
+    semantic_results = vector_client.hybrid_search(enhanced_prompt, n_results=10, where=where, where_document=where_document,
+                                                   lexical_query=lexical_query)
+    if where_document and not semantic_results.get("documents", [[]])[0]:
+        semantic_results = vector_client.hybrid_search(enhanced_prompt, n_results=10, where=where, lexical_query=lexical_query)
     
     context_docs = semantic_results.get("documents", [[]])[0]
     metadata = semantic_results.get("metadatas", [[]])[0]
     
     if not context_docs:
-        return {
-            "answer": "I scanned the knowledge base but couldn't find specific data matching your query.",
-            "sources": []
-        }
+        yield {"sources": [], "entity": found_primary_entity}
+        yield "I scanned the knowledge base but couldn't find specific data matching your query."
+        return
     
-    # 2. Augment with Metadata
+    # 2. Augment with Metadata (local source -> tags index, no OM round trip)
     source_dataset = metadata[0]["source"] if metadata else None
-    tags = []
-    if source_dataset:
-        try:
-            om = OMClient()
-            ds = om.get_dataset(f"local_files.uploads.default.{source_dataset.replace('.', '_').replace('-', '_')}")
-            if ds:
-                tag_set = set()
-                for col in ds["columns"]:
-                    for t in col["tags"]:
-                        tag_set.add(t["tag_fqn"])
-                tags = list(tag_set)
-        except:
-            pass # Fail gracefully on metadata fetch
+    tags = _dataset_tags(source_dataset, metadata[0]) if source_dataset else []
 
     # 3. "Fine-tuned" Reasoning & Filtering
-    prompt_lower = enhanced_prompt.lower()
-    
-    # Basic stop words to ignore (including common schema keys to avoid wildcard matching)
-    stop_words = {
-        "who", "is", "are", "the", "a", "an", "tell", "me", "about", "find", "search", "details", "for", 
-        "please", "dataset", "get", "of", "in", "what", "where", "when", "give", "show", "list",
-        "email", "address", "name", "full", "phone", "cell", "number", "id", "user", "social", 
-        "security", "count", "order", "notes", "row", "record",
-        # Add pronouns to stop words so we don't filter by "his" if we have "Charlie"
-        "he", "him", "his", "she", "her", "hers", "it"
-    }
-    
-    # Build robust keyword list
-    keywords = [w for w in prompt_lower.split() if w not in stop_words and len(w) > 1]
-    
+    # Rows carry their fields as structured metadata, so nothing below re-parses document strings
+    context_rows = [(doc, meta, _row_fields(doc, meta)) for doc, meta in zip(context_docs, metadata)]
+
     # 4. Filter & Deduplicate Documents
-    filtered_docs = []
+    filtered_rows = []
     seen_content = set()
     
-    # Track which keywords are actually found in the raw context
-    found_keywords_in_context = set()
-    
     # Pre-scan context to see what we have
     all_context_text = " ".join(context_docs).lower()
     missing_keywords = [k for k in keywords if k not in all_context_text]
 
-    for i, doc in enumerate(context_docs):
+    for doc, meta, fields in context_rows:
         doc_lower = doc.lower()
         is_relevant = True
         
@@ -125,35 +225,23 @@ async def ai_query(request: QueryRequest):
                     if not all(k in doc_lower for k in context_relevant_keywords):
                         is_relevant = False
         
-        # Deduplication check
-        parts = doc.split("|", 1)
-        content_only = parts[1] if len(parts) > 1 else parts[0]
-        content_signature = " ".join(content_only.split())
+        # Deduplication check (same field values from another source/tag set is still a duplicate)
+        content_signature = tuple(fields.items())
         
         if is_relevant and content_signature not in seen_content:
             seen_content.add(content_signature)
-            filtered_docs.append(doc)
+            filtered_rows.append((doc, meta, fields))
 
-    count = len(filtered_docs)
+    count = len(filtered_rows)
+    sources = [_source_info(metadata[0])] if metadata else []
     
-    # ... (Context extraction remains same) ...
     # --------------------------
     # 5. Extract Context for Next Turn
     # --------------------------
-    found_primary_entity = None
-    if filtered_docs:
-        top_doc = filtered_docs[0]
-        parts = top_doc.split(" | ")
-        for point in parts:
-             if ":" in point:
-                k, v = point.split(":", 1)
-                if "name" in k.lower() and len(v.strip()) > 2:
-                    found_primary_entity = v.strip()
-                    break
-    
-    if found_primary_entity:
-        CONTEXT_STORE[request.client_id] = {"last_entity": found_primary_entity}
-        print(f"DEBUG: Updated context for {request.client_id} -> {found_primary_entity}")
+    if filtered_rows:
+        found_primary_entity = _find_field(filtered_rows[0][2], "name", min_length=3)
+
+    yield {"sources": sources, "classifications": tags, "entity": found_primary_entity}
 
     # --------------------------
     # 6. Intent & Response Generation
@@ -161,7 +249,6 @@ async def ai_query(request: QueryRequest):
     
     # CHECK INTENT: Specific Field Extraction
     # Use token set for strict matching (avoid "phone" matching "headphones")
-    import re
     tokens = set(re.findall(r'\w+', prompt_lower))
     
     target_field = None
@@ -172,34 +259,16 @@ async def ai_query(request: QueryRequest):
     elif "price" in tokens or "cost" in tokens: target_field = "price"
 
     if target_field and count > 0:
-        answer_text = ""
         if count == 1:
-             doc = filtered_docs[0]
-             parts = doc.split(" | ")
-             found_val = "N/A"
-             for point in parts[1:]:
-                 if ":" in point:
-                     k, v = point.split(":", 1)
-                     if target_field in k.lower(): found_val = v.strip()
-             answer_text = f"The {target_field} is **{found_val}**."
+             found_val = _find_field(filtered_rows[0][2], target_field, last=True) or "N/A"
+             yield f"The {target_field} is **{found_val}**."
         else:
-             answer_text = f"Found {count} entries with {target_field}:\n\n"
-             for doc in filtered_docs:
-                parts = doc.split(" | ")
-                found_val = "N/A"
-                name_val = "Unknown"
-                for point in parts[1:]:
-                    if ":" in point:
-                        k, v = point.split(":", 1)
-                        if target_field in k.lower(): found_val = v.strip()
-                        if "name" in k.lower(): name_val = v.strip()
-                answer_text += f"- **{found_val}** ({name_val})\n"
-        
-        return {
-            "answer": answer_text,
-            "sources": [metadata[0]] if metadata else [],
-            "classifications": tags
-        }
+             yield f"Found {count} entries with {target_field}:\n\n"
+             for _, _, fields in filtered_rows:
+                found_val = _find_field(fields, target_field, last=True) or "N/A"
+                name_val = _find_field(fields, "name", last=True) or "Unknown"
+                yield f"- **{found_val}** ({name_val})\n"
+        return
     
     # Intent: Boolean / Fact Check
     is_boolean_query = any(prompt_lower.startswith(prefix) for prefix in ["is ", "are ", "does ", "do ", "can "])
@@ -211,19 +280,11 @@ async def ai_query(request: QueryRequest):
          else:
              answer = f"Based on the knowledge base, I found {count} unique records matching your criteria.\n\n"
 
-    # Intent: Specific Field Lookup
-    elif target_field and count > 0:
-        answer = f"Found {count} match(es). Here is the requested info:\n\n"
-        # ... (Loop remains same, just ensuring variables are in scope usually)
-        # Note: We need to include the loop here effectively or let it fall through. 
-        # Refactoring slightly to reuse formatting logic.
-        pass # Allow fallthrough to formatter below for simplicity if complex
-
     # Intent: Default Narrative
     else:
         if count == 0:
              answer = "I found some data, but after filtering for your specific keywords, no exact matches remained. Here is the closest context found:\n\n"
-             filtered_docs = context_docs[:3]
+             filtered_rows = context_rows[:3]
         else:
              if missing_keywords:
                  answer = f"I couldn't find exact matches for '{', '.join(missing_keywords)}' (this data might not be categorized). However, here is the most relevant information found:\n\n"
@@ -232,77 +293,65 @@ async def ai_query(request: QueryRequest):
              else:
                  answer = f"I found the following {count} unique record(s) related to your request:\n\n"
 
-    # Handle Field Lookup Special Case via Flag if needed, or just Format:
-    # To keep this clean in replacement:
-    if target_field and count > 0 and "Found " not in locals().get("answer", ""):
-         answer = f"Found {count} match(es). Here is the requested info:\n\n"
-         # We will use a special formatter for this? No, let's just stick to the specific format logic
-         for i, doc in enumerate(filtered_docs):
-            parts = doc.split(" | ")
-            data_points = parts[1:]
-            found_val = "Not found"
-            context_name = "Unknown"
-            for point in data_points:
-                if ":" in point:
-                    k, v = point.split(":", 1)
-                    if "name" in k.lower(): context_name = v.strip()
-                    if target_field in k.lower(): found_val = v.strip()
-            answer += f"- **{found_val}** ({context_name})\n"
-         
-         return {
-            "answer": answer,
-            "sources": [metadata[0]] if metadata else [],
-            "classifications": tags
-        }
-    
+    yield answer
+
     # Add Classifications Context
     if tags:
-        answer += f"*(One or more source datasets contain {', '.join([t.split('.')[-1] for t in tags])} data)*\n\n"
+        yield f"*(One or more source datasets contain {', '.join([t.split('.')[-1] for t in tags])} data)*\n\n"
 
-        
     # CHECK INTENT: Simple List (Names)
     just_list_names = any(k in prompt_lower for k in ["names", "name of", "list of users", "who are they"])
 
     # Format snippets
-    for i, doc in enumerate(filtered_docs):
-        parts = doc.split(" | ")
-        source = parts[0].replace("Dataset: ", "").strip()
-        data_points = parts[1:]
-        
+    for i, (_, meta, fields) in enumerate(filtered_rows):
         if just_list_names:
-            name_val = "Unknown"
-            for point in data_points:
-                if ":" in point:
-                    k, v = point.split(":", 1)
-                    if "name" in k.lower():
-                        name_val = v.strip()
-                        break
-            answer += f"- {name_val}\n"
+            yield f"- {_find_field(fields, 'name') or 'Unknown'}\n"
             continue
 
-        answer += f"Result {i+1} (from {source}):\n"
-        sentences = []
-        for point in data_points:
-            if ":" in point:
-                k, v = point.split(":", 1)
-                clean_k = k.strip().replace('_', ' ')
-                sentences.append(f"the {clean_k} is {v.strip()}")
-            else:
-                sentences.append(point.strip())
+        record = f"Result {i+1} (from {meta.get('source', 'unknown')}):\n"
+        sentences = [f"the {k.strip().replace('_', ' ')} is {v}" for k, v in fields.items()]
         
         if sentences:
             text = ", ".join(sentences)
             text = text[0].upper() + text[1:] if text else text
-            answer += f"{text}.\n\n"
-
-    return {
-        "answer": answer,
-        "sources": [metadata[0]] if metadata else [],
-        "classifications": tags
-    }
-
-    return {
-        "answer": answer,
-        "sources": [metadata[0]] if metadata else [],
-        "classifications": tags
-    }
+            record += f"{text}.\n\n"
+        yield record
+
+def _row_fields(doc: str, meta: dict) -> dict:
+    """
+    Column -> value of an indexed row. Read from the row's structured metadata;
+    rows indexed before fields were stored are parsed from the document once.
+    """
+    if meta and meta.get("fields"):
+        return json.loads(meta["fields"])
+    fields = {}
+    for point in doc.split(" | ")[1:]:
+        if ":" in point:
+            k, v = point.split(":", 1)
+            fields[k.strip()] = v.strip()
+    return fields
+
+def _find_field(fields: dict, needle: str, last: bool = False, min_length: int = 0):
+    """Value of the first (or last) column whose name contains needle."""
+    found = None
+    for k, v in fields.items():
+        if needle in k.lower() and len(str(v).strip()) >= min_length:
+            found = str(v).strip()
+            if not last:
+                break
+    return found
+
+def _dataset_tags(source: str, meta: dict) -> list:
+    """
+    Tag FQNs of the dataset behind source. Sources indexed before the tag index existed
+    are seeded once from the tags stored on their rows.
+    """
+    tags = tag_index.get(source)
+    if tags is None:
+        tags = [t for t in (meta.get("tags") or "").split(",") if t]
+        tag_index.set(source, tags)
+    return tags
+
+def _source_info(meta: dict) -> dict:
+    """Public part of a row's metadata (drops structured fields and tag filter keys)."""
+    return {k: meta[k] for k in ("source", "row_index", "tags") if k in meta}
@@ -1,7 +1,10 @@
-import re
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 # Trigger reload for model load
 import spacy
 from typing import List, Optional
+from .detectors import detector_registry
 
 # Try to load spacy, handle if missing
 try:
@@ -21,40 +24,51 @@ PII_NAMES = [
     "first_name", "last_name", "full_name", "email", "phone", "address", "zip_code"
 ]
 
-REGEX_PATTERNS = {
-    "PII.Sensitive.SSN": r"^\d{3}-\d{2}-\d{4}$",
-    "PII.Contact.Email": r"[^@]+@[^@]+\.[^@]+",
-    # Flexible Phone Regex: (123) 456-7890, 123-456-7890, 123.456.7890, +1 123 456 7890
-    "PII.Contact.Phone": r"^[\+]?[(]?[0-9]{3}[)]?[-\s\.]?[0-9]{3}[-\s\.]?[0-9]{4,6}$",
-    "PII.Sensitive.CreditCard": r"^\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}$"
-}
-
 # --------------------------
 # LOGIC
 # --------------------------
 
-def classify_column_content(series) -> (str, float):
+def distinct_values(series):
+    """
+    ([distinct non-null values as str], [occurrence counts]) for a pandas Series or Arrow array.
+    Values are stringified like series.dropna().astype(str), but only once per distinct value.
+    """
+    if isinstance(series, (pa.Array, pa.ChunkedArray)) and pa.types.is_nested(series.type):
+        # Lists / structs have no hash kernel: count their str() form on the pandas path below
+        series = pd.Series(series.to_pylist(), dtype=object)
+
+    if isinstance(series, (pa.Array, pa.ChunkedArray)):
+        # Dictionary-encoded / categorical arrays are counted on their codes
+        counted = pc.value_counts(series)
+        uniques, counts = counted.field("values"), counted.field("counts")
+        valid = pc.is_valid(uniques)
+        uniques, counts = pc.filter(uniques, valid), pc.filter(counts, valid)
+        if pa.types.is_dictionary(uniques.type):
+            uniques = uniques.dictionary_decode()
+        return uniques.to_pandas().astype(str).tolist(), counts.to_pylist()
+
+    series = series.dropna()
+    if series.dtype == object:
+        # Mixed types: 1, 1.0 and True hash alike but stringify differently
+        series = series.astype(str)
+    counted = series.value_counts(sort=False)
+    counted = counted[counted > 0] # unused categories
+    return counted.index.astype(str).tolist(), counted.tolist()
+
+def classify_column_content(series, col_name: str = None) -> (str, float):
     """
     Returns (BestTag, Confidence) based on content check (Regex).
+    Accepts a pandas Series or an Arrow array (ColumnProfile.values); col_name enables
+    detectors that only apply to matching columns (e.g. passport numbers).
+    Each distinct value is tested once against every detector (see detectors.py),
+    weighted by how often it occurs, so a low-cardinality column costs O(distinct) matches.
     """
-    # Sample non-null values
-    values = series.dropna().astype(str).tolist()
+    values, counts = distinct_values(series)
     if not values:
         return None, 0.0
     
-    sample_size = len(values)
-    
-    # Check each regex
-    best_tag = None
-    best_score = 0.0
-    
-    for tag, pattern in REGEX_PATTERNS.items():
-        matches = sum(1 for v in values if re.match(pattern, v))
-        score = matches / sample_size
-        
-        if score > best_score:
-            best_score = score
-            best_tag = tag
+    # One pass over the distinct values for all detectors; tags are scored independently
+    best_tag, best_score = detector_registry.best(values, counts, col_name)
             
     # Heuristic: If > 80% match, it's a strong signal
     if best_score > 0.8:
@@ -95,11 +109,11 @@ def classify_column_name(col_name: str) -> (str, float):
 
 def classify(col_name: str, col_series) -> dict:
     """
-    Main entry point.
+    Main entry point. col_series: pandas Series or Arrow array of the column values.
     Returns: {tag: str, confidence: float, source: str}
     """
     # 1. Content Analysis (Priority)
-    content_tag, content_conf = classify_column_content(col_series)
+    content_tag, content_conf = classify_column_content(col_series, col_name)
     
     # 2. Name Analysis
     name_tag, name_conf = classify_column_name(col_name)
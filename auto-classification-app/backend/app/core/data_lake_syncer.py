@@ -4,6 +4,7 @@ import pyarrow.parquet as pq
 from datetime import datetime
 import io
 from app.integration.minio_client import MinioClient
+from app.core.metrics import track
 
 class DataLakeSyncer:
     """
@@ -50,21 +51,24 @@ class DataLakeSyncer:
         try:
             # Convert to Parquet (efficient columnar format)
             parquet_buffer = io.BytesIO()
-            df.to_parquet(
-                parquet_buffer, 
-                engine='pyarrow', 
-                compression='snappy',
-                index=False
-            )
+            with track("parquet_convert", rows=len(df)) as timer:
+                df.to_parquet(
+                    parquet_buffer, 
+                    engine='pyarrow', 
+                    compression='snappy',
+                    index=False
+                )
+                timer.bytes = parquet_buffer.tell()
             parquet_buffer.seek(0)
             
             # Upload to MinIO
-            self.minio.client.put_object(
-                Bucket=self.data_lake_bucket,
-                Key=object_path,
-                Body=parquet_buffer,
-                ContentType='application/parquet'
-            )
+            with track("minio_upload", nbytes=timer.bytes):
+                self.minio.client.put_object(
+                    Bucket=self.data_lake_bucket,
+                    Key=object_path,
+                    Body=parquet_buffer,
+                    ContentType='application/parquet'
+                )
             
             size_bytes = parquet_buffer.tell()
             
@@ -0,0 +1,435 @@
+import datetime
+import ipaddress
+import os
+import re
+import threading
+from dataclasses import dataclass
+from typing import Callable, List, Optional, Tuple
+
+try:
+    import hyperscan
+except ImportError: # combined `re` alternation fallback
+    hyperscan = None
+
+# auto: hyperscan when installed, else one combined `re` alternation; "re" forces the fallback
+DETECTOR_ENGINE = os.getenv("DETECTOR_ENGINE", "auto").lower()
+# Off by default: a Luhn check would drop test / masked card numbers the CreditCard pattern has always matched
+CARD_LUHN_CHECK = os.getenv("CARD_LUHN_CHECK", "false").lower() == "true"
+
+@dataclass(slots=True)
+class Detector:
+    """
+    One content pattern. Patterns are matched from the start of the value (like re.match).
+    Detectors with column_hints only count in columns whose name contains one of them.
+    """
+    tag: str
+    pattern: str
+    validator: Optional[Callable[[str], bool]] = None
+    name: str = ""
+    column_hints: Tuple[str, ...] = ()
+
+# --------------------------
+# VALIDATORS (run on candidate hits only)
+# --------------------------
+
+def _digits(value: str) -> List[int]:
+    return [ord(c) - 48 for c in value if "0" <= c <= "9"]
+
+def luhn_valid(value: str) -> bool:
+    digits = _digits(value)
+    total = 0
+    for i, d in enumerate(reversed(digits)):
+        if i % 2:
+            d *= 2
+            if d > 9:
+                d -= 9
+        total += d
+    return bool(digits) and total % 10 == 0
+
+IBAN_LENGTHS = {
+    "AD": 24, "AE": 23, "AT": 20, "BE": 16, "BG": 22, "BR": 29, "CH": 21, "CY": 28, "CZ": 24, "DE": 22,
+    "DK": 18, "EE": 20, "ES": 24, "FI": 18, "FR": 27, "GB": 22, "GR": 27, "HR": 21, "HU": 28, "IE": 22,
+    "IL": 23, "IS": 26, "IT": 27, "KW": 30, "LB": 28, "LI": 21, "LT": 20, "LU": 20, "LV": 21, "MC": 27,
+    "MT": 31, "MU": 30, "NL": 18, "NO": 15, "PK": 24, "PL": 28, "PT": 25, "QA": 29, "RO": 24, "SA": 24,
+    "SE": 24, "SI": 19, "SK": 24, "SM": 27, "TR": 26, "UA": 29
+}
+
+def iban_valid(value: str) -> bool:
+    """Country length + ISO 13616 mod-97 check."""
+    iban = value.replace(" ", "").upper()
+    expected = IBAN_LENGTHS.get(iban[:2])
+    if (expected and len(iban) != expected) or not 15 <= len(iban) <= 34:
+        return False
+    rearranged = iban[4:] + iban[:4]
+    return int("".join(str(int(c, 36)) for c in rearranged)) % 97 == 1
+
+def ip_valid(value: str) -> bool:
+    try:
+        ipaddress.ip_address(value)
+        return True
+    except ValueError:
+        return False
+
+_VERHOEFF_D = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 2, 3, 4, 0, 6, 7, 8, 9, 5], [2, 3, 4, 0, 1, 7, 8, 9, 5, 6],
+    [3, 4, 0, 1, 2, 8, 9, 5, 6, 7], [4, 0, 1, 2, 3, 9, 5, 6, 7, 8], [5, 9, 8, 7, 6, 0, 4, 3, 2, 1],
+    [6, 5, 9, 8, 7, 1, 0, 4, 3, 2], [7, 6, 5, 9, 8, 2, 1, 0, 4, 3], [8, 7, 6, 5, 9, 3, 2, 1, 0, 4],
+    [9, 8, 7, 6, 5, 4, 3, 2, 1, 0]
+]
+_VERHOEFF_P = [
+    [0, 1, 2, 3, 4, 5, 6, 7, 8, 9], [1, 5, 7, 6, 2, 8, 3, 0, 9, 4], [5, 8, 0, 3, 7, 9, 6, 1, 4, 2],
+    [8, 9, 1, 6, 0, 4, 3, 5, 2, 7], [9, 4, 5, 3, 1, 2, 8, 6, 7, 0], [4, 2, 8, 6, 5, 7, 0, 3, 9, 1],
+    [2, 7, 9, 3, 8, 0, 6, 4, 1, 5], [7, 0, 4, 6, 9, 1, 3, 2, 5, 8]
+]
+
+def verhoeff_valid(value: str) -> bool:
+    check = 0
+    for i, d in enumerate(reversed(_digits(value))):
+        check = _VERHOEFF_D[check][_VERHOEFF_P[i % 8][d]]
+    return check == 0
+
+def _weighted_mod11(digits, weights):
+    """Mod-11 check digit (11 - sum % 11); None when it would be 10 (no valid number)."""
+    check = 11 - sum(d * w for d, w in zip(digits, weights)) % 11
+    return 0 if check == 11 else (None if check == 10 else check)
+
+def bsn_valid(value: str) -> bool:
+    """Netherlands BSN: 11-test."""
+    d = _digits(value)
+    return sum(x * w for x, w in zip(d, [9, 8, 7, 6, 5, 4, 3, 2, -1])) % 11 == 0
+
+def dni_valid(value: str) -> bool:
+    """Spain DNI / NIE: control letter."""
+    v = value.replace("-", "").upper()
+    number = "XYZ".index(v[0]) if v[0] in "XYZ" else None
+    digits = (str(number) + v[1:-1]) if number is not None else v[:-1]
+    return "TRWAGMYFPDXBNJZSQVHLCKE"[int(digits) % 23] == v[-1]
+
+def cpf_valid(value: str) -> bool:
+    """Brazil CPF: two mod-11 check digits."""
+    d = _digits(value)
+    if len(set(d)) == 1:
+        return False
+    first = sum(x * w for x, w in zip(d, range(10, 1, -1))) * 10 % 11 % 10
+    second = sum(x * w for x, w in zip(d, range(11, 1, -1))) * 10 % 11 % 10
+    return d[9] == first and d[10] == second
+
+def pesel_valid(value: str) -> bool:
+    """Poland PESEL."""
+    d = _digits(value)
+    return (10 - sum(x * w for x, w in zip(d, [1, 3, 7, 9, 1, 3, 7, 9, 1, 3])) % 10) % 10 == d[10]
+
+def fnr_valid(value: str) -> bool:
+    """Norway fødselsnummer: two mod-11 check digits."""
+    d = _digits(value)
+    return _weighted_mod11(d, [3, 7, 6, 1, 8, 9, 4, 5, 2]) == d[9] and _weighted_mod11(d, [5, 4, 3, 2, 7, 6, 5, 4, 3, 2]) == d[10]
+
+def steuer_id_valid(value: str) -> bool:
+    """Germany Steuer-ID: ISO 7064 MOD 11,10."""
+    d = _digits(value)
+    if d[0] == 0:
+        return False
+    product = 10
+    for x in d[:10]:
+        s = (x + product) % 10 or 10
+        product = 2 * s % 11
+    return (11 - product) % 10 == d[10]
+
+def personnummer_valid(value: str) -> bool:
+    """Sweden personnummer: Luhn over the 10-digit form."""
+    return luhn_valid("".join(map(str, _digits(value)[-10:])))
+
+def hetu_valid(value: str) -> bool:
+    """Finland HETU: mod-31 control character."""
+    v = value.upper()
+    return "0123456789ABCDEFHJKLMNPRSTUVWXY"[int(v[:6] + v[7:10]) % 31] == v[10]
+
+def belgian_nn_valid(value: str) -> bool:
+    """Belgium national number: mod 97 (with the 2000+ birth year variant)."""
+    d = "".join(map(str, _digits(value)))
+    check = int(d[9:])
+    return 97 - int(d[:9]) % 97 == check or 97 - int("2" + d[:9]) % 97 == check
+
+def nir_valid(value: str) -> bool:
+    """France NIR: 97 - (number mod 97) key; Corsica 2A/2B count as 19/18."""
+    v = value.replace(" ", "").upper()
+    number = v[:13].replace("2A", "19").replace("2B", "18")
+    return 97 - int(number) % 97 == int(v[13:])
+
+def cpr_valid(value: str) -> bool:
+    """Denmark CPR: no checksum since 2007, so require a real ddmmyy date."""
+    d = "".join(map(str, _digits(value)))
+    try:
+        datetime.date(2000 + int(d[4:6]), int(d[2:4]), int(d[0:2]))
+        return True
+    except ValueError:
+        return False
+
+def rrn_valid(value: str) -> bool:
+    """South Korea RRN (pre-2020 numbers carry a check digit)."""
+    d = _digits(value)
+    return (11 - sum(x * w for x, w in zip(d, [2, 3, 4, 5, 6, 7, 8, 9, 2, 3, 4, 5])) % 11) % 10 == d[12]
+
+def cn_id_valid(value: str) -> bool:
+    """China resident identity card: ISO 7064 MOD 11-2."""
+    weights = [7, 9, 10, 5, 8, 4, 2, 1, 6, 3, 7, 9, 10, 5, 8, 4, 2]
+    total = sum(int(c) * w for c, w in zip(value[:17], weights))
+    return "10X98765432"[total % 11] == value[17].upper()
+
+def nric_valid(value: str) -> bool:
+    """Singapore NRIC / FIN."""
+    v = value.upper()
+    total = sum(int(c) * w for c, w in zip(v[1:8], [2, 7, 6, 5, 4, 3, 2])) + (4 if v[0] in "TG" else 0)
+    table = "JZIHGFEDCBA" if v[0] in "ST" else "XWUTRQPNMLK"
+    return table[total % 11] == v[8]
+
+def nino_valid(value: str) -> bool:
+    """UK National Insurance number: prefixes that are never issued."""
+    return value[:2].upper() not in ("BG", "GB", "NK", "KN", "TN", "NT", "ZZ")
+
+# Codice fiscale: values of the characters in odd (1st, 3rd, ...) positions; even positions count 0-9 / A-Z as 0-25
+_CF_ODD = dict(zip("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ",
+                   [1, 0, 5, 7, 9, 13, 15, 17, 19, 21, 1, 0, 5, 7, 9, 13, 15, 17, 19, 21, 2, 4, 18, 20,
+                    11, 3, 6, 8, 12, 14, 16, 10, 22, 25, 24, 23]))
+
+def codice_fiscale_valid(value: str) -> bool:
+    """Italy codice fiscale: control letter (omocodia letters included)."""
+    v = value.upper()
+    total = sum(_CF_ODD[c] if i % 2 == 0 else int(c) if c.isdigit() else ord(c) - 65 for i, c in enumerate(v[:15]))
+    return chr(65 + total % 26) == v[15]
+
+def curp_valid(value: str) -> bool:
+    """Mexico CURP: check digit over the first 17 characters."""
+    v = value.upper()
+    total = sum("0123456789ABCDEFGHIJKLMN\u00d1OPQRSTUVWXYZ".index(c) * (18 - i) for i, c in enumerate(v[:17]))
+    return (10 - total % 10) % 10 == int(v[17])
+
+# --------------------------
+# REGISTRY
+# --------------------------
+
+def _accepts(detector: Detector, value: str) -> bool:
+    if detector.validator is None:
+        return True
+    try:
+        return detector.validator(value)
+    except (ValueError, IndexError):
+        return False
+
+try:
+    from re import _parser as _sre_parse
+except ImportError: # Python < 3.11
+    import sre_parse as _sre_parse
+
+# Values this long or longer share one length bucket
+_LONG_VALUE = 65
+
+def _length_range(pattern: str):
+    """(min, max) length of a value the pattern can match; max is None when unbounded."""
+    try:
+        low, high = _sre_parse.parse(pattern).getwidth()
+    except Exception:
+        return 0, None
+    # Without a trailing $ a match may be a prefix of a longer value; $ also matches before a final newline
+    if not pattern.endswith("$") or high >= _sre_parse.MAXREPEAT:
+        return low, None
+    return low, high + 1
+
+class _RegexEngine:
+    """
+    Patterns are grouped by the value lengths they can match. Per length, one alternation of
+    named groups rejects a non-matching value in a single match attempt; after a hit on
+    pattern i, the alternation of that length's later patterns finds the next one.
+    """
+
+    def __init__(self, detectors):
+        self.detectors = detectors
+        self.ranges = [_length_range(d.pattern) for d in detectors]
+        self._chains = {}
+
+    def _alternation(self, ids):
+        return re.compile("|".join(f"(?P<d{i}>{self.detectors[i].pattern})" for i in ids)) if ids else None
+
+    def _chain(self, length: int):
+        # {None: alternation of all candidates, i: alternation of the candidates after i}
+        chain = self._chains.get(length)
+        if chain is None:
+            ids = [i for i, (low, high) in enumerate(self.ranges) if low <= length and (high is None or length <= high)]
+            chain = {None: self._alternation(ids)}
+            for k, i in enumerate(ids):
+                chain[i] = self._alternation(ids[k + 1:])
+            self._chains[length] = chain
+        return chain
+
+    def matching(self, value: str) -> List[int]:
+        chain = self._chain(min(len(value), _LONG_VALUE))
+        found = []
+        pattern = chain[None]
+        while pattern is not None:
+            m = pattern.match(value)
+            if m is None:
+                break
+            i = int(m.lastgroup[1:])
+            found.append(i)
+            pattern = chain[i]
+        return found
+
+class _HyperscanEngine:
+    """Multi-pattern DFA (hyperscan): reports every matching pattern in one scan."""
+
+    def __init__(self, detectors):
+        self.detectors = detectors
+        # Anchor like re.match: a pattern must match from the first character
+        self.expressions = [f"^(?:{d.pattern})".encode() for d in detectors]
+        self._local = threading.local()
+        self._database() # fail now (and fall back) if a pattern isn't supported
+
+    def _database(self):
+        # Scratch space isn't shareable across threads; one database per classifier thread
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+            flags = hyperscan.HS_FLAG_SINGLEMATCH | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP
+            db.compile(expressions=self.expressions, ids=list(range(len(self.expressions))),
+                       elements=len(self.expressions), flags=[flags] * len(self.expressions))
+            self._local.db = db
+        return db
+
+    def matching(self, value: str) -> List[int]:
+        if not value:
+            return []
+        ids = []
+        self._database().scan(value.encode(), match_event_handler=lambda i, start, end, flags, ctx: ids.append(i))
+        return sorted(ids)
+
+class DetectorRegistry:
+    """
+    Content detectors in priority order. Every value is tested once against all patterns
+    (compiled together). Tags are scored independently: a value counts once towards every
+    tag with a detector that matches it and whose validator accepts it. Priority only
+    breaks ties between equally scored tags.
+    """
+
+    def __init__(self):
+        self.detectors: List[Detector] = []
+        self._engine = None
+        self._lock = threading.Lock()
+
+    def register(self, tag: str, pattern: str, validator: Callable[[str], bool] = None, name: str = "",
+                 column_hints: Tuple[str, ...] = ()):
+        """Append a detector (lowest priority so far). Patterns must not define named groups."""
+        with self._lock:
+            self.detectors.append(Detector(tag, pattern, validator, name or tag, tuple(column_hints)))
+            self._engine = None
+
+    def tags(self) -> List[str]:
+        """Distinct tags in priority order."""
+        return list(dict.fromkeys(d.tag for d in self.detectors))
+
+    def engine(self):
+        with self._lock:
+            if self._engine is None:
+                detectors = list(self.detectors)
+                if hyperscan is not None and DETECTOR_ENGINE != "re":
+                    try:
+                        self._engine = _HyperscanEngine(detectors)
+                    except Exception as e:
+                        print(f"hyperscan unavailable for the detector set ({e}); using the re engine")
+                if self._engine is None:
+                    self._engine = _RegexEngine(detectors)
+            return self._engine
+
+    @staticmethod
+    def _applies(detector: Detector, column: Optional[str]) -> bool:
+        if not detector.column_hints:
+            return True
+        name = (column or "").lower()
+        return any(hint in name for hint in detector.column_hints)
+
+    def matches(self, value: str, column: str = None) -> List[Detector]:
+        """Every detector (in priority order) that matches the value and whose validator accepts it."""
+        engine = self.engine()
+        found = []
+        for i in engine.matching(value):
+            detector = engine.detectors[i]
+            if self._applies(detector, column) and _accepts(detector, value):
+                found.append(detector)
+        return found
+
+    def detect(self, value: str, column: str = None) -> Optional[str]:
+        """Highest-priority tag for a single value."""
+        found = self.matches(value, column)
+        return found[0].tag if found else None
+
+    def tally(self, values, counts, column: str = None) -> dict:
+        """{tag: number of matching values} over distinct values weighted by their counts."""
+        engine = self.engine()
+        hits = {}
+        for value, count in zip(values, counts):
+            tags = set()
+            for i in engine.matching(value):
+                detector = engine.detectors[i]
+                if detector.tag not in tags and self._applies(detector, column) and _accepts(detector, value):
+                    tags.add(detector.tag)
+            for tag in tags:
+                hits[tag] = hits.get(tag, 0) + count
+        return hits
+
+    def best(self, values, counts, column: str = None):
+        """(tag, share of values) of the best-scoring tag; ties go to the higher-priority tag. (None, 0.0) if nothing matched."""
+        total = sum(counts)
+        hits = self.tally(values, counts, column)
+        best_tag, best_score = None, 0.0
+        for tag in self.tags():
+            score = hits.get(tag, 0) / total if total else 0.0
+            if score > best_score:
+                best_tag, best_score = tag, score
+        return best_tag, best_score
+
+detector_registry = DetectorRegistry()
+
+# Tags are scored independently, as the original four patterns always were, so registration
+# order only breaks ties. National IDs come first: their formats are narrower than the generic
+# SSN and Phone shapes they overlap with (ITINs look like SSNs, unspaced PESEL / Steuer-ID /
+# CPF look like phone numbers), so a column of them is tagged NationalID while SSN and phone
+# columns keep scoring 100% for their own tags.
+
+# National identifiers: (name, pattern, validator)
+NATIONAL_IDS = [
+    ("US ITIN", r"^9\d{2}[- ]?(?:5\d|6[0-5]|7\d|8[0-8]|9[0-24-9])[- ]?\d{4}$", None),
+    ("UK NINO", r"^[A-CEGHJ-PR-TW-Z][A-CEGHJ-NPR-TW-Z] ?\d{2} ?\d{2} ?\d{2} ?[A-D]$", nino_valid),
+    ("CA SIN", r"^\d{3}[- ]?\d{3}[- ]?\d{3}$", luhn_valid),
+    ("NL BSN", r"^\d{9}$", bsn_valid),
+    ("ES DNI/NIE", r"^[XYZ\d]\d{7}-?[A-Z]$", dni_valid),
+    ("BR CPF", r"^\d{3}\.?\d{3}\.?\d{3}-?\d{2}$", cpf_valid),
+    ("PL PESEL", r"^\d{11}$", pesel_valid),
+    ("NO FNR", r"^\d{6} ?\d{5}$", fnr_valid),
+    ("DE Steuer-ID", r"^\d{2} ?\d{3} ?\d{3} ?\d{3}$", steuer_id_valid),
+    ("SE personnummer", r"^(?:\d{2})?\d{6}[-+]?\d{4}$", personnummer_valid),
+    ("DK CPR", r"^\d{6}-?\d{4}$", cpr_valid),
+    ("FI HETU", r"^\d{6}[-+A-FU-Y]\d{3}[0-9A-FHJ-NPR-Y]$", hetu_valid),
+    ("BE national number", r"^\d{2}\.?\d{2}\.?\d{2}-?\d{3}\.?\d{2}$", belgian_nn_valid),
+    ("FR NIR", r"^[12] ?\d{2} ?\d{2} ?(?:\d{2}|2[ABab]) ?\d{3} ?\d{3} ?\d{2}$", nir_valid),
+    ("IT codice fiscale", r"^[A-Z]{6}[\dLMNP-V]{2}[A-EHLMPR-T][\dLMNP-V]{2}[A-Z][\dLMNP-V]{3}[A-Z]$", codice_fiscale_valid),
+    ("IN Aadhaar", r"^[2-9]\d{3} ?\d{4} ?\d{4}$", verhoeff_valid),
+    ("CN resident ID", r"^\d{17}[\dXx]$", cn_id_valid),
+    ("KR RRN", r"^\d{6}-?[1-4]\d{6}$", rrn_valid),
+    ("SG NRIC/FIN", r"^[STFGstfg]\d{7}[A-Za-z]$", nric_valid),
+    ("MX CURP", r"^[A-Z][AEIOUX][A-Z]{2}\d{6}[HM][A-Z]{5}[0-9A-Z]\d$", curp_valid),
+    ("ZA ID", r"^\d{13}$", luhn_valid),
+]
+for _name, _pattern, _validator in NATIONAL_IDS:
+    detector_registry.register("PII.Sensitive.NationalID", _pattern, _validator, _name)
+
+detector_registry.register("PII.Sensitive.SSN", r"^\d{3}-\d{2}-\d{4}$")
+detector_registry.register("PII.Contact.Email", r"[^@]+@[^@]+\.[^@]+")
+detector_registry.register("PII.Sensitive.IBAN", r"^[A-Z]{2}\d{2}(?: ?[A-Z0-9]){11,30}$", iban_valid)
+detector_registry.register("PII.Contact.IPAddress", r"^(?:\d{1,3}\.){3}\d{1,3}$", ip_valid, "IPv4")
+detector_registry.register("PII.Contact.IPAddress", r"^[0-9A-Fa-f]{0,4}:[0-9A-Fa-f:.]{2,}$", ip_valid, "IPv6")
+
+# Flexible Phone Regex: (123) 456-7890, 123-456-7890, 123.456.7890, +1 123 456 7890
+detector_registry.register("PII.Contact.Phone", r"^[\+]?[(]?[0-9]{3}[)]?[-\s\.]?[0-9]{3}[-\s\.]?[0-9]{4,6}$")
+detector_registry.register("PII.Sensitive.CreditCard", r"^\d{4}[- ]?\d{4}[- ]?\d{4}[- ]?\d{4}$", luhn_valid if CARD_LUHN_CHECK else None)
+
+# Letters + digits is also the shape of employee, order and account numbers: only counted in passport columns
+detector_registry.register("PII.Sensitive.Passport", r"^[A-Z]{1,2}\d{6,8}$", column_hints=("passport",))
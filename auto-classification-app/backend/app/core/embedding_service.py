@@ -0,0 +1,96 @@
+import os
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .embeddings import EMBEDDING_BACKEND
+
+# Number of embedding worker processes. 0 keeps embedding in-process (default).
+EMBEDDING_WORKERS = int(os.getenv("EMBEDDING_WORKERS", "0"))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+
+# --------------------------
+# WORKER SIDE
+# --------------------------
+
+_worker_backend = None
+
+def _init_worker(backend_name: str):
+    """Runs once per worker process: pin math libs to one core and load the model."""
+    global _worker_backend
+    # Each worker owns one core; letting torch/BLAS spawn threads per worker oversubscribes the CPU
+    os.environ["OMP_NUM_THREADS"] = "1"
+    os.environ["MKL_NUM_THREADS"] = "1"
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+
+    from .embeddings import get_embedding_backend
+    _worker_backend = get_embedding_backend(backend_name, threads=1)
+
+def _embed_batch(texts):
+    return _worker_backend.embed(texts)
+
+# --------------------------
+# PARENT SIDE
+# --------------------------
+
+class EmbeddingService:
+    """
+    Pool of worker processes, each holding its own copy of the embedding backend
+    (SentenceTransformer, or ONNX fp32/int8 - see embeddings.py).
+    Batches are fed to the workers through the pool's shared call queue, so
+    throughput scales with the number of cores on CPU-only hosts.
+    """
+
+    def __init__(self, workers: int = None, backend_name: str = EMBEDDING_BACKEND, batch_size: int = EMBEDDING_BATCH_SIZE):
+        self.workers = workers or os.cpu_count() or 1
+        self.backend_name = backend_name
+        self.batch_size = batch_size
+        # "spawn" so workers don't inherit the parent's torch/chroma state through fork
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=mp.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(backend_name,)
+        )
+        print(f"DEBUG: Started embedding service ({self.workers} workers, backend={backend_name})")
+
+    def embed(self, texts: list) -> np.ndarray:
+        """
+        Embed a list of texts. Returns a (len(texts), dim) float32 array, in input order.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results = list(self.executor.map(_embed_batch, batches))
+        return np.vstack(results)
+
+    def warmup(self):
+        """Force every worker to load its model before the first real request."""
+        list(self.executor.map(_embed_batch, [["warmup"]] * self.workers))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+_service = None
+_service_lock = threading.Lock()
+
+def get_embedding_service():
+    """
+    Returns the shared EmbeddingService, or None when EMBEDDING_WORKERS is 0
+    (embedding then happens inside the calling process).
+    """
+    global _service
+    if EMBEDDING_WORKERS <= 0:
+        return None
+    with _service_lock:
+        if _service is None:
+            _service = EmbeddingService(workers=EMBEDDING_WORKERS)
+        return _service
+
+def shutdown_embedding_service():
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.shutdown()
+            _service = None
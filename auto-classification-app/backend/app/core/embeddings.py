@@ -0,0 +1,207 @@
+import os
+import fcntl
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+
+# sentence-transformers | onnx | onnx-int8
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+# Where exported ONNX models + tokenizer are cached
+ONNX_MODEL_DIR = os.getenv("EMBEDDING_ONNX_DIR", os.path.join("state", "onnx_models"))
+# all-MiniLM-L6-v2 truncates at 256 word pieces
+MAX_SEQ_LENGTH = 256
+
+class EmbeddingBackend:
+    """
+    Interface for text embedding backends.
+    embed() returns a (len(texts), dimension) float32 array of L2-normalized vectors.
+    """
+    name = "base"
+    model_id = ""
+
+    def embed(self, texts: list) -> np.ndarray:
+        raise NotImplementedError
+
+    def __call__(self, texts):
+        return self.embed(texts)
+
+class SentenceTransformerBackend(EmbeddingBackend):
+    """PyTorch SentenceTransformer (reference implementation)."""
+    name = "sentence-transformers"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, threads: int = None):
+        import torch
+        if threads:
+            torch.set_num_threads(threads)
+        from sentence_transformers import SentenceTransformer
+        self.model_id = model_name
+        self.model = SentenceTransformer(model_name, device="cpu")
+
+    def embed(self, texts: list) -> np.ndarray:
+        return self.model.encode(texts, batch_size=len(texts) or 1, convert_to_numpy=True,
+                                 normalize_embeddings=True).astype(np.float32)
+
+class OnnxEmbeddingBackend(EmbeddingBackend):
+    """
+    ONNX Runtime implementation of a MiniLM sentence encoder (mean pooling + L2 norm).
+    quantized=True uses a dynamically quantized int8 copy of the model.
+    Only onnxruntime + tokenizers are imported at runtime; torch is needed once, for export.
+    """
+    name = "onnx"
+
+    def __init__(self, model_name: str = EMBEDDING_MODEL, quantized: bool = False, threads: int = None,
+                 model_dir: str = ONNX_MODEL_DIR):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.name = "onnx-int8" if quantized else "onnx"
+        self.model_id = model_name
+        target_dir = os.path.join(model_dir, model_name.replace("/", "__"))
+        model_path = ensure_onnx_model(model_name, target_dir, quantized=quantized)
+
+        self.tokenizer = Tokenizer.from_file(os.path.join(target_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def embed(self, texts: list) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+
+        # Mean pooling over real (non-padding) tokens, as in the SentenceTransformer Pooling module
+        mask = attention_mask[..., None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled = summed / counts
+
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return (pooled / np.clip(norms, 1e-12, None)).astype(np.float32)
+
+@contextmanager
+def _export_lock(target_dir: str):
+    """Exclusive lock on target_dir, shared by every process (API + embedding workers) exporting there."""
+    os.makedirs(target_dir, exist_ok=True)
+    with open(os.path.join(target_dir, ".export.lock"), "w") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+def _temp_path(target_dir: str, suffix: str) -> str:
+    fd, path = tempfile.mkstemp(dir=target_dir, suffix=suffix)
+    os.close(fd)
+    return path
+
+def ensure_onnx_model(model_name: str, target_dir: str, quantized: bool = False) -> str:
+    """
+    Export the HF model behind a SentenceTransformer to ONNX (and int8) on first use.
+    Returns the path of the .onnx file to load. Exports run under a file lock and are
+    written to a temp file then renamed, so worker processes starting together export
+    once and never load a half-written model.
+    """
+    fp32_path = os.path.join(target_dir, "model.onnx")
+    int8_path = os.path.join(target_dir, "model.int8.onnx")
+    tokenizer_path = os.path.join(target_dir, "tokenizer.json")
+    target_path = int8_path if quantized else fp32_path
+
+    # model.onnx is renamed into place after the tokenizer is saved, so this means both are complete
+    if os.path.exists(fp32_path) and os.path.exists(target_path):
+        return target_path
+
+    with _export_lock(target_dir):
+        if not os.path.exists(fp32_path) or not os.path.exists(tokenizer_path):
+            print(f"DEBUG: Exporting {model_name} to ONNX (One-time)...")
+            import torch
+            from transformers import AutoModel, AutoTokenizer
+
+            hf_name = model_name if "/" in model_name else f"sentence-transformers/{model_name}"
+            tokenizer = AutoTokenizer.from_pretrained(hf_name)
+            model = AutoModel.from_pretrained(hf_name)
+            model.eval()
+
+            sample = tokenizer(["export sample"], return_tensors="pt")
+            input_names = [k for k in ["input_ids", "attention_mask", "token_type_ids"] if k in sample]
+
+            class LastHiddenState(torch.nn.Module):
+                """Positional inputs -> last_hidden_state, so the export doesn't depend on forward()'s signature."""
+                def __init__(self, encoder):
+                    super().__init__()
+                    self.encoder = encoder
+
+                def forward(self, *inputs):
+                    return self.encoder(**dict(zip(input_names, inputs)), return_dict=False)[0]
+
+            dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+            dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+            tmp_path = _temp_path(target_dir, ".onnx")
+            try:
+                with torch.no_grad():
+                    torch.onnx.export(
+                        LastHiddenState(model),
+                        tuple(sample[k] for k in input_names),
+                        tmp_path,
+                        input_names=input_names,
+                        output_names=["last_hidden_state"],
+                        dynamic_axes=dynamic_axes,
+                        opset_version=14,
+                        # TorchScript exporter (torch >= 2.9 defaults to dynamo, which needs onnxscript)
+                        dynamo=False
+                    )
+                tokenizer.save_pretrained(target_dir)
+                os.replace(tmp_path, fp32_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        if quantized and not os.path.exists(int8_path):
+            print(f"DEBUG: Quantizing {model_name} to int8 (One-time)...")
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            tmp_path = _temp_path(target_dir, ".int8.onnx")
+            try:
+                quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+                os.replace(tmp_path, int8_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+    return target_path
+
+def canonical_backend_name(name: str = None) -> str:
+    """EMBEDDING_BACKEND spelling -> the backend's .name"""
+    name = (name or EMBEDDING_BACKEND).lower()
+    if name == "onnx":
+        return "onnx"
+    if name in ("onnx-int8", "onnx_int8"):
+        return "onnx-int8"
+    if name in ("sentence-transformers", "sentence_transformers", "torch"):
+        return "sentence-transformers"
+    raise ValueError(f"Unknown embedding backend: {name}")
+
+def get_embedding_backend(name: str = None, threads: int = None) -> EmbeddingBackend:
+    """Build the configured embedding backend (EMBEDDING_BACKEND by default)."""
+    name = canonical_backend_name(name)
+    if name == "onnx":
+        return OnnxEmbeddingBackend(quantized=False, threads=threads)
+    if name == "onnx-int8":
+        return OnnxEmbeddingBackend(quantized=True, threads=threads)
+    return SentenceTransformerBackend(threads=threads)
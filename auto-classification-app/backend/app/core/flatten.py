@@ -0,0 +1,211 @@
+import os
+import pandas as pd
+import yaml
+
+try:
+    import ijson
+except ImportError: # JSON documents are then loaded whole
+    ijson = None
+
+# Loader used for the YAML event stream (libyaml when available)
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# ijson-style prefix of the record array, e.g. "data.customers.item". Empty: the top-level
+# array, or the first top-level key holding an array of objects.
+FLATTEN_RECORD_PATH = os.getenv("FLATTEN_RECORD_PATH", "")
+# Nested objects are flattened into "parent.child" columns up to this many levels
+FLATTEN_MAX_DEPTH = int(os.getenv("FLATTEN_MAX_DEPTH", "3"))
+FLATTEN_BATCH_SIZE = int(os.getenv("FLATTEN_BATCH_SIZE", "10000"))
+
+def flatten_record(record, max_depth: int = FLATTEN_MAX_DEPTH, sep: str = ".") -> dict:
+    """Same columns as pd.json_normalize(record, max_level=max_depth), for one record."""
+    if not isinstance(record, dict):
+        return {"value": record}
+    out = {}
+    def walk(obj, prefix, level):
+        for key, value in obj.items():
+            name = f"{prefix}{sep}{key}" if prefix else str(key)
+            if isinstance(value, dict) and value and level < max_depth:
+                walk(value, name, level + 1)
+            else:
+                out[name] = value
+    walk(record, "", 0)
+    return out
+
+def frames_from_records(records, max_depth: int = FLATTEN_MAX_DEPTH, batch_size: int = FLATTEN_BATCH_SIZE):
+    """Flattened DataFrames of up to batch_size records each, built as the records stream in."""
+    batch = []
+    for record in records:
+        batch.append(flatten_record(record, max_depth))
+        if len(batch) >= batch_size:
+            yield pd.DataFrame(batch)
+            batch = []
+    if batch:
+        yield pd.DataFrame(batch)
+
+def concat_frames(frames) -> pd.DataFrame:
+    # The batches and the concatenated copy coexist briefly: peak memory is about twice the final frame
+    frames = list(frames)
+    if not frames:
+        return pd.DataFrame()
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+def frame_from_document(data) -> pd.DataFrame:
+    """Loaded document -> DataFrame, for documents without a record array."""
+    # Attempt to normalize. If list of dicts -> simple. If dict -> maybe normalize.
+    if isinstance(data, list):
+        return pd.DataFrame(data)
+    if isinstance(data, dict):
+        # Try to find the "main" list
+        for k, v in data.items():
+            if isinstance(v, list) and len(v) > 0 and isinstance(v[0], dict):
+                return pd.DataFrame(v)
+        return pd.json_normalize(data)
+    raise ValueError("Unsupported document structure")
+
+# --------------------------
+# JSON (ijson)
+# --------------------------
+
+def find_json_record_path(stream):
+    """Prefix of the top-level array of objects, or of the first top-level key holding one; None if neither."""
+    previous = None
+    for prefix, event, _ in ijson.parse(stream):
+        if event == "start_map" and previous == "start_array" and (prefix == "item" or prefix.count(".") == 1 and prefix.endswith(".item")):
+            return prefix
+        if event in ("end_map", "end_array") and prefix == "":
+            return None
+        previous = event
+    return None
+
+def read_json_records(open_stream, record_path: str = FLATTEN_RECORD_PATH):
+    """
+    Stream the record array of a JSON document into a flattened DataFrame.
+    open_stream() returns a fresh binary stream. None when ijson isn't installed or the
+    document has no record array (e.g. pandas' column-oriented JSON).
+    """
+    if ijson is None:
+        return None
+    if not record_path:
+        with open_stream() as stream:
+            record_path = find_json_record_path(stream)
+        if record_path is None:
+            return None
+    with open_stream() as stream:
+        df = concat_frames(frames_from_records(ijson.items(stream, record_path, use_float=True)))
+    return df if len(df.columns) else None
+
+# --------------------------
+# YAML (event stream)
+# --------------------------
+
+_resolver = yaml.resolver.Resolver()
+_constructor = yaml.constructor.SafeConstructor()
+
+def _scalar(event):
+    tag = event.tag if event.tag not in (None, "!") else _resolver.resolve(yaml.ScalarNode, event.value, event.implicit)
+    if tag == "tag:yaml.org,2002:merge":
+        return "<<"
+    construct = _constructor.yaml_constructors.get(tag, yaml.constructor.SafeConstructor.construct_undefined)
+    return construct(_constructor, yaml.ScalarNode(tag, event.value, style=event.style))
+
+class _Frame:
+    __slots__ = ("value", "path", "key", "records")
+
+    def __init__(self, value, path):
+        self.value = value
+        self.path = path
+        self.key = _NO_KEY
+        self.records = False
+
+_NO_KEY = object()
+
+class YamlRecordStream:
+    """
+    Walks the YAML event stream (no full document tree) and yields each mapping of the
+    record array as soon as it is complete. Everything outside the record array is
+    kept in .document; .found tells whether a record array was seen.
+    """
+
+    def __init__(self, stream, record_path: str = FLATTEN_RECORD_PATH):
+        self.stream = stream
+        self.record_path = record_path or None
+        self.auto = not record_path
+        self.found = False
+        self.document = None
+
+    def _child_path(self, stack):
+        if not stack:
+            return ""
+        parent = stack[-1]
+        step = "item" if isinstance(parent.value, list) else str(parent.key)
+        return f"{parent.path}.{step}" if parent.path else step
+
+    def __iter__(self):
+        stack, anchors = [], {}
+        for event in yaml.parse(self.stream, Loader=YamlLoader):
+            if isinstance(event, yaml.DocumentEndEvent):
+                break
+            if not isinstance(event, (yaml.ScalarEvent, yaml.AliasEvent, yaml.MappingStartEvent, yaml.SequenceStartEvent,
+                                      yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                continue
+
+            if isinstance(event, (yaml.MappingEndEvent, yaml.SequenceEndEvent)):
+                frame = stack.pop()
+                value = frame.value
+            else:
+                # A value inside a sequence: decide whether that sequence is the record array
+                if stack and isinstance(stack[-1].value, list) and not stack[-1].value and not stack[-1].records:
+                    path = self._child_path(stack)
+                    if self.auto and self.record_path is None and isinstance(event, yaml.MappingStartEvent) \
+                            and (len(stack) == 1 or isinstance(stack[-2].value, dict) and stack[-2].path == "" and stack[-2].key != "<<"):
+                        self.record_path = path
+                    stack[-1].records = path == self.record_path
+                if isinstance(event, yaml.MappingStartEvent) and (not stack or stack[-1].key is not _NO_KEY or isinstance(stack[-1].value, list)):
+                    stack.append(_Frame({}, self._child_path(stack)))
+                    if event.anchor:
+                        anchors[event.anchor] = stack[-1].value
+                    continue
+                if isinstance(event, yaml.SequenceStartEvent):
+                    stack.append(_Frame([], self._child_path(stack)))
+                    if event.anchor:
+                        anchors[event.anchor] = stack[-1].value
+                    continue
+                if isinstance(event, yaml.AliasEvent):
+                    value = anchors[event.anchor]
+                elif isinstance(event, yaml.ScalarEvent):
+                    value = _scalar(event)
+                    if event.anchor:
+                        anchors[event.anchor] = value
+                else:
+                    raise ValueError("Complex mapping keys are not supported")
+
+            if not stack:
+                self.document = value
+                continue
+            parent = stack[-1]
+            if isinstance(parent.value, list):
+                if parent.records:
+                    self.found = True
+                    yield value
+                else:
+                    parent.value.append(value)
+            elif parent.key is _NO_KEY:
+                parent.key = value
+            else:
+                merged = [value] if isinstance(value, dict) else value
+                if parent.key == "<<" and isinstance(merged, list) and all(isinstance(m, dict) for m in merged):
+                    # Merge key (one mapping or a list of them): keys already set win, then earlier mappings
+                    for mapping in merged:
+                        for k, v in mapping.items():
+                            parent.value.setdefault(k, v)
+                else:
+                    parent.value[parent.key] = value
+                parent.key = _NO_KEY
+
+def read_yaml_records(stream, record_path: str = FLATTEN_RECORD_PATH) -> pd.DataFrame:
+    records = YamlRecordStream(stream, record_path)
+    df = concat_frames(frames_from_records(records))
+    if records.found:
+        return df
+    return frame_from_document(records.document)
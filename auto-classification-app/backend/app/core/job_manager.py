@@ -0,0 +1,196 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from .ws_manager import manager
+
+JOB_DB_PATH = os.getenv("JOB_DB_PATH", os.path.join("state", "jobs.db"))
+# Files processed concurrently across all jobs
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+
+# Job / task states
+PENDING, RUNNING, DONE, FAILED = "pending", "running", "done", "failed"
+
+class JobManager:
+    """
+    Durable ingestion jobs. A job is a list of tasks (one per file) persisted in SQLite;
+    tasks run on a shared worker pool, and a job interrupted by a restart resumes
+    with the tasks that had not finished.
+
+    Progress goes to the job's own WebSocket channel (/ws/ingestion/{job_id}) and,
+    summarized, to the submitting client's channel.
+    """
+
+    def __init__(self, path: str = JOB_DB_PATH, workers: int = JOB_WORKERS):
+        self.path = path
+        self.workers = workers
+        self.handlers = {}   # kind -> async handler(job, item)
+        self.running = {}    # job_id -> asyncio.Task
+        self._slots = None   # asyncio.Semaphore, created on the event loop
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.executescript("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                kind TEXT NOT NULL,
+                client_id TEXT NOT NULL,
+                params TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS tasks (
+                job_id TEXT NOT NULL,
+                seq INTEGER NOT NULL,
+                item TEXT NOT NULL,
+                status TEXT NOT NULL,
+                error TEXT,
+                started_at REAL,
+                finished_at REAL,
+                PRIMARY KEY (job_id, seq)
+            );
+        """)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def register(self, kind: str, handler):
+        """handler(job: dict, item: str) is awaited once per task; raising marks the task failed."""
+        self.handlers[kind] = handler
+
+    # --------------------------
+    # Persistence
+    # --------------------------
+
+    def create_job(self, kind: str, client_id: str, items: list, params: dict = None) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT INTO jobs (id, kind, client_id, params, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, client_id, json.dumps(params or {}), PENDING, now, now)
+        )
+        conn.executemany(
+            "INSERT INTO tasks (job_id, seq, item, status) VALUES (?, ?, ?, ?)",
+            [(job_id, seq, item, PENDING) for seq, item in enumerate(items)]
+        )
+        conn.commit()
+        return job_id
+
+    def _set_job(self, job_id, status, error=None):
+        conn = self._conn()
+        conn.execute("UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?", (status, error, time.time(), job_id))
+        conn.commit()
+
+    def _set_task(self, job_id, seq, status, error=None):
+        now = time.time()
+        conn = self._conn()
+        if status == RUNNING:
+            conn.execute("UPDATE tasks SET status = ?, started_at = ? WHERE job_id = ? AND seq = ?", (status, now, job_id, seq))
+        else:
+            conn.execute("UPDATE tasks SET status = ?, error = ?, finished_at = ? WHERE job_id = ? AND seq = ?",
+                         (status, error, now, job_id, seq))
+        conn.commit()
+
+    def get_job(self, job_id: str, include_tasks: bool = True):
+        conn = self._conn()
+        row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["params"] = json.loads(job["params"])
+        counts = {status: count for status, count in
+                  conn.execute("SELECT status, COUNT(*) FROM tasks WHERE job_id = ? GROUP BY status", (job_id,))}
+        job["progress"] = {
+            "total": sum(counts.values()),
+            "done": counts.get(DONE, 0),
+            "failed": counts.get(FAILED, 0),
+            "running": counts.get(RUNNING, 0),
+            "pending": counts.get(PENDING, 0)
+        }
+        if include_tasks:
+            job["tasks"] = [dict(t) for t in conn.execute("SELECT seq, item, status, error, started_at, finished_at FROM tasks WHERE job_id = ? ORDER BY seq", (job_id,))]
+        return job
+
+    def list_jobs(self, limit: int = 50):
+        rows = self._conn().execute("SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,)).fetchall()
+        return [self.get_job(r["id"], include_tasks=False) for r in rows]
+
+    # --------------------------
+    # Execution
+    # --------------------------
+
+    def start(self, job_id: str):
+        if job_id not in self.running:
+            self.running[job_id] = asyncio.create_task(self._run(job_id))
+        return self.running[job_id]
+
+    def resume_pending(self):
+        """Restart jobs a previous process left unfinished; tasks that were mid-flight run again."""
+        conn = self._conn()
+        job_ids = [r["id"] for r in conn.execute("SELECT id FROM jobs WHERE status IN (?, ?)", (PENDING, RUNNING))]
+        if job_ids:
+            conn.execute(f"UPDATE tasks SET status = ? WHERE status = ? AND job_id IN ({','.join('?' * len(job_ids))})",
+                         (PENDING, RUNNING, *job_ids))
+            conn.commit()
+        for job_id in job_ids:
+            print(f"[Jobs] Resuming job {job_id}")
+            self.start(job_id)
+        return job_ids
+
+    async def _notify(self, job, step, status="processing", data=None, summary=False):
+        await manager.send_update(job["id"], step, status=status, data=data)
+        if summary:
+            await manager.send_update(job["client_id"], step, status=status, data=data)
+
+    async def _run_task(self, job, task, total):
+        async with self._slots:
+            self._set_task(job["id"], task["seq"], RUNNING)
+            await self._notify(job, f"Processing {task['seq'] + 1}/{total}: {task['item']}...",
+                               data={"job_id": job["id"], "item": task["item"]}, summary=True)
+            try:
+                await self.handlers[job["kind"]](job, task["item"])
+                self._set_task(job["id"], task["seq"], DONE)
+            except Exception as e:
+                print(f"[Jobs] Task {task['item']} of job {job['id']} failed: {e}")
+                self._set_task(job["id"], task["seq"], FAILED, str(e))
+                await self._notify(job, f"Skipped {task['item']} (Error)", status="warning",
+                                   data={"job_id": job["id"], "item": task["item"]}, summary=True)
+
+    async def _run(self, job_id):
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.workers)
+        try:
+            job = self.get_job(job_id)
+            self._set_job(job_id, RUNNING)
+            pending = [t for t in job["tasks"] if t["status"] == PENDING]
+            total = len(job["tasks"])
+            await asyncio.gather(*(self._run_task(job, t, total) for t in pending))
+
+            progress = self.get_job(job_id, include_tasks=False)["progress"]
+            self._set_job(job_id, DONE)
+            await self._notify(job, f"Batch Complete! Processed {progress['done']} files.", status="complete",
+                               data={"job_id": job_id, **progress}, summary=True)
+        except asyncio.CancelledError:
+            # Shutdown: leave the job RUNNING so it resumes on next start
+            raise
+        except Exception as e:
+            print(f"[Jobs] Job {job_id} failed: {e}")
+            self._set_job(job_id, FAILED, str(e))
+            await manager.send_update(job_id, f"Batch Error: {str(e)}", status="error")
+        finally:
+            self.running.pop(job_id, None)
+
+job_manager = JobManager()
@@ -0,0 +1,337 @@
+import os
+import re
+import threading
+import time
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+from pyarrow import fs as pafs
+from app.integration.minio_client import MinioClient
+
+AGGREGATE_TRIGGERS = ["how many", "count", "number of", "total", "average", "avg", "sum of", "minimum", "maximum"]
+# Whole words only: "country" must not trigger "count"
+AGGREGATE_TRIGGER_RE = re.compile(r"\b(?:" + "|".join(re.escape(t) for t in AGGREGATE_TRIGGERS) + r")\b")
+
+# Words that never name a table, column or filter value
+AGGREGATE_STOP_WORDS = {
+    "how", "many", "much", "count", "number", "of", "total", "the", "a", "an", "are", "is", "there", "in", "with",
+    "where", "whose", "have", "has", "do", "does", "we", "i", "our", "my", "what", "which", "records", "rows",
+    "entries", "average", "avg", "sum", "minimum", "min", "maximum", "max", "per", "by", "each", "for", "and",
+    "from", "that", "who", "all", "me", "tell", "show", "give", "equal", "equals", "to",
+    # Verbs and prepositions that connect a table to its filter values ("customers who live in Berlin")
+    "live", "lives", "living", "reside", "resides", "located", "based", "work", "works", "working", "at", "on",
+    "was", "were", "be", "been", "being", "currently", "still", "registered", "called", "named"
+}
+# Longest multi-word value tried, e.g. "new york", "rio de janeiro"
+AGGREGATE_MAX_VALUE_WORDS = 3
+
+# Buckets/prefixes scanned for Parquet tables: OM/DB syncs and archived uploads
+LAKE_LOCATIONS = [("data-lake", "sources/"), ("raw-data", "")]
+TABLE_LIST_TTL = 60
+# Prompt words are bound to filter values from a per-table sample of distinct values, not by scanning
+LAKE_VALUE_SAMPLE_ROWS = int(os.getenv("LAKE_VALUE_SAMPLE_ROWS", "100000"))
+LAKE_VALUE_MAX_DISTINCT = int(os.getenv("LAKE_VALUE_MAX_DISTINCT", "10000"))
+
+def is_aggregate_prompt(prompt: str) -> bool:
+    return AGGREGATE_TRIGGER_RE.search(prompt.lower()) is not None
+
+def _table_key(path: str) -> str:
+    """Lake path -> table key: "postgres/shop/customers" for data-lake sources, "raw-data/customers" for uploads."""
+    bucket, _, key = os.path.splitext(path)[0].partition("/")
+    return key[len("sources/"):] if bucket == "data-lake" and key.startswith("sources/") else f"{bucket}/{key}"
+
+def _table_name(table_key: str) -> str:
+    return table_key.rsplit("/", 1)[-1].lower()
+
+def _text_columns(schema) -> list:
+    return [name for name in schema.names
+            if pa.types.is_string(schema.field(name).type) or pa.types.is_large_string(schema.field(name).type)]
+
+def _singular(word: str) -> str:
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+class LakeQueryEngine:
+    """
+    Answers aggregate questions ("how many customers in Berlin?") exactly, straight from
+    the Parquet tables in MinIO. Filters are pushed into pyarrow.dataset scans, so only the
+    referenced columns are read and unfiltered counts come from Parquet footers.
+    """
+    _instance = None
+
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super(LakeQueryEngine, cls).__new__(cls)
+        return cls._instance
+
+    def __init__(self):
+        if not hasattr(self, 'fs'):
+            minio = MinioClient()
+            self.fs = pafs.S3FileSystem(
+                access_key=minio.access_key,
+                secret_key=minio.secret_key,
+                endpoint_override=minio.endpoint,
+                scheme="http",
+                region="us-east-1"
+            )
+            self._tables = None
+            self._tables_loaded_at = 0
+            self._datasets = {} # table key -> (file listing it was built from, pyarrow Dataset)
+            self._value_indexes = {} # table key -> (file listing it was built from, value index)
+            self._lock = threading.Lock()
+
+    # --------------------------
+    # Catalog
+    # --------------------------
+
+    def list_tables(self):
+        """
+        {table_key: [(parquet path, mtime)]} for every table in the lake (cached briefly).
+        Tables are keyed by source and path, so same-named files in different sources stay apart.
+        """
+        with self._lock:
+            if self._tables is not None and time.monotonic() - self._tables_loaded_at < TABLE_LIST_TTL:
+                return self._tables
+            tables = {}
+            for bucket, prefix in LAKE_LOCATIONS:
+                try:
+                    infos = self.fs.get_file_info(pafs.FileSelector(f"{bucket}/{prefix}".rstrip("/"), recursive=True, allow_not_found=True))
+                except Exception as e:
+                    print(f"[LakeQuery] Could not list {bucket}/{prefix}: {e}")
+                    continue
+                for info in infos:
+                    if info.type == pafs.FileType.File and info.path.endswith(".parquet"):
+                        tables.setdefault(_table_key(info.path), []).append((info.path, info.mtime_ns))
+            self._tables = tables
+            self._tables_loaded_at = time.monotonic()
+            return tables
+
+    def _dataset(self, table_name):
+        entries = self.list_tables()[table_name]
+        key = tuple(entries)
+        cached = self._datasets.get(table_name)
+        if cached is None or cached[0] != key:
+            dataset = ds.dataset([path for path, _ in entries], filesystem=self.fs, format="parquet")
+            self._datasets[table_name] = (key, dataset)
+            return dataset
+        return cached[1]
+
+    def _value_index(self, table_name):
+        """
+        {"columns": {text column: set of lower-cased values}, "complete": bool} from the first
+        LAKE_VALUE_SAMPLE_ROWS rows. Columns with more than LAKE_VALUE_MAX_DISTINCT distinct
+        values (names, ids) are left out. "complete" means the sample is the whole table.
+        """
+        key = tuple(self.list_tables()[table_name])
+        cached = self._value_indexes.get(table_name)
+        if cached is not None and cached[0] == key:
+            return cached[1]
+        dataset = self._dataset(table_name)
+        text_columns = _text_columns(dataset.schema)
+        sample = dataset.head(LAKE_VALUE_SAMPLE_ROWS, columns=text_columns) if text_columns else None
+        columns = {}
+        for name in text_columns:
+            values = pc.unique(pc.utf8_lower(sample[name]))
+            if len(values) <= LAKE_VALUE_MAX_DISTINCT:
+                columns[name] = {value for value in values.to_pylist() if value is not None}
+        index = {"columns": columns, "complete": sample is None or sample.num_rows < LAKE_VALUE_SAMPLE_ROWS}
+        self._value_indexes[table_name] = (key, index)
+        return index
+
+    def resolve_table(self, words: list) -> list:
+        """
+        Keys of the table named in the prompt (plural/singular tolerant). More than one key
+        means the name exists in several sources and the prompt's other words (source type,
+        database, bucket) didn't pick one.
+        """
+        by_name = {}
+        for key in self.list_tables():
+            by_name.setdefault(_table_name(key), []).append(key)
+        by_singular = {_singular(name): name for name in by_name}
+        for word in words:
+            name = word if word in by_name else by_singular.get(_singular(word))
+            if name is None:
+                continue
+            keys = sorted(by_name[name])
+            if len(keys) > 1:
+                qualified = [key for key in keys if set(key.lower().split("/")[:-1]) & set(words)]
+                keys = qualified or keys
+            return keys
+        return []
+
+    # --------------------------
+    # Planning & execution
+    # --------------------------
+
+    def plan(self, prompt: str):
+        """
+        Turn an aggregate prompt into {table, op, value_column, group_by, filters}, or None
+        when no lake table is referenced or a term can't be bound to the data (the caller
+        then falls back to retrieval rather than answering an exact number for the wrong
+        question). Filters are (column or None, value); None means "any text column equals
+        value". A term is only bound when it names a column or is a value in the table's
+        value sample (see _value_index), so binding never scans the table.
+        """
+        # Keep "@", "." and "-" inside values (emails, hostnames) but not at word edges ("customers.")
+        words = [word for word in (w.strip(".-") for w in re.findall(r"[\w@.\-]+", prompt.lower())) if word]
+        keys = self.resolve_table(words)
+        if not keys:
+            return None
+        if len(keys) > 1:
+            # Same-named tables in several sources: ask rather than pick one (or add them up)
+            return {"table": _table_name(keys[0]), "ambiguous": keys}
+        table = keys[0]
+        # Words naming the table's source / database / bucket aren't filters
+        qualifiers = set(table.lower().split("/"))
+
+        dataset = self._dataset(table)
+        schema = dataset.schema
+        index = self._value_index(table)
+        columns = {name.lower(): name for name in schema.names}
+        numeric = {name.lower() for name in schema.names
+                   if pa.types.is_integer(schema.field(name).type) or pa.types.is_floating(schema.field(name).type)}
+
+        prompt_lower = prompt.lower()
+        op = "count"
+        if "average" in words or "avg" in words: op = "mean"
+        elif re.search(r"\bsum of\b", prompt_lower) or ("total" in words and not re.search(r"\bhow many\b", prompt_lower)): op = "sum"
+        elif "minimum" in words or "min" in words: op = "min"
+        elif "maximum" in words or "max" in words: op = "max"
+
+        value_column = None
+        group_by = None
+        filters = []
+        skip = set()
+        for i, word in enumerate(words):
+            if i in skip:
+                continue
+            # Multi-word values first, so "new york" isn't read as "new" + "york"
+            phrase = self._bind_phrase(index, words, i)
+            if phrase is not None:
+                (column, value), length = phrase
+                filters.append((column, value))
+                skip.update(range(i, i + length))
+                continue
+            if word in AGGREGATE_STOP_WORDS or word in qualifiers or _singular(word) == _singular(_table_name(table)):
+                continue
+            column = columns.get(word) or columns.get(_singular(word))
+            if column:
+                prev = words[i - 1] if i > 0 else ""
+                if prev in ("per", "by", "each"):
+                    group_by = column
+                elif op != "count" and value_column is None and column.lower() in numeric:
+                    value_column = column
+                elif i + 1 < len(words) and words[i + 1] not in AGGREGATE_STOP_WORDS:
+                    # "<column> <value>", e.g. "status active", "city new york"
+                    known = index["columns"].get(column)
+                    value_words = 1
+                    if known is not None:
+                        value_words = next((n for n in range(AGGREGATE_MAX_VALUE_WORDS, 0, -1)
+                                            if " ".join(words[i + 1:i + 1 + n]) in known), 0)
+                        if not value_words and index["complete"]:
+                            return None
+                    value_words = value_words or 1
+                    filters.append((column, " ".join(words[i + 1:i + 1 + value_words])))
+                    skip.update(range(i + 1, i + 1 + value_words))
+                continue
+            # Free-standing term: must be a sampled value, e.g. "berlin" -> city
+            bound = self._bind_value(index, word)
+            if bound is None:
+                return None
+            filters.append(bound)
+
+        if op != "count" and value_column is None:
+            op = "count"
+        return {"table": table, "op": op, "value_column": value_column, "group_by": group_by, "filters": filters}
+
+    def _bind_value(self, index, value):
+        """(column, value) for a sampled value; column is None when several columns hold it."""
+        matches = [name for name, known in index["columns"].items() if value in known]
+        if not matches:
+            return None
+        return (matches[0] if len(matches) == 1 else None, value)
+
+    def _bind_phrase(self, index, words, start):
+        """((column, value), word count) for the longest multi-word value starting at words[start]."""
+        for n in range(min(AGGREGATE_MAX_VALUE_WORDS, len(words) - start), 1, -1):
+            bound = self._bind_value(index, " ".join(words[start:start + n]))
+            if bound is not None:
+                return bound, n
+        return None
+
+    def _filter_expression(self, schema, filters):
+        text_columns = _text_columns(schema)
+        expr = None
+        for column, value in filters:
+            if column is not None:
+                clause = pc.utf8_lower(ds.field(column).cast(pa.string())) == value
+            else:
+                if not text_columns:
+                    continue
+                clause = None
+                for name in text_columns:
+                    col_clause = pc.utf8_lower(ds.field(name)) == value
+                    clause = col_clause if clause is None else (clause | col_clause)
+            expr = clause if expr is None else (expr & clause)
+        return expr
+
+    def execute(self, plan: dict) -> dict:
+        dataset = self._dataset(plan["table"])
+        expr = self._filter_expression(dataset.schema, plan["filters"])
+        start = time.perf_counter()
+
+        if plan["group_by"]:
+            value_col = plan["value_column"] or plan["group_by"]
+            agg = "count" if plan["op"] == "count" else plan["op"]
+            columns = list({plan["group_by"], value_col})
+            table = dataset.to_table(columns=columns, filter=expr)
+            grouped = table.group_by(plan["group_by"]).aggregate([(value_col, agg)])
+            result = sorted(zip(grouped[plan["group_by"]].to_pylist(), grouped[f"{value_col}_{agg}"].to_pylist()),
+                            key=lambda item: item[1] if item[1] is not None else 0, reverse=True)
+        elif plan["op"] == "count":
+            # No projection needed: footers answer unfiltered counts, filters read only their columns
+            result = dataset.count_rows(filter=expr)
+        else:
+            column = dataset.to_table(columns=[plan["value_column"]], filter=expr)[plan["value_column"]]
+            result = getattr(pc, plan["op"])(column).as_py()
+
+        return {**plan, "result": result, "elapsed_ms": (time.perf_counter() - start) * 1000}
+
+    def answer(self, prompt: str):
+        """
+        Plan + execute. Returns None if the prompt doesn't map onto a lake table, and the
+        plan with "ambiguous" (the candidate tables) when the table name isn't unique.
+        """
+        try:
+            plan = self.plan(prompt)
+            if plan is None or plan.get("ambiguous"):
+                return plan
+            return self.execute(plan)
+        except Exception as e:
+            print(f"[LakeQuery] Aggregate query failed, falling back to search: {e}")
+            return None
+
+def format_aggregate_answer(outcome: dict) -> str:
+    table = outcome["table"]
+    if outcome.get("ambiguous"):
+        options = ", ".join(f"**{key}**" for key in outcome["ambiguous"])
+        return (f"There is more than one **{table}** table in the data lake: {options}. "
+                f"Which one do you mean? Name its source in the question, e.g. \"how many {table} in {outcome['ambiguous'][0].split('/')[0]}\".")
+    conditions = [f"{col} = {val}" if col else f"'{val}'" for col, val in outcome["filters"]]
+    where = f" matching {' and '.join(conditions)}" if conditions else ""
+    op_label = {"count": "count", "sum": "total", "mean": "average", "min": "minimum", "max": "maximum"}[outcome["op"]]
+
+    if outcome["group_by"]:
+        lines = [f"{op_label.capitalize()} of {outcome['value_column'] or 'records'} in **{table}**{where}, per {outcome['group_by']}:\n\n"]
+        for key, value in outcome["result"][:20]:
+            lines.append(f"- {key}: **{value}**\n")
+        if len(outcome["result"]) > 20:
+            lines.append(f"- ... and {len(outcome['result']) - 20} more groups\n")
+        return "".join(lines)
+
+    if outcome["op"] == "count":
+        return f"There are exactly **{outcome['result']:,}** records in **{table}**{where}."
+    return f"The {op_label} {outcome['value_column']} in **{table}**{where} is **{outcome['result']}**."
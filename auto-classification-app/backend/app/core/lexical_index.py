@@ -0,0 +1,108 @@
+import math
+import re
+import threading
+from collections import defaultdict
+from ..integration.vector_store import matches_where, matches_where_document
+
+TOKEN_RE = re.compile(r"\w+")
+
+def tokenize(text: str) -> list:
+    return TOKEN_RE.findall((text or "").lower())
+
+class BM25Index:
+    """
+    Incremental in-memory inverted index with Okapi BM25 scoring.
+    Holds the same row documents as the vector store, keyed by vector id,
+    so lexical and semantic rankings can be fused.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = defaultdict(dict) # term -> {doc_id: term frequency}
+        self.doc_terms = {}               # doc_id -> {term: tf}, to undo postings on update/delete
+        self.doc_len = {}
+        self.documents = {}
+        self.metadatas = {}
+        self.total_len = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.doc_len)
+
+    def _remove(self, doc_id):
+        terms = self.doc_terms.pop(doc_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            posting = self.postings.get(term)
+            if posting is not None:
+                posting.pop(doc_id, None)
+                if not posting:
+                    del self.postings[term]
+        self.total_len -= self.doc_len.pop(doc_id)
+        self.documents.pop(doc_id, None)
+        self.metadatas.pop(doc_id, None)
+
+    def add(self, ids, documents, metadatas=None):
+        """Insert or replace documents."""
+        metadatas = metadatas or [{}] * len(ids)
+        with self._lock:
+            for doc_id, document, meta in zip(ids, documents, metadatas):
+                self._remove(doc_id)
+                terms = defaultdict(int)
+                tokens = tokenize(document)
+                for token in tokens:
+                    terms[token] += 1
+                for term, tf in terms.items():
+                    self.postings[term][doc_id] = tf
+                self.doc_terms[doc_id] = dict(terms)
+                self.doc_len[doc_id] = len(tokens)
+                self.documents[doc_id] = document
+                self.metadatas[doc_id] = meta or {}
+                self.total_len += len(tokens)
+
+    def remove(self, ids):
+        with self._lock:
+            for doc_id in ids:
+                self._remove(doc_id)
+
+    def search(self, query: str, n_results: int = 10, where=None, where_document=None) -> list:
+        """
+        Returns [(doc_id, score)] best first. Only posting lists of the query terms are touched.
+        """
+        with self._lock:
+            n_docs = len(self.doc_len)
+            if n_docs == 0:
+                return []
+            avg_len = self.total_len / n_docs
+
+            scores = defaultdict(float)
+            for term in set(tokenize(query)):
+                posting = self.postings.get(term)
+                if not posting:
+                    continue
+                df = len(posting)
+                idf = math.log(1 + (n_docs - df + 0.5) / (df + 0.5))
+                for doc_id, tf in posting.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.doc_len[doc_id] / avg_len)
+                    scores[doc_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            if where or where_document:
+                ranked = [
+                    (doc_id, score) for doc_id, score in ranked
+                    if matches_where(self.metadatas[doc_id], where) and matches_where_document(self.documents[doc_id], where_document)
+                ]
+            return ranked[:n_results]
+
+def reciprocal_rank_fusion(rankings: list, k: int = 60) -> list:
+    """
+    Fuse several ranked id lists: score(id) = sum(1 / (k + rank)).
+    Returns ids best first.
+    """
+    fused = defaultdict(float)
+    for ranking in rankings:
+        for rank, doc_id in enumerate(ranking, start=1):
+            fused[doc_id] += 1.0 / (k + rank)
+    return [doc_id for doc_id, _ in sorted(fused.items(), key=lambda item: item[1], reverse=True)]
@@ -0,0 +1,60 @@
+import time
+from contextlib import contextmanager
+from prometheus_client import Histogram, Gauge, CONTENT_TYPE_LATEST, generate_latest
+
+# Stage names used across the app: profile, classify, om_sync, om_list_tables, parquet_convert,
+# minio_upload, embed, vector_upsert, vector_query, lexical_query
+STAGE_DURATION = Histogram(
+    "classifier_stage_duration_seconds", "Duration of an ingestion/query stage", ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+)
+STAGE_ROWS_PER_SECOND = Histogram(
+    "classifier_stage_rows_per_second", "Rows processed per second by a stage", ["stage"],
+    buckets=(10, 100, 1e3, 1e4, 1e5, 1e6, 1e7)
+)
+STAGE_BYTES = Histogram(
+    "classifier_stage_bytes", "Bytes handled by a stage", ["stage"],
+    buckets=(1e3, 1e4, 1e5, 1e6, 1e7, 1e8, 1e9, 1e10)
+)
+REQUEST_DURATION = Histogram(
+    "classifier_http_request_duration_seconds", "HTTP request latency", ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+
+class StageTimer:
+    """Yielded by track(); set .rows / .bytes once they are known inside the block."""
+    __slots__ = ("rows", "bytes", "seconds")
+
+    def __init__(self, rows=None, nbytes=None):
+        self.rows = rows
+        self.bytes = nbytes
+        self.seconds = None
+
+@contextmanager
+def track(stage: str, rows: int = None, nbytes: int = None):
+    """
+    Time a block and record it under `stage`. Safe to use from threadpool workers.
+        with track("embed", rows=len(texts)):
+            ...
+    """
+    timer = StageTimer(rows, nbytes)
+    start = time.perf_counter()
+    try:
+        yield timer
+    finally:
+        timer.seconds = time.perf_counter() - start
+        STAGE_DURATION.labels(stage).observe(timer.seconds)
+        if timer.rows and timer.seconds > 0:
+            STAGE_ROWS_PER_SECOND.labels(stage).observe(timer.rows / timer.seconds)
+        if timer.bytes:
+            STAGE_BYTES.labels(stage).observe(timer.bytes)
+
+def register_gauge(name: str, description: str, func):
+    """Gauge sampled at scrape time, e.g. cache sizes."""
+    gauge = Gauge(name, description)
+    gauge.set_function(func)
+    return gauge
+
+def render_metrics():
+    """(body, content type) for the /metrics endpoint."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,125 @@
+import hashlib
+import os
+import tempfile
+import threading
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import pdfplumber
+
+# Worker processes for page extraction; pages are handed out in runs of PDF_PAGES_PER_TASK
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "8"))
+# Stop at the first run of pages that contains a table instead of scanning the whole document
+PDF_EARLY_STOP = os.getenv("PDF_EARLY_STOP", "false").lower() == "true"
+PDF_TABLE_CACHE_DIR = os.getenv("PDF_TABLE_CACHE_DIR", os.path.join("state", "pdf_tables"))
+
+# --------------------------
+# WORKER SIDE
+# --------------------------
+
+def _extract_pages(source, start: int, end: int):
+    """[(page_number, rows)] for every page in [start, end) that has a table."""
+    found = []
+    with pdfplumber.open(source) as pdf:
+        for number in range(start, end):
+            rows = pdf.pages[number].extract_table()
+            if rows:
+                found.append((number, rows))
+    return found
+
+# --------------------------
+# PARENT SIDE
+# --------------------------
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            # "spawn" so workers don't inherit the parent's model/index state through fork
+            _executor = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=mp.get_context("spawn"))
+            print(f"DEBUG: Started PDF extraction pool ({PDF_WORKERS} workers)")
+        return _executor
+
+def shutdown_pdf_pool():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=True, cancel_futures=True)
+            _executor = None
+
+def _file_hash(source) -> str:
+    hasher = hashlib.sha256()
+    if isinstance(source, str):
+        with open(source, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                hasher.update(chunk)
+    else:
+        hasher.update(source.getvalue())
+    return hasher.hexdigest()
+
+def _scan(source, page_count: int, early_stop: bool):
+    """Tables in page order. Runs of pages go to the pool; results are consumed in order so early stop can cancel the rest."""
+    ranges = [(start, min(start + PDF_PAGES_PER_TASK, page_count)) for start in range(0, page_count, PDF_PAGES_PER_TASK)]
+    tables = []
+    # Small documents (and in-memory sources, e.g. decompressed uploads) aren't worth a round trip to the pool
+    if len(ranges) == 1 or PDF_WORKERS <= 1 or not isinstance(source, str):
+        for start, end in ranges:
+            if hasattr(source, "seek"):
+                source.seek(0)
+            tables += _extract_pages(source, start, end)
+            if early_stop and tables:
+                break
+        return tables
+
+    futures = [_get_executor().submit(_extract_pages, source, start, end) for start, end in ranges]
+    for i, future in enumerate(futures):
+        tables += future.result()
+        if early_stop and tables:
+            for pending in futures[i + 1:]:
+                pending.cancel()
+            break
+    return tables
+
+def _merge(tables) -> pd.DataFrame:
+    """One DataFrame from every table sharing the first table's header (e.g. a table continued across pages)."""
+    header = tables[0][1][0]
+    rows = [row for _, extracted in tables if extracted[0] == header for row in extracted[1:]]
+    skipped = sum(1 for _, extracted in tables if extracted[0] != header)
+    if skipped:
+        print(f"DEBUG: PDF has {skipped} other table(s) with a different header; using the first table's")
+    return pd.DataFrame(rows, columns=header)
+
+def extract_table(source, early_stop: bool = PDF_EARLY_STOP) -> pd.DataFrame:
+    """
+    Main table of a PDF (path or in-memory file): pages are extracted across the process
+    pool and tables with the first table's header are merged. Results are cached by file hash.
+    """
+    cache_path = os.path.join(PDF_TABLE_CACHE_DIR, f"{_file_hash(source)}{'-first' if early_stop else ''}.pkl")
+    if os.path.exists(cache_path):
+        return pd.read_pickle(cache_path)
+
+    if hasattr(source, "seek"):
+        source.seek(0)
+    with pdfplumber.open(source) as pdf:
+        page_count = len(pdf.pages)
+
+    tables = _scan(source, page_count, early_stop)
+    if not tables:
+        raise ValueError("No tables found in PDF")
+    df = _merge(tables)
+
+    os.makedirs(PDF_TABLE_CACHE_DIR, exist_ok=True)
+    # Unique temp name: concurrent extractions of the same file each write their own copy
+    fd, tmp_path = tempfile.mkstemp(dir=PDF_TABLE_CACHE_DIR, suffix=".pkl.tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            df.to_pickle(f)
+        os.replace(tmp_path, cache_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return df
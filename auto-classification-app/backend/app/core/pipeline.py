@@ -0,0 +1,56 @@
+import asyncio
+import time
+from .ws_manager import manager
+
+class Pipeline:
+    """
+    Minimal async DAG runner for ingestion. Each stage starts as soon as the stages it
+    depends on have finished, so independent branches overlap and end-to-end latency is
+    the longest branch instead of the sum of all stages. Per-stage timings are sent to
+    the client's WebSocket channel as each stage completes.
+    """
+
+    def __init__(self, client_id: str):
+        self.client_id = client_id
+        self.stages = {}  # name -> (func, deps)
+        self.tasks = {}   # name -> asyncio.Task
+        self.timings = {}
+        self.started_at = None
+
+    def add(self, name: str, func, deps: list = None):
+        """func(results) is awaited with {dep_name: dep_result} once every dependency is done."""
+        self.stages[name] = (func, deps or [])
+        return self
+
+    def start(self):
+        self.started_at = time.perf_counter()
+        for name in self.stages:
+            self._task(name)
+        return self
+
+    def _task(self, name):
+        if name not in self.tasks:
+            func, deps = self.stages[name]
+            dep_tasks = {dep: self._task(dep) for dep in deps}
+            self.tasks[name] = asyncio.create_task(self._run_stage(name, func, dep_tasks))
+        return self.tasks[name]
+
+    async def _run_stage(self, name, func, dep_tasks):
+        # A failed dependency fails its dependents with the same exception
+        results = {dep: await task for dep, task in dep_tasks.items()}
+        start = time.perf_counter()
+        try:
+            return await func(results)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = round(elapsed, 3)
+            await manager.send_update(self.client_id, f"Stage '{name}' finished in {elapsed:.2f}s",
+                                      data={"stage": name, "seconds": round(elapsed, 3)})
+
+    async def result(self, name: str):
+        return await self.tasks[name]
+
+    async def wait(self):
+        """Wait for every stage; returns {stage: seconds} plus the wall-clock total."""
+        await asyncio.gather(*self.tasks.values())
+        return {"stages": dict(self.timings), "total_seconds": round(time.perf_counter() - self.started_at, 3)}
@@ -1,77 +1,92 @@
+import os
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 import json
-import yaml
-import pdfplumber
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from .readers import read_dataset
+
+PROFILE_SAMPLE_SIZE = int(os.getenv("PROFILE_SAMPLE_SIZE", "5"))
+
+@dataclass(slots=True)
+class ColumnProfile:
+    """
+    One profiled column: bounded samples + statistics, plus the column values as an
+    Arrow array for the classifier. For numeric and Arrow-backed string columns the
+    array shares the DataFrame's buffers (no copy); release() drops it once classified.
+    """
+    name: str
+    datatype: str
+    null_count: int
+    distinct_count: int
+    samples: List[str] = field(default_factory=list)
+    values: Optional[pa.Array] = None
+
+    @property
+    def sample_values(self) -> str:
+        return json.dumps(self.samples)
+
+    def release(self):
+        self.values = None
+
+def _stringify(series: pd.Series) -> pa.Array:
+    return pa.array(series.map(str, na_action="ignore"), type=pa.large_string(), from_pandas=True)
+
+def _to_arrow(series: pd.Series) -> pa.Array:
+    try:
+        values = pa.array(series, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed-type object column: keep the str() form the classifier matches against
+        return _stringify(series)
+    if pa.types.is_nested(values.type):
+        # Lists / objects (JSON, YAML): Arrow can't hash them, and the classifier matches their str() form
+        return _stringify(series)
+    return values
+
+def _head_samples(values: pa.Array, size: int) -> List[str]:
+    """First `size` non-null values as strings, scanning forward in small windows."""
+    samples, offset = [], 0
+    while len(samples) < size and offset < len(values):
+        window = pc.drop_null(values.slice(offset, 1024))
+        samples += [str(s) for s in window.slice(0, size - len(samples)).to_pandas().tolist()]
+        offset += 1024
+    return samples
+
+def _distinct_count(values: pa.Array) -> int:
+    if values.null_count == len(values):
+        return 0
+    if pa.types.is_nested(values.type):
+        # No count_distinct kernel for list / struct arrays
+        values = _stringify(pd.Series(values.to_pylist(), dtype=object))
+    # Categoricals arrive dictionary-encoded: count the codes in use
+    return pc.count_distinct(values.indices if pa.types.is_dictionary(values.type) else values).as_py()
+
+def profile_column(name, series: pd.Series) -> ColumnProfile:
+    values = _to_arrow(series)
+    return ColumnProfile(
+        name=name,
+        datatype=str(series.dtype),
+        null_count=values.null_count,
+        distinct_count=_distinct_count(values),
+        samples=_head_samples(values, PROFILE_SAMPLE_SIZE),
+        values=values
+    )
 
 def profile_dataset(file_path: str):
     """
-    Reads a file and returns profile info:
+    Reads a file (format sniffed from its content, see readers) and returns profile info:
     - row_count
-    - columns: [{name, type, samples, null_count}]
+    - columns: [ColumnProfile]
     """
-    if file_path.endswith('.csv'):
-        df = pd.read_csv(file_path)
-    elif file_path.endswith('.json'):
-        df = pd.read_json(file_path)
-    elif file_path.endswith('.xlsx') or file_path.endswith('.xls'):
-        df = pd.read_excel(file_path)
-    elif file_path.endswith('.parquet'):
-        df = pd.read_parquet(file_path)
-    elif file_path.endswith('.xml'):
-        df = pd.read_xml(file_path)
-    elif file_path.endswith('.yaml') or file_path.endswith('.yml'):
-        with open(file_path, 'r') as f:
-            data = yaml.safe_load(f)
-        # Attempt to normalize. If list of dicts -> simple. If dict -> maybe normalize.
-        if isinstance(data, list):
-            df = pd.DataFrame(data)
-        elif isinstance(data, dict):
-            # Try to find the "main" list
-            found_list = False
-            for k, v in data.items():
-                if isinstance(v, list) and len(v) > 0 and isinstance(v[0], dict):
-                    df = pd.DataFrame(v)
-                    found_list = True
-                    break
-            if not found_list:
-                df = pd.json_normalize(data)
-    elif file_path.endswith('.pdf'):
-         with pdfplumber.open(file_path) as pdf:
-             # Heuristic: Extract first found table
-             tables = []
-             for page in pdf.pages:
-                 extracted = page.extract_table()
-                 if extracted:
-                     tables.append(pd.DataFrame(extracted[1:], columns=extracted[0]))
-                     
-             if not tables:
-                 raise ValueError("No tables found in PDF")
-             
-             # Concatenate all tables with same schema? Or just take first.
-             # For MVP, assume one main table or take first.
-             df = tables[0]
-    else:
-        raise ValueError("Unsupported file type")
+    df = read_dataset(file_path)
     
     full_df = df # Consistent naming with previous valid logic
     
     row_count = len(full_df)
     
-    columns_profile = []
-    # ... rest of the function (omitted for brevity in replace_file_content but I will return both)
-    # Actually I need the full function to ensure I don't break the profile dictionary
-    for col in full_df.columns:
-        series = full_df[col]
-        datatype = str(series.dtype)
-        sample_list = series.dropna().head(5).tolist()
-        str_samples = [str(s) for s in sample_list]
-        
-        columns_profile.append({
-            "name": col,
-            "datatype": datatype,
-            "sample_values": json.dumps(str_samples),
-            "series": series
-        })
+    columns_profile = [profile_column(col, full_df[col]) for col in full_df.columns]
     
     return {
         "row_count": row_count,
@@ -0,0 +1,107 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "512"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", "300"))
+
+def normalize_prompt(prompt: str) -> str:
+    """Case/whitespace-insensitive form of a prompt, used as cache key."""
+    return " ".join(prompt.lower().split()).rstrip("?!. ")
+
+class QueryCache:
+    """
+    Async response cache with TTL + LRU eviction and request coalescing:
+    concurrent requests for the same key await a single computation.
+    """
+
+    def __init__(self, max_entries: int = QUERY_CACHE_SIZE, ttl_seconds: float = QUERY_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict() # key -> (expires_at, value)
+        self.inflight = {}           # key -> asyncio.Future
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        # invalidate() may be called from threadpool workers, so it only bumps a counter;
+        # the event loop side notices and clears
+        self._generation = 0
+        self._seen_generation = 0
+
+    def _get(self, key):
+        if self._seen_generation != self._generation:
+            self._seen_generation = self._generation
+            self.entries.clear()
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def _put(self, key, value):
+        self.entries[key] = (time.monotonic() + self.ttl_seconds, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def get_or_compute(self, key, compute):
+        """
+        Return the cached value for key, or await compute() (a zero-arg coroutine factory).
+        Failures are not cached; every waiter of a failed computation gets the exception.
+        """
+        if self.max_entries <= 0:
+            return await compute()
+
+        entry = self._get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[1]
+
+        pending = self.inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            # shield: one cancelled waiter must not cancel the shared computation
+            return await asyncio.shield(pending)
+
+        self.misses += 1
+        generation = self._generation
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so an un-awaited failure doesn't log "exception never retrieved"
+            future.exception()
+            raise
+        else:
+            future.set_result(value)
+            # Don't store an answer computed against an index that changed meanwhile
+            if generation == self._generation:
+                self._put(key, value)
+            return value
+        finally:
+            self.inflight.pop(key, None)
+
+    def invalidate(self):
+        """Drop every cached answer (in-flight computations still complete for their waiters). Thread-safe."""
+        self._generation += 1
+
+    def stats(self):
+        return {
+            "entries": len(self.entries),
+            "inflight": len(self.inflight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced
+        }
+
+query_cache = QueryCache()
@@ -0,0 +1,173 @@
+import csv
+import io
+import json
+import os
+import pandas as pd
+from pandas.io.parsers import TextParser
+import pyarrow as pa
+import pyarrow.json as pa_json
+
+from .flatten import read_json_records, read_yaml_records
+from .pdf_tables import extract_table
+from .uploads import sniff_format
+
+try:
+    from lxml import etree
+except ImportError: # pd.read_xml fallback
+    etree = None
+
+SNIFF_BYTES = 64 * 1024
+COMPRESSIONS = {"gzip": "gzip", "zstd": "zstd"}
+COMPRESSED_SUFFIXES = (".gz", ".gzip", ".zst", ".zstd")
+CSV_DELIMITERS = ",;\t|"
+
+# format -> reader(path, compression, head) -> DataFrame
+READERS = {}
+
+def register_reader(*formats):
+    def decorator(func):
+        for fmt in formats:
+            READERS[fmt] = func
+        return func
+    return decorator
+
+def _open(path: str, compression: str = None):
+    """Binary stream over the (decompressed) file contents."""
+    return pa.input_stream(path, compression=compression)
+
+def _seekable(path: str, compression: str = None):
+    """Readers that seek (Excel, YAML) need the decompressed bytes in memory."""
+    if compression is None:
+        return path
+    with _open(path, compression) as stream:
+        return io.BytesIO(stream.read())
+
+def detect_format(file_path: str):
+    """
+    (format, compression) from the file's leading bytes. Compressed files are sniffed
+    on their decompressed head; the extension only breaks ties between text formats.
+    """
+    with open(file_path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    name = os.path.basename(file_path)
+    fmt = sniff_format(head, name)
+    compression = COMPRESSIONS.get(fmt)
+    if compression:
+        with _open(file_path, compression) as stream:
+            head = stream.read(SNIFF_BYTES)
+        for suffix in COMPRESSED_SUFFIXES:
+            if name.lower().endswith(suffix):
+                name = name[:-len(suffix)]
+        fmt = sniff_format(head, name)
+    if fmt == "json" and _is_ndjson(head):
+        fmt = "ndjson"
+    return fmt, compression, head
+
+def _is_ndjson(head: bytes) -> bool:
+    """Two or more lines that each parse as a JSON object."""
+    lines = [line for line in head.splitlines() if line.strip()]
+    complete = lines[:-1] if len(lines) > 1 else lines # the last line may be cut off
+    if len(lines) < 2 or not complete:
+        return False
+    try:
+        return all(isinstance(json.loads(line), dict) for line in complete[:20])
+    except ValueError:
+        return False
+
+def read_dataset(file_path: str) -> pd.DataFrame:
+    fmt, compression, head = detect_format(file_path)
+    reader = READERS.get(fmt)
+    if reader is None:
+        raise ValueError("Unsupported file type")
+    return reader(file_path, compression, head)
+
+# --------------------------
+# Readers
+# --------------------------
+
+@register_reader("csv")
+def read_csv(path, compression, head):
+    try:
+        delimiter = csv.Sniffer().sniff(head[:head.rfind(b"\n")].decode("utf-8", "ignore"), CSV_DELIMITERS).delimiter
+    except csv.Error:
+        delimiter = ","
+    try:
+        # Arrow's multithreaded parser; types are inferred per block rather than over the whole file
+        with _open(path, compression) as stream:
+            return pd.read_csv(stream, sep=delimiter, engine="pyarrow")
+    except Exception as e:
+        # e.g. ragged rows, which only the C engine tolerates
+        print(f"pyarrow CSV reader failed ({e}), falling back to the C engine")
+        with _open(path, compression) as stream:
+            return pd.read_csv(stream, sep=delimiter)
+
+@register_reader("ndjson")
+def read_ndjson(path, compression, head):
+    with _open(path, compression) as stream:
+        return pa_json.read_json(stream, read_options=pa_json.ReadOptions(use_threads=True)).to_pandas()
+
+@register_reader("json")
+def read_json(path, compression, head):
+    # Record arrays are streamed and flattened; other layouts (e.g. pandas' column-oriented JSON) load whole
+    df = read_json_records(lambda: _open(path, compression))
+    if df is not None:
+        return df
+    with _open(path, compression) as stream:
+        return pd.read_json(io.BytesIO(stream.read()))
+
+@register_reader("xlsx", "xls")
+def read_excel(path, compression, head):
+    source = _seekable(path, compression)
+    try:
+        return pd.read_excel(source, engine="calamine")
+    except ImportError: # python-calamine not installed
+        if hasattr(source, "seek"):
+            source.seek(0)
+        return pd.read_excel(source)
+
+@register_reader("parquet")
+def read_parquet(path, compression, head):
+    return pd.read_parquet(_seekable(path, compression))
+
+@register_reader("xml")
+def read_xml(path, compression, head):
+    if etree is None:
+        with _open(path, compression) as stream:
+            return pd.read_xml(io.BytesIO(stream.read()), parser="etree")
+    # Same shape as pd.read_xml (one row per child of the root: attributes + child texts),
+    # but streamed, clearing each record once read
+    rows = []
+    depth = 0
+    with _open(path, compression) as stream:
+        for event, elem in etree.iterparse(stream, events=("start", "end"), huge_tree=True):
+            if event == "start":
+                depth += 1
+                continue
+            depth -= 1
+            if depth == 1:
+                row = {etree.QName(k).localname: v for k, v in elem.attrib.items()}
+                for child in elem:
+                    if isinstance(child.tag, str):
+                        row[etree.QName(child).localname] = child.text.strip() if child.text and child.text.strip() else None
+                if not len(elem) and elem.text and elem.text.strip():
+                    row[etree.QName(elem).localname] = elem.text.strip()
+                rows.append(row)
+                elem.clear()
+                parent = elem.getparent()
+                while parent is not None and elem.getprevious() is not None:
+                    del parent[0]
+    if not rows:
+        return pd.DataFrame()
+    # Type the string values the way pd.read_xml does (its TextParser pass: ints, floats, booleans, NaN)
+    columns = list(dict.fromkeys(key for row in rows for key in row))
+    with TextParser([[row.get(c) for c in columns] for row in rows], names=columns) as parser:
+        return parser.read()
+
+@register_reader("yaml")
+def read_yaml(path, compression, head):
+    with _open(path, compression) as stream:
+        return read_yaml_records(stream)
+
+@register_reader("pdf")
+def read_pdf(path, compression, head):
+    return extract_table(_seekable(path, compression))
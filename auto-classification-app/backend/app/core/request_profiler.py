@@ -0,0 +1,187 @@
+import cProfile
+import io
+import os
+import pstats
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+try:
+    import yappi
+except ImportError: # pyinstrument / cProfile fallbacks (event loop thread only)
+    yappi = None
+
+try:
+    from pyinstrument import Profiler as SamplingProfiler
+except ImportError: # cProfile fallback
+    SamplingProfiler = None
+
+PROFILE_HEADER = "x-profile"
+# Profiling is disabled unless this is set; X-Profile (and the /debug routes) must carry it
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILE_DIR = os.getenv("PROFILE_DIR", os.path.join("state", "profiles"))
+PROFILE_MAX_STORED = int(os.getenv("PROFILE_MAX_STORED", "50"))
+
+class RequestProfiler:
+    """
+    Opt-in per-request profiling, only available when PROFILING_TOKEN is configured.
+    A request is profiled when it carries X-Profile: <token> or while the admin toggle is armed.
+    With yappi installed the profile covers every thread (threadpool work included: query
+    answering, profile/classify stages, sync endpoints); yappi is process-wide, so one
+    request is profiled at a time and the report can include concurrent requests' work.
+    Reports are stored under PROFILE_DIR keyed by request id (newest PROFILE_MAX_STORED kept).
+    Unprofiled requests cost one header lookup.
+    """
+
+    def __init__(self, directory: str = PROFILE_DIR, max_stored: int = PROFILE_MAX_STORED):
+        self.directory = directory
+        self.max_stored = max_stored
+        self.profiles = OrderedDict() # request_id -> summary
+        self.armed = 0                # admin toggle: profile the next N requests
+        self.path_prefix = None
+        self._lock = threading.Lock()
+        self._active = threading.Lock() # yappi is process-wide: one profiled request at a time
+
+    # --------------------------
+    # Toggle
+    # --------------------------
+
+    @staticmethod
+    def enabled() -> bool:
+        return bool(PROFILING_TOKEN)
+
+    @staticmethod
+    def token_valid(token) -> bool:
+        return bool(PROFILING_TOKEN) and token == PROFILING_TOKEN
+
+    def arm(self, requests: int, path_prefix: str = None):
+        with self._lock:
+            self.armed = max(0, requests)
+            self.path_prefix = path_prefix
+
+    def status(self):
+        return {
+            "armed_requests": self.armed,
+            "path_prefix": self.path_prefix,
+            "enabled": self.enabled(),
+            "engine": self.engine(),
+            "stored": len(self.profiles)
+        }
+
+    @staticmethod
+    def engine() -> str:
+        return "yappi" if yappi else ("pyinstrument" if SamplingProfiler else "cProfile")
+
+    def wants_profile(self, request) -> bool:
+        if not PROFILING_TOKEN:
+            return False
+        header = request.headers.get(PROFILE_HEADER)
+        if header is not None:
+            return header == PROFILING_TOKEN
+        if not self.armed:
+            return False
+        with self._lock:
+            if self.armed and (not self.path_prefix or request.url.path.startswith(self.path_prefix)):
+                self.armed -= 1
+                return True
+        return False
+
+    # --------------------------
+    # Profiling
+    # --------------------------
+
+    async def profile(self, request, call_next):
+        """Run the rest of the request under a profiler; tags the response with X-Profile-Id."""
+        request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+        if not self._active.acquire(blocking=False):
+            print(f"Profiling skipped for {request.url.path}: another request is being profiled")
+            return await call_next(request)
+        try:
+            start = time.perf_counter()
+            if yappi is not None:
+                response, report, fmt = await self._profile_yappi(request, call_next)
+            elif SamplingProfiler is not None:
+                response, report, fmt = await self._profile_pyinstrument(request, call_next)
+            else:
+                response, report, fmt = await self._profile_cprofile(request, call_next)
+        finally:
+            self._active.release()
+
+        self._store(request_id, report, fmt, {
+            "request_id": request_id,
+            "method": request.method,
+            "path": request.url.path,
+            "status": response.status_code,
+            "duration_ms": round(1000 * (time.perf_counter() - start), 1),
+            "created_at": time.time(),
+            "format": fmt
+        })
+        response.headers["X-Profile-Id"] = request_id
+        return response
+
+    async def _profile_yappi(self, request, call_next):
+        # Wall clock across all threads: threadpool work shows up under its worker thread
+        yappi.set_clock_type("wall")
+        yappi.clear_stats()
+        yappi.start(builtins=False, profile_threads=True)
+        try:
+            response = await call_next(request)
+        finally:
+            yappi.stop()
+        out = io.StringIO()
+        out.write(f"{request.method} {request.url.path} - yappi, wall clock, all threads\n\n")
+        stats = yappi.convert2pstats(yappi.get_func_stats())
+        stats.stream = out
+        stats.sort_stats("cumulative").print_stats(80)
+        out.write("\nThreads:\n")
+        yappi.get_thread_stats().print_all(out=out)
+        yappi.clear_stats()
+        return response, out.getvalue(), "txt"
+
+    async def _profile_pyinstrument(self, request, call_next):
+        # async_mode attributes awaited time to the awaiting coroutine; threadpool work is not sampled
+        profiler = SamplingProfiler(interval=0.001, async_mode="enabled")
+        profiler.start()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.stop()
+        return response, profiler.output_html(), "html"
+
+    async def _profile_cprofile(self, request, call_next):
+        # Deterministic fallback; sees only the event loop thread
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            response = await call_next(request)
+        finally:
+            profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(profiler, stream=out).sort_stats("cumulative").print_stats(60)
+        return response, out.getvalue(), "txt"
+
+    def _store(self, request_id, report, fmt, summary):
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, f"{request_id}.{fmt}"), "w") as f:
+            f.write(report)
+        with self._lock:
+            self.profiles[request_id] = summary
+            while len(self.profiles) > self.max_stored:
+                old_id, old = self.profiles.popitem(last=False)
+                try:
+                    os.remove(os.path.join(self.directory, f"{old_id}.{old['format']}"))
+                except OSError:
+                    pass
+
+    def list(self):
+        with self._lock:
+            return list(reversed(self.profiles.values()))
+
+    def report_path(self, request_id: str):
+        summary = self.profiles.get(request_id)
+        if summary is None:
+            return None, None
+        return os.path.join(self.directory, f"{request_id}.{summary['format']}"), summary["format"]
+
+request_profiler = RequestProfiler()
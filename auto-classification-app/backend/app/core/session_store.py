@@ -0,0 +1,189 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# memory (per-process LRU+TTL) | sqlite (shared by all uvicorn workers on the host)
+SESSION_STORE = os.getenv("SESSION_STORE", "memory")
+SESSION_TTL = float(os.getenv("SESSION_TTL", "1800"))
+SESSION_MAX_ENTRIES = int(os.getenv("SESSION_MAX_ENTRIES", "10000"))
+SESSION_MEMORY_CAP_MB = float(os.getenv("SESSION_MEMORY_CAP_MB", "16"))
+SESSION_DB_PATH = os.getenv("SESSION_DB_PATH", os.path.join("state", "sessions.db"))
+
+class SessionStore:
+    """
+    Conversation context per client_id, e.g. {"last_entity": "Alice"}.
+    Sessions expire SESSION_TTL seconds after their last use.
+    """
+
+    def get(self, client_id: str, default=None) -> dict:
+        raise NotImplementedError
+
+    def set(self, client_id: str, context: dict):
+        raise NotImplementedError
+
+    def delete(self, client_id: str):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        raise NotImplementedError
+
+def _summarize(sizes: list, backend: str) -> dict:
+    total = sum(sizes)
+    return {
+        "backend": backend,
+        "sessions": len(sizes),
+        "bytes": total,
+        "avg_bytes_per_session": total / len(sizes) if sizes else 0,
+        "max_bytes_per_session": max(sizes) if sizes else 0
+    }
+
+class InMemorySessionStore(SessionStore):
+    """LRU + sliding TTL, bounded by entry count and total serialized size."""
+
+    def __init__(self, ttl: float = SESSION_TTL, max_entries: int = SESSION_MAX_ENTRIES,
+                 memory_cap_bytes: int = int(SESSION_MEMORY_CAP_MB * 1024 * 1024)):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.memory_cap_bytes = memory_cap_bytes
+        self.entries = OrderedDict() # client_id -> (expires_at, context, size_bytes)
+        self.total_bytes = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def _drop(self, client_id):
+        _, _, size = self.entries.pop(client_id)
+        self.total_bytes -= size
+
+    def _prune(self, now):
+        # Sliding TTL keeps LRU order == expiry order, so expired sessions sit at the front
+        while self.entries:
+            client_id, (expires_at, _, _) = next(iter(self.entries.items()))
+            if expires_at >= now:
+                break
+            self._drop(client_id)
+        while self.entries and (len(self.entries) > self.max_entries or self.total_bytes > self.memory_cap_bytes):
+            self._drop(next(iter(self.entries)))
+            self.evictions += 1
+
+    def get(self, client_id: str, default=None) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            entry = self.entries.get(client_id)
+            if entry is None:
+                return default
+            expires_at, context, size = entry
+            if expires_at < now:
+                self._drop(client_id)
+                return default
+            self.entries[client_id] = (now + self.ttl, context, size)
+            self.entries.move_to_end(client_id)
+            return dict(context)
+
+    def set(self, client_id: str, context: dict):
+        size = len(client_id) + len(json.dumps(context))
+        now = time.monotonic()
+        with self._lock:
+            if client_id in self.entries:
+                self._drop(client_id)
+            self.entries[client_id] = (now + self.ttl, dict(context), size)
+            self.total_bytes += size
+            self._prune(now)
+
+    def delete(self, client_id: str):
+        with self._lock:
+            if client_id in self.entries:
+                self._drop(client_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._prune(time.monotonic())
+            result = _summarize([size for _, _, size in self.entries.values()], "memory")
+            result["memory_cap_bytes"] = self.memory_cap_bytes
+            result["evictions"] = self.evictions
+            return result
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Shared store: every uvicorn worker on the host opens the same SQLite file (WAL mode),
+    so any worker can continue any conversation.
+    """
+
+    def __init__(self, path: str = SESSION_DB_PATH, ttl: float = SESSION_TTL, max_entries: int = SESSION_MAX_ENTRIES):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._conn()
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                client_id TEXT PRIMARY KEY,
+                context TEXT NOT NULL,
+                size_bytes INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at)")
+        conn.commit()
+
+    def _conn(self):
+        # sqlite3 connections are not shareable across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, client_id: str, default=None) -> dict:
+        # Wall clock: expiry must mean the same thing in every worker process
+        now = time.time()
+        conn = self._conn()
+        row = conn.execute("SELECT context, expires_at FROM sessions WHERE client_id = ?", (client_id,)).fetchone()
+        if row is None:
+            return default
+        if row[1] < now:
+            conn.execute("DELETE FROM sessions WHERE client_id = ?", (client_id,))
+            conn.commit()
+            return default
+        conn.execute("UPDATE sessions SET expires_at = ? WHERE client_id = ?", (now + self.ttl, client_id))
+        conn.commit()
+        return json.loads(row[0])
+
+    def set(self, client_id: str, context: dict):
+        payload = json.dumps(context)
+        now = time.time()
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (client_id, context, size_bytes, expires_at) VALUES (?, ?, ?, ?)",
+            (client_id, payload, len(client_id) + len(payload), now + self.ttl)
+        )
+        conn.execute("DELETE FROM sessions WHERE expires_at < ?", (now,))
+        # Cap: evict the sessions closest to expiry (least recently used)
+        conn.execute("""
+            DELETE FROM sessions WHERE client_id IN (
+                SELECT client_id FROM sessions ORDER BY expires_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+        conn.commit()
+
+    def delete(self, client_id: str):
+        conn = self._conn()
+        conn.execute("DELETE FROM sessions WHERE client_id = ?", (client_id,))
+        conn.commit()
+
+    def stats(self) -> dict:
+        rows = self._conn().execute("SELECT size_bytes FROM sessions WHERE expires_at >= ?", (time.time(),)).fetchall()
+        return _summarize([r[0] for r in rows], "sqlite")
+
+def get_session_store(kind: str = None) -> SessionStore:
+    kind = (kind or SESSION_STORE).lower()
+    if kind == "memory":
+        return InMemorySessionStore()
+    if kind == "sqlite":
+        return SQLiteSessionStore()
+    raise ValueError(f"Unknown session store: {kind}")
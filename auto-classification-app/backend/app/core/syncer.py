@@ -2,6 +2,7 @@ import pandas as pd
 from app.integration.om_client import OMClient
 from app.integration.vector_client import VectorClient
 from app.core.data_lake_syncer import DataLakeSyncer
+from app.core.metrics import track
 import psycopg2
 import pymysql
 
@@ -99,7 +100,8 @@ def sync_om_to_vectordb():
     lake_syncer = DataLakeSyncer()
     
     # 1. Fetch all tables from OpenMetadata
-    tables = om_client.list_all_tables(fields=["columns", "tags", "sampleData"])
+    with track("om_list_tables"):
+        tables = om_client.list_all_tables(fields=["columns", "tags", "sampleData"])
     
     print(f"[Syncer] Found {len(tables)} tables in OpenMetadata.")
     
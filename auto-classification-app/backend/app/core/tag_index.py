@@ -0,0 +1,82 @@
+import json
+import os
+import threading
+
+TAG_INDEX_PATH = os.getenv("TAG_INDEX_PATH", os.path.join("state", "tag_index.json"))
+
+# Schema uploaded files are registered under in OpenMetadata
+UPLOADS_SCHEMA_FQN = "local_files.uploads.default"
+
+def om_table_name(source: str) -> str:
+    """OM table name an uploaded file is registered under (see OMClient.ingest_dataset_with_all_metadata)."""
+    return source.replace('.', '_').replace('-', '_')
+
+class TagIndex:
+    """
+    Vector `source` -> tag FQNs of its dataset. Written whenever a dataset is (re)indexed
+    (uploads, S3 ingests, OM sync) and when tags are applied manually, so PromptIQ can
+    show classification context without asking OpenMetadata on every query.
+    """
+
+    def __init__(self, path: str = TAG_INDEX_PATH):
+        self.path = path
+        self.entries = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"[TagIndex] Could not load {self.path}, starting empty: {e}")
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+    def get(self, source: str):
+        """Tag list for source, or None if the source was never recorded."""
+        with self._lock:
+            tags = self.entries.get(source)
+            return list(tags) if tags is not None else None
+
+    def set(self, source: str, tags: list):
+        tags = sorted(set(tags or []))
+        with self._lock:
+            if self.entries.get(source) == tags:
+                return
+            self.entries[source] = tags
+            self._save()
+
+    def add_for_table(self, table_ref: str, tags: list):
+        """
+        Merge manually applied tags into every source backed by an OM table.
+        table_ref is the table FQN, or its bare name when only an id was known.
+        """
+        def backs(source):
+            if source == table_ref or f"{UPLOADS_SCHEMA_FQN}.{om_table_name(source)}" == table_ref:
+                return True
+            return "." not in table_ref and (om_table_name(source) == table_ref or source.endswith(f".{table_ref}"))
+
+        with self._lock:
+            changed = False
+            for source, existing in self.entries.items():
+                if backs(source):
+                    merged = sorted(set(existing) | set(tags))
+                    if merged != existing:
+                        self.entries[source] = merged
+                        changed = True
+            if changed:
+                self._save()
+
+    def stats(self):
+        with self._lock:
+            return {"sources": len(self.entries), "tags": sum(len(t) for t in self.entries.values())}
+
+tag_index = TagIndex()
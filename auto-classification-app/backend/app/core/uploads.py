@@ -0,0 +1,88 @@
+import asyncio
+import hashlib
+import io
+import os
+import pandas as pd
+from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+UPLOAD_CHUNK_SIZE = int(os.getenv("UPLOAD_CHUNK_SIZE", str(1024 * 1024)))
+# Preview the columns from the first chunk while the rest of the file is still arriving
+UPLOAD_EARLY_PROFILE = os.getenv("UPLOAD_EARLY_PROFILE", "true").lower() == "true"
+
+# Leading bytes -> format; checked before falling back to text heuristics / extension
+MAGIC_SIGNATURES = [
+    (b"PK\x03\x04", "xlsx"),
+    (b"\xd0\xcf\x11\xe0", "xls"),
+    (b"%PDF", "pdf"),
+    (b"PAR1", "parquet"),
+    (b"\x1f\x8b", "gzip"),
+    (b"\x28\xb5\x2f\xfd", "zstd"),
+]
+
+TEXT_EXTENSIONS = {"csv": "csv", "tsv": "csv", "txt": "csv", "json": "json", "xml": "xml", "yaml": "yaml", "yml": "yaml"}
+
+def sniff_format(head: bytes, filename: str = "") -> str:
+    """Format of a file from its first bytes (extension only breaks ties between text formats)."""
+    for magic, fmt in MAGIC_SIGNATURES:
+        if head.startswith(magic):
+            return fmt
+    ext = os.path.splitext(filename)[1].lstrip(".").lower()
+    first = head.lstrip(b"\xef\xbb\xbf \t\r\n")[:1]
+    if first in (b"{", b"[") and ext not in ("yaml", "yml"):
+        return "json"
+    if first == b"<":
+        return "xml"
+    return TEXT_EXTENSIONS.get(ext, "csv")
+
+def preview_columns(head: bytes, fmt: str):
+    """Column names/dtypes inferred from the first complete lines of a delimited file, or None."""
+    if fmt != "csv":
+        return None
+    complete = head[:head.rfind(b"\n") + 1]
+    if not complete:
+        return None
+    df = pd.read_csv(io.BytesIO(complete), sep=None, engine="python", nrows=50)
+    return [{"name": str(col), "datatype": str(dtype)} for col, dtype in df.dtypes.items()]
+
+def _write_chunk(out, hasher, chunk):
+    out.write(chunk)
+    hasher.update(chunk)
+
+async def save_upload(upload: UploadFile, dest_path: str, on_preview=None) -> dict:
+    """
+    Copy an upload to dest_path chunk by chunk. Reads, writes and hashing run in the
+    threadpool, so a multi-GB upload never blocks the event loop.
+    on_preview(columns) is awaited with the early column preview, if one could be made.
+    Returns {sha256, size, format}.
+    """
+    hasher = hashlib.sha256()
+    size = 0
+    fmt = None
+    preview_task = None
+
+    with open(dest_path, "wb") as out:
+        while True:
+            chunk = await upload.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            if fmt is None:
+                fmt = sniff_format(chunk, upload.filename or "")
+                if UPLOAD_EARLY_PROFILE and on_preview is not None:
+                    preview_task = asyncio.create_task(_preview(chunk, fmt, on_preview))
+            await run_in_threadpool(_write_chunk, out, hasher, chunk)
+            size += len(chunk)
+
+    if preview_task is not None:
+        await preview_task
+
+    return {"sha256": hasher.hexdigest(), "size": size, "format": fmt or sniff_format(b"", upload.filename or "")}
+
+async def _preview(head, fmt, on_preview):
+    try:
+        columns = await run_in_threadpool(preview_columns, head, fmt)
+        if columns:
+            await on_preview(columns)
+    except Exception as e:
+        # A preview is best effort; the full profile runs once the upload is complete
+        print(f"Early profiling skipped: {e}")
@@ -1,31 +1,140 @@
 from fastapi import WebSocket
 from typing import List, Dict
+from collections import deque
+import asyncio
 import json
+import os
+
+# Max undelivered messages per connection; beyond it the oldest progress (then warnings) is dropped
+WS_QUEUE_SIZE = int(os.getenv("WS_QUEUE_SIZE", "100"))
+
+# "processing" updates are intermediate and may be coalesced or dropped; warnings are kept over them,
+# and final messages (complete, error) over both. The outbox never exceeds its bound.
+INTERMEDIATE_STATUS = "processing"
+FINAL_STATUSES = ("complete", "error")
+
+class Subscriber:
+    """
+    One WebSocket connection: a bounded outbox drained by its own writer task,
+    so a slow browser only ever delays itself.
+    """
+
+    def __init__(self, websocket: WebSocket, max_queue: int = WS_QUEUE_SIZE):
+        self.websocket = websocket
+        self.max_queue = max_queue
+        self.outbox = deque()
+        self.ready = asyncio.Event()
+        self.coalesced = 0
+        self.dropped = 0
+        self.closed = False
+        self.writer = asyncio.create_task(self._write_loop())
+
+    def push(self, message: dict):
+        if self.closed:
+            return
+        if message["status"] == INTERMEDIATE_STATUS:
+            # A newer progress update for a step supersedes one still waiting to be sent
+            for i, pending in enumerate(self.outbox):
+                if pending["status"] == INTERMEDIATE_STATUS and pending["step"] == message["step"]:
+                    self.outbox[i] = message
+                    self.coalesced += 1
+                    return
+            if len(self.outbox) >= self.max_queue:
+                self.dropped += 1
+                return
+        elif len(self.outbox) >= self.max_queue and not self._evict(message["status"] in FINAL_STATUSES):
+            self.dropped += 1
+            return
+        self.outbox.append(message)
+        self.ready.set()
+
+    def _evict(self, final: bool) -> bool:
+        """
+        Make room by dropping the oldest intermediate message, else the oldest non-final one.
+        A final message may displace the oldest final one too. False when nothing may go.
+        """
+        evictable = (lambda status: status == INTERMEDIATE_STATUS, lambda status: status not in FINAL_STATUSES)
+        for may_evict in evictable:
+            for i, pending in enumerate(self.outbox):
+                if may_evict(pending["status"]):
+                    del self.outbox[i]
+                    self.dropped += 1
+                    return True
+        if final and self.outbox:
+            self.outbox.popleft()
+            self.dropped += 1
+            return True
+        return False
+
+    async def _write_loop(self):
+        try:
+            while True:
+                await self.ready.wait()
+                while self.outbox:
+                    await self.websocket.send_text(json.dumps(self.outbox.popleft()))
+                self.ready.clear()
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Error sending WS update: {e}")
+        finally:
+            self.closed = True
+
+    def close(self):
+        self.closed = True
+        self.writer.cancel()
 
 class ConnectionManager:
+    """
+    Progress broadcaster. Any number of sockets may subscribe to a client_id (or a job id);
+    send_update only enqueues, so ingestion never waits on the network.
+    """
+
     def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
+        self.active_connections: Dict[str, List[Subscriber]] = {}
 
     async def connect(self, client_id: str, websocket: WebSocket):
         await websocket.accept()
-        self.active_connections[client_id] = websocket
+        subscriber = Subscriber(websocket)
+        self.active_connections.setdefault(client_id, []).append(subscriber)
+        return subscriber
 
-    def disconnect(self, client_id: str):
-        if client_id in self.active_connections:
-            del self.active_connections[client_id]
+    def disconnect(self, client_id: str, websocket: WebSocket = None):
+        """Drop one socket of client_id, or all of them when websocket is None."""
+        subscribers = self.active_connections.get(client_id, [])
+        for subscriber in list(subscribers):
+            if websocket is None or subscriber.websocket is websocket:
+                subscriber.close()
+                subscribers.remove(subscriber)
+        if not subscribers:
+            self.active_connections.pop(client_id, None)
 
     async def send_update(self, client_id: str, step: str, status: str = "processing", data: dict = None):
-        if client_id in self.active_connections:
-            websocket = self.active_connections[client_id]
-            message = {
-                "step": step,
-                "status": status,
-                "data": data
-            }
-            try:
-                await websocket.send_text(json.dumps(message))
-            except Exception as e:
-                print(f"Error sending WS update: {e}")
-                self.disconnect(client_id)
+        subscribers = self.active_connections.get(client_id)
+        if not subscribers:
+            return
+        message = {
+            "step": step,
+            "status": status,
+            "data": data
+        }
+        for subscriber in list(subscribers):
+            if subscriber.closed:
+                # Writer hit a send error: the socket is gone
+                subscribers.remove(subscriber)
+                continue
+            subscriber.push(message)
+        if not subscribers:
+            self.active_connections.pop(client_id, None)
+
+    def stats(self):
+        subscribers = [s for subs in self.active_connections.values() for s in subs]
+        return {
+            "channels": len(self.active_connections),
+            "subscribers": len(subscribers),
+            "queued": sum(len(s.outbox) for s in subscribers),
+            "coalesced": sum(s.coalesced for s in subscribers),
+            "dropped": sum(s.dropped for s in subscribers)
+        }
 
 manager = ConnectionManager()
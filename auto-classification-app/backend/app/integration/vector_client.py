@@ -1,11 +1,84 @@
-import chromadb
-from chromadb.utils import embedding_functions
 import pandas as pd
+import numpy as np
+import hashlib
 import json
+import os
+import threading
+from ..core.embedding_service import get_embedding_service
+from ..core.embeddings import get_embedding_backend, canonical_backend_name, EMBEDDING_MODEL
+from ..core.query_cache import query_cache
+from ..core.tag_index import tag_index
+from ..core.metrics import track
+from ..core.lexical_index import BM25Index, reciprocal_rank_fusion
+from .vector_store import get_vector_store
+
+# Per-dataset id manifests ({vector_id: row_hash}) live next to the backend
+MANIFEST_DIR = os.getenv("VECTOR_MANIFEST_DIR", os.path.join("state", "vector_manifests"))
+
+# Columns that can act as a stable row key, in order of preference
+KEY_COLUMN_NAMES = ["id", "uuid", "key"]
+
+# Bump when the stored document/metadata layout changes so unchanged rows get re-upserted
+ROW_SCHEMA_VERSION = 3
+
+# Per-tag boolean metadata keys ("tag:PII.Sensitive.SSN": True) make tags filterable
+TAG_KEY_PREFIX = "tag:"
+
+def build_where(source=None, tags: list = None, row_index=None):
+    """
+    Build a metadata filter for VectorClient.search().
+    - source: dataset name, or list of names (any of)
+    - tags: tag FQNs the row's dataset must ALL carry
+    - row_index: exact index, (lo, hi) inclusive range, or a raw operator dict like {"$lt": 50}
+    """
+    clauses = []
+    if source is not None:
+        clauses.append({"source": {"$in": list(source)}} if isinstance(source, (list, tuple, set)) else {"source": source})
+    for tag in tags or []:
+        clauses.append({f"{TAG_KEY_PREFIX}{tag}": True})
+    if row_index is not None:
+        if isinstance(row_index, dict):
+            clauses.append({"row_index": row_index})
+        elif isinstance(row_index, (list, tuple)):
+            lo, hi = row_index
+            clauses.append({"row_index": {"$gte": lo}})
+            clauses.append({"row_index": {"$lte": hi}})
+        else:
+            clauses.append({"row_index": row_index})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def build_where_document(all_of: list = None, any_of: list = None):
+    """
+    Build a document substring filter. Document matching is case-sensitive,
+    so each term also matches its Capitalized / UPPER / lower spellings.
+    """
+    def variants(term):
+        spellings = list(dict.fromkeys([term, term.lower(), term.capitalize(), term.title(), term.upper()]))
+        if len(spellings) == 1:
+            return {"$contains": spellings[0]}
+        return {"$or": [{"$contains": v} for v in spellings]}
+
+    clauses = [variants(t) for t in all_of or []]
+    if any_of:
+        any_clauses = [variants(t) for t in any_of]
+        clauses.append(any_clauses[0] if len(any_clauses) == 1 else {"$or": any_clauses})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+def build_row_document(dataset_name, row, tags_str=""):
+    """Text representation of a row (including TAGS) that gets embedded."""
+    return f"Dataset: {dataset_name}{tags_str} | " + " | ".join([f"{col}: {val}" for col, val in row.items()])
 
 class VectorClient:
     _instance = None
-    _emb_fn = None
+    _backend = None
+    # Bumped whenever indexed content changes; part of PromptIQ's cache key
+    index_version = 0
 
     def __new__(cls):
         if cls._instance is None:
@@ -14,64 +87,249 @@ class VectorClient:
 
     def __init__(self):
         # Connect once
-        if not hasattr(self, 'client'):
-            self.client = chromadb.HttpClient(host='localhost', port=8001)
-            # Use a lightweight local embedding model - CACHED at class level
-            if VectorClient._emb_fn is None:
-                print("DEBUG: Loading SentenceTransformer model (One-time)...")
-                VectorClient._emb_fn = embedding_functions.SentenceTransformerEmbeddingFunction(model_name="all-MiniLM-L6-v2")
-            
+        if not hasattr(self, 'store'):
             self.collection_name = "dataset_embeddings"
+            # Chroma over HTTP, embedded Chroma or in-process HNSW (VECTOR_STORE)
+            self.store = get_vector_store(self.collection_name)
+            # Multi-process embedding service (None when EMBEDDING_WORKERS=0)
+            self.embedding_service = get_embedding_service()
+            # Use a lightweight local embedding backend (EMBEDDING_BACKEND) - CACHED at class level
+            if self.embedding_service is None and VectorClient._backend is None:
+                print("DEBUG: Loading embedding backend (One-time)...")
+                VectorClient._backend = get_embedding_backend()
 
-    def _get_collection(self):
-        return self.client.get_or_create_collection(
-            name=self.collection_name, 
-            embedding_function=VectorClient._emb_fn
-        )
+            # BM25 index over the same row documents, loaded from the store on first use
+            self.lexical = BM25Index()
+            self._lexical_loaded = False
+            self._lexical_lock = threading.Lock()
+            # Manifest read/modify/write happens from threadpool workers
+            self._manifest_lock = threading.Lock()
+            os.makedirs(MANIFEST_DIR, exist_ok=True)
 
-    def index_dataset(self, dataset_name, df: pd.DataFrame, tags: list = None):
+    def embed(self, texts: list) -> list:
+        """
+        Batch-embed texts with the worker pool when enabled, else in-process.
+        Used for both indexing and search so vectors always come from the same model.
+        """
+        with track("embed", rows=len(texts)):
+            if self.embedding_service is not None:
+                vectors = self.embedding_service.embed(texts)
+            else:
+                vectors = VectorClient._backend.embed(texts)
+        return np.asarray(vectors, dtype=np.float32).tolist()
+
+    def embedding_id(self) -> str:
+        """Backend + model producing this client's vectors; part of every row hash."""
+        if self.embedding_service is not None:
+            # Workers build get_embedding_backend(backend_name) with the default model
+            return f"{canonical_backend_name(self.embedding_service.backend_name)}:{EMBEDDING_MODEL}"
+        backend = VectorClient._backend
+        return f"{backend.name}:{getattr(backend, 'model_id', '')}"
+
+    def _ensure_lexical(self):
+        """Build the BM25 index from everything already in the vector store (once per process)."""
+        if self._lexical_loaded:
+            return
+        with self._lexical_lock:
+            if self._lexical_loaded:
+                return
+            existing = self.store.get(include=["documents", "metadatas"])
+            self.lexical.add(existing.get("ids", []), existing.get("documents", []), existing.get("metadatas", []))
+            self._lexical_loaded = True
+            print(f"DEBUG: Loaded BM25 index with {len(self.lexical)} documents")
+
+    # --------------------------
+    # Manifest helpers
+    # --------------------------
+
+    def _manifest_path(self, dataset_name):
+        # Dataset names are file names or FQNs, so hash them into a safe file name
+        digest = hashlib.sha1(dataset_name.encode("utf-8")).hexdigest()
+        return os.path.join(MANIFEST_DIR, f"{digest}.json")
+
+    def _load_manifest(self, dataset_name):
         """
-        Convert each row of a dataframe into a searchable document in ChromaDB
+        Returns {vector_id: row_hash} for everything currently indexed for the dataset.
+        Falls back to the vector store itself when no manifest exists yet
+        (e.g. data indexed before manifests were introduced).
         """
-        documents = []
-        metadatas = []
-        ids = []
+        path = self._manifest_path(dataset_name)
+        if os.path.exists(path):
+            try:
+                with open(path, "r") as f:
+                    return json.load(f).get("ids", {})
+            except Exception as e:
+                print(f"WARNING: Corrupt vector manifest for {dataset_name}, rebuilding: {e}")
+
+        existing = self.store.get(where={"source": dataset_name}, include=["metadatas"])
+        manifest = {}
+        for vec_id, meta in zip(existing.get("ids", []), existing.get("metadatas", [])):
+            manifest[vec_id] = (meta or {}).get("row_hash", "")
+        return manifest
+
+    def _save_manifest(self, dataset_name, manifest):
+        path = self._manifest_path(dataset_name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"dataset": dataset_name, "ids": manifest}, f)
+        os.replace(tmp_path, path)
 
+    # --------------------------
+    # Row keys
+    # --------------------------
+
+    def _find_key_column(self, df: pd.DataFrame):
+        """Pick a unique, non-null identifier column to key rows by, if there is one."""
+        candidates = []
+        for col in df.columns:
+            clean = str(col).lower().strip()
+            if clean in KEY_COLUMN_NAMES:
+                candidates.insert(0, col)
+            elif clean.endswith("_id"):
+                candidates.append(col)
+
+        for col in candidates:
+            series = df[col]
+            if series.notna().all() and series.is_unique:
+                return col
+        return None
+
+    def _row_key(self, row, key_column):
+        if key_column is not None:
+            return str(row[key_column])
+        # No identifier column: key by content so re-ordering rows doesn't churn ids
+        content = json.dumps([str(v) for v in row.tolist()])
+        return hashlib.sha1(content.encode("utf-8")).hexdigest()[:16]
+
+    # --------------------------
+    # Indexing
+    # --------------------------
+
+    def reindex_dataset(self, dataset_name, df: pd.DataFrame, tags: list = None):
+        """
+        Idempotently sync a dataset's rows into the vector store.
+        - Rows are keyed by a stable id (identifier column or content hash)
+        - Unchanged rows (same document hash) are skipped
+        - Rows that disappeared from the dataset are deleted
+        Returns: {upserted, deleted, unchanged, total}
+        """
         # Index up to 100 rows for better search coverage
         sample_df = df.head(100)
-        
+        key_column = self._find_key_column(sample_df)
+
         # Prepare tag string for document enrichment
         tags_str = ""
         if tags and len(tags) > 0:
             tags_str = f" [Tags: {', '.join(tags)}]"
-        
+
+        # Vectors from another backend/model aren't comparable: switching re-embeds every row
+        embedding_id = self.embedding_id()
+        rows = {}
         for i, row in sample_df.iterrows():
-            # Create a text representation of the row including TAGS
-            doc_text = f"Dataset: {dataset_name}{tags_str} | " + " | ".join([f"{col}: {val}" for col, val in row.items()])
-            documents.append(doc_text)
-            
-            meta = {"source": dataset_name, "row_index": i}
+            vec_id = f"{dataset_name}_{self._row_key(row, key_column)}"
+            if vec_id in rows:
+                continue # Duplicate row content, already represented
+
+            doc_text = build_row_document(dataset_name, row, tags_str)
+            row_hash = hashlib.sha1(f"{ROW_SCHEMA_VERSION}:{embedding_id}:{doc_text}".encode("utf-8")).hexdigest()
+
+            meta = {
+                "source": dataset_name,
+                "row_index": i,
+                "row_hash": row_hash,
+                # Structured copy of the row so readers don't re-parse doc_text
+                "fields": json.dumps({str(col): str(val) for col, val in row.items()})
+            }
             # Store tags in metadata for filtering if needed
             if tags:
                 meta["tags"] = ",".join(tags)
-                
-            metadatas.append(meta)
-            ids.append(f"{dataset_name}_{i}")
-
-        if documents:
-            collection = self._get_collection()
-            collection.add(
-                documents=documents,
-                metadatas=metadatas,
-                ids=ids
+                for tag in tags:
+                    meta[f"{TAG_KEY_PREFIX}{tag}"] = True
+
+            rows[vec_id] = (doc_text, meta, row_hash)
+
+        self._ensure_lexical()
+        with self._manifest_lock:
+            manifest = self._load_manifest(dataset_name)
+
+            changed_ids = [vec_id for vec_id, (_, _, row_hash) in rows.items() if manifest.get(vec_id) != row_hash]
+            stale_ids = [vec_id for vec_id in manifest if vec_id not in rows]
+
+            if stale_ids:
+                self.store.delete(ids=stale_ids)
+                self.lexical.remove(stale_ids)
+
+            if changed_ids:
+                documents = [rows[vec_id][0] for vec_id in changed_ids]
+                metadatas = [rows[vec_id][1] for vec_id in changed_ids]
+                embeddings = self.embed(documents)
+                with track("vector_upsert", rows=len(changed_ids)):
+                    self.store.upsert(
+                        embeddings=embeddings,
+                        documents=documents,
+                        metadatas=metadatas,
+                        ids=changed_ids
+                    )
+                self.lexical.add(changed_ids, documents, metadatas)
+
+            self._save_manifest(dataset_name, {vec_id: row_hash for vec_id, (_, _, row_hash) in rows.items()})
+            tag_index.set(dataset_name, tags)
+
+            if changed_ids or stale_ids:
+                VectorClient.index_version += 1
+                query_cache.invalidate()
+
+        stats = {
+            "upserted": len(changed_ids),
+            "deleted": len(stale_ids),
+            "unchanged": len(rows) - len(changed_ids),
+            "total": len(rows)
+        }
+        print(f"DEBUG: Re-indexed {dataset_name}: {stats}")
+        return stats
+
+    def index_dataset(self, dataset_name, df: pd.DataFrame, tags: list = None):
+        """
+        Convert each row of a dataframe into a searchable document in the vector store.
+        Safe to call repeatedly for the same dataset (see reindex_dataset).
+        """
+        return self.reindex_dataset(dataset_name, df, tags)["total"]
+
+    def search(self, query, n_results=5, where=None, where_document=None):
+        """
+        Semantic search. where / where_document are pushed down into the vector store
+        (see build_where / build_where_document) so filtering narrows the candidate set
+        instead of discarding results after the fact.
+        """
+        query_embeddings = self.embed([query])
+        with track("vector_query"):
+            results = self.store.query(
+                query_embeddings=query_embeddings,
+                n_results=n_results,
+                where=where,
+                where_document=where_document
             )
-            return len(documents)
-        return 0
-
-    def search(self, query, n_results=5):
-        collection = self._get_collection()
-        results = collection.query(
-            query_texts=[query],
-            n_results=n_results
-        )
         return results
+
+    def hybrid_search(self, query, n_results=10, where=None, where_document=None, candidates=50, rrf_k=60, lexical_query=None):
+        """
+        Hybrid retrieval: BM25 keyword ranking fused with vector ranking via
+        reciprocal-rank fusion. Exact values (names, ids) are found lexically even when
+        they are not among the nearest vectors. Returns the same shape as search().
+        lexical_query overrides the text used for BM25 (e.g. prompt keywords only).
+        """
+        self._ensure_lexical()
+        vector_results = self.search(query, n_results=candidates, where=where, where_document=where_document)
+        vector_ids = vector_results.get("ids", [[]])[0]
+        with track("lexical_query"):
+            lexical_hits = self.lexical.search(lexical_query or query, n_results=candidates, where=where, where_document=where_document)
+
+        docs_by_id = dict(zip(vector_ids, vector_results.get("documents", [[]])[0]))
+        metas_by_id = dict(zip(vector_ids, vector_results.get("metadatas", [[]])[0]))
+
+        fused_ids = reciprocal_rank_fusion([vector_ids, [doc_id for doc_id, _ in lexical_hits]], k=rrf_k)[:n_results]
+        return {
+            "ids": [fused_ids],
+            "documents": [[docs_by_id.get(i, self.lexical.documents.get(i)) for i in fused_ids]],
+            "metadatas": [[metas_by_id.get(i, self.lexical.metadatas.get(i)) for i in fused_ids]]
+        }
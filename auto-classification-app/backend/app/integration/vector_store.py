@@ -0,0 +1,378 @@
+import os
+import json
+import sqlite3
+import threading
+import numpy as np
+
+# http (Chroma server) | persistent (embedded Chroma) | hnsw (hnswlib + mmap vectors)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "http")
+CHROMA_HOST = os.getenv("CHROMA_HOST", "localhost")
+CHROMA_PORT = int(os.getenv("CHROMA_PORT", "8001"))
+VECTOR_STORE_DIR = os.getenv("VECTOR_STORE_DIR", os.path.join("state", "vector_store"))
+
+# --------------------------
+# FILTER EVALUATION
+# Chroma's where / where_document grammar, for stores that filter in Python
+# --------------------------
+
+_COMPARATORS = {
+    "$eq": lambda a, b: a == b,
+    "$ne": lambda a, b: a != b,
+    "$gt": lambda a, b: a is not None and a > b,
+    "$gte": lambda a, b: a is not None and a >= b,
+    "$lt": lambda a, b: a is not None and a < b,
+    "$lte": lambda a, b: a is not None and a <= b,
+    "$in": lambda a, b: a in b,
+    "$nin": lambda a, b: a not in b,
+}
+
+def matches_where(meta: dict, where: dict) -> bool:
+    """Evaluate a Chroma-style metadata filter, e.g. {"$and": [{"source": "x"}, {"row_index": {"$lt": 10}}]}."""
+    if not where:
+        return True
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(matches_where(meta, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(matches_where(meta, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = meta.get(key)
+            if not all(_COMPARATORS[op](value, operand) for op, operand in cond.items()):
+                return False
+        elif meta.get(key) != cond:
+            return False
+    return True
+
+def matches_where_document(document: str, where_document: dict) -> bool:
+    """Evaluate a Chroma-style document filter ($contains / $not_contains, $and / $or)."""
+    if not where_document:
+        return True
+    document = document or ""
+    for key, cond in where_document.items():
+        if key == "$and":
+            if not all(matches_where_document(document, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(matches_where_document(document, c) for c in cond):
+                return False
+        elif key == "$contains":
+            if cond not in document:
+                return False
+        elif key == "$not_contains":
+            if cond in document:
+                return False
+        else:
+            raise ValueError(f"Unsupported where_document operator: {key}")
+    return True
+
+class VectorStore:
+    """
+    Minimal collection interface VectorClient needs. Results use Chroma's shapes:
+    get() -> {"ids": [...], "documents": [...], "metadatas": [...]}
+    query() -> {"ids": [[...]], "documents": [[...]], "metadatas": [[...]], "distances": [[...]]}
+    """
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        """Insert or replace items. An existing item's metadata is replaced, not merged."""
+        raise NotImplementedError
+
+    def delete(self, ids):
+        raise NotImplementedError
+
+    def get(self, where=None, include=("metadatas",)):
+        raise NotImplementedError
+
+    def query(self, query_embeddings, n_results, where=None, where_document=None):
+        """Nearest neighbours restricted to items matching where / where_document."""
+        raise NotImplementedError
+
+    def count(self):
+        raise NotImplementedError
+
+class ChromaStore(VectorStore):
+    """Chroma collection, either over HTTP or embedded in-process (PersistentClient)."""
+
+    def __init__(self, client, collection_name):
+        self.client = client
+        self.collection_name = collection_name
+        self._collection = None
+
+    def _get_collection(self):
+        if self._collection is None:
+            # Embeddings are always computed by VectorClient.embed(), never by Chroma
+            self._collection = self.client.get_or_create_collection(name=self.collection_name)
+        return self._collection
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        collection = self._get_collection()
+        # Chroma merges metadata on upsert, so a removed "tag:<fqn>" key would survive and keep
+        # matching tag filters. Drop the old rows first so the new metadata replaces them.
+        collection.delete(ids=ids)
+        collection.upsert(ids=ids, embeddings=embeddings, documents=documents, metadatas=metadatas)
+
+    def delete(self, ids):
+        self._get_collection().delete(ids=ids)
+
+    def get(self, where=None, include=("metadatas",)):
+        return self._get_collection().get(where=where, include=list(include))
+
+    def query(self, query_embeddings, n_results, where=None, where_document=None):
+        kwargs = {}
+        # Chroma rejects empty filter dicts
+        if where:
+            kwargs["where"] = where
+        if where_document:
+            kwargs["where_document"] = where_document
+        return self._get_collection().query(query_embeddings=query_embeddings, n_results=n_results, **kwargs)
+
+    def count(self):
+        return self._get_collection().count()
+
+class HnswStore(VectorStore):
+    """
+    Single-node in-process store:
+    - hnswlib graph (cosine) persisted to index.bin
+    - raw float32 vectors in a memory-mapped file (row == hnsw label), used to rebuild the graph
+    - ids, documents and metadata in a SQLite sidecar
+    """
+
+    def __init__(self, path: str, space: str = "cosine", ef_construction: int = 200, m: int = 16, ef_search: int = 64,
+                 exact_search_threshold: int = 2000):
+        import hnswlib
+        self._hnswlib = hnswlib
+        self.path = path
+        # Filtered queries with at most this many candidates are answered by exact scan
+        self.exact_search_threshold = exact_search_threshold
+        self.space = space
+        self.ef_construction = ef_construction
+        self.m = m
+        self.ef_search = ef_search
+        self._lock = threading.RLock()
+        os.makedirs(path, exist_ok=True)
+
+        self.index_path = os.path.join(path, "index.bin")
+        self.vectors_path = os.path.join(path, "vectors.f32")
+        self.db = sqlite3.connect(os.path.join(path, "metadata.db"), check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS items (
+                id TEXT PRIMARY KEY,
+                label INTEGER UNIQUE NOT NULL,
+                document TEXT,
+                metadata TEXT
+            )
+        """)
+        self.db.execute("CREATE TABLE IF NOT EXISTS settings (key TEXT PRIMARY KEY, value TEXT)")
+        self.db.commit()
+
+        # In-memory view of the sidecar for O(1) lookups on the query path
+        self.id_to_label = {}
+        self.label_to_id = {}
+        self.documents = {}
+        self.metadatas = {}
+        for vec_id, label, document, metadata in self.db.execute("SELECT id, label, document, metadata FROM items"):
+            self.id_to_label[vec_id] = label
+            self.label_to_id[label] = vec_id
+            self.documents[label] = document
+            self.metadatas[label] = json.loads(metadata) if metadata else {}
+
+        settings = dict(self.db.execute("SELECT key, value FROM settings").fetchall())
+        self.dim = int(settings["dim"]) if "dim" in settings else None
+        self.capacity = int(settings.get("capacity", 0))
+        self.next_label = int(settings.get("next_label", 0))
+        # Labels of deleted items, reused so the vector file doesn't grow with churn
+        live = set(self.label_to_id)
+        self.free_labels = [label for label in range(self.next_label) if label not in live]
+
+        self.index = None
+        self.vectors = None
+        if self.dim is not None:
+            self._open(self.dim, self.capacity)
+
+    # --------------------------
+    # Storage helpers
+    # --------------------------
+
+    def _open(self, dim, capacity):
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(capacity, dim))
+        self.index = self._hnswlib.Index(space=self.space, dim=dim)
+        if os.path.exists(self.index_path):
+            self.index.load_index(self.index_path, max_elements=capacity)
+        else:
+            self._rebuild_index(capacity)
+        self.index.set_ef(self.ef_search)
+
+    def _create(self, dim, capacity):
+        self.dim = dim
+        self.capacity = capacity
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="w+", shape=(capacity, dim))
+        self.index = self._hnswlib.Index(space=self.space, dim=dim)
+        self.index.init_index(max_elements=capacity, ef_construction=self.ef_construction, M=self.m)
+        self.index.set_ef(self.ef_search)
+
+    def _rebuild_index(self, capacity):
+        """Recreate the graph from the memory-mapped vectors (e.g. index.bin lost)."""
+        self.index.init_index(max_elements=capacity, ef_construction=self.ef_construction, M=self.m)
+        labels = np.array(sorted(self.label_to_id), dtype=np.int64)
+        if len(labels):
+            self.index.add_items(self.vectors[labels], labels)
+
+    def _ensure_capacity(self, needed):
+        if self.capacity >= needed:
+            return
+        new_capacity = max(needed, self.capacity * 2, 1024)
+        self.vectors.flush()
+        self.vectors = None
+        # Grow the mmap file in place; existing rows keep their offsets
+        with open(self.vectors_path, "ab") as f:
+            f.truncate(new_capacity * self.dim * 4)
+        self.vectors = np.memmap(self.vectors_path, dtype=np.float32, mode="r+", shape=(new_capacity, self.dim))
+        self.index.resize_index(new_capacity)
+        self.capacity = new_capacity
+
+    def _persist(self):
+        self.vectors.flush()
+        self.index.save_index(self.index_path)
+        self.db.executemany("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", [
+            ("dim", str(self.dim)), ("capacity", str(self.capacity)), ("next_label", str(self.next_label))
+        ])
+        self.db.commit()
+
+    # --------------------------
+    # VectorStore API
+    # --------------------------
+
+    def upsert(self, ids, embeddings, documents, metadatas):
+        if not ids:
+            return
+        vecs = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            if self.dim is None:
+                self._create(vecs.shape[1], max(1024, len(ids)))
+
+            # New ids take free labels first, then extend the label range
+            new_count = len({vec_id for vec_id in ids if vec_id not in self.id_to_label})
+            self._ensure_capacity(self.next_label + max(0, new_count - len(self.free_labels)))
+
+            labels = []
+            rows = []
+            for vec_id, document, meta in zip(ids, documents, metadatas):
+                label = self.id_to_label.get(vec_id)
+                if label is None:
+                    if self.free_labels:
+                        label = self.free_labels.pop()
+                        try:
+                            self.index.unmark_deleted(label)
+                        except RuntimeError:
+                            pass # Graph was rebuilt without the deleted label
+                    else:
+                        label = self.next_label
+                        self.next_label += 1
+                    self.id_to_label[vec_id] = label
+                    self.label_to_id[label] = vec_id
+                self.documents[label] = document
+                self.metadatas[label] = meta or {}
+                labels.append(label)
+                rows.append((vec_id, label, document, json.dumps(meta or {})))
+
+            label_arr = np.array(labels, dtype=np.int64)
+            self.vectors[label_arr] = vecs
+            # add_items on an existing label replaces its vector
+            self.index.add_items(vecs, label_arr)
+            self.db.executemany("INSERT OR REPLACE INTO items (id, label, document, metadata) VALUES (?, ?, ?, ?)", rows)
+            self._persist()
+
+    def delete(self, ids):
+        with self._lock:
+            removed = []
+            for vec_id in ids:
+                label = self.id_to_label.pop(vec_id, None)
+                if label is None:
+                    continue
+                self.index.mark_deleted(label)
+                del self.label_to_id[label]
+                self.documents.pop(label, None)
+                self.metadatas.pop(label, None)
+                self.free_labels.append(label)
+                removed.append((vec_id,))
+            if removed:
+                self.db.executemany("DELETE FROM items WHERE id = ?", removed)
+                self._persist()
+
+    def _filter_labels(self, where=None, where_document=None):
+        return [
+            label for label in self.label_to_id
+            if matches_where(self.metadatas[label], where) and matches_where_document(self.documents[label], where_document)
+        ]
+
+    def get(self, where=None, include=("metadatas",)):
+        with self._lock:
+            labels = self._filter_labels(where)
+            result = {"ids": [self.label_to_id[label] for label in labels]}
+            if "metadatas" in include:
+                result["metadatas"] = [self.metadatas[label] for label in labels]
+            if "documents" in include:
+                result["documents"] = [self.documents[label] for label in labels]
+            return result
+
+    def _exact_query(self, queries, candidates, k):
+        """Brute-force cosine search over a small candidate set."""
+        cand = np.array(candidates, dtype=np.int64)
+        vecs = self.vectors[cand]
+        vecs = vecs / np.clip(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12, None)
+        q = queries / np.clip(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12, None)
+        distances = 1.0 - q @ vecs.T
+        order = np.argsort(distances, axis=1)[:, :k]
+        return cand[order], np.take_along_axis(distances, order, axis=1)
+
+    def query(self, query_embeddings, n_results, where=None, where_document=None):
+        empty = {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]}
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        with self._lock:
+            if self.index is None or not self.label_to_id:
+                return empty
+
+            if where or where_document:
+                allowed = self._filter_labels(where, where_document)
+                if not allowed:
+                    return empty
+                k = min(n_results, len(allowed))
+                if len(allowed) <= self.exact_search_threshold:
+                    labels, distances = self._exact_query(queries, allowed, k)
+                else:
+                    allowed_set = set(allowed)
+                    self.index.set_ef(max(self.ef_search, k))
+                    try:
+                        labels, distances = self.index.knn_query(queries, k=k, filter=allowed_set.__contains__)
+                    except RuntimeError:
+                        # Filter too selective for the graph walk to collect k results
+                        labels, distances = self._exact_query(queries, allowed, k)
+            else:
+                k = min(n_results, len(self.label_to_id))
+                self.index.set_ef(max(self.ef_search, k))
+                labels, distances = self.index.knn_query(queries, k=k)
+
+            result = {"ids": [], "documents": [], "metadatas": [], "distances": []}
+            for row_labels, row_dists in zip(labels, distances):
+                result["ids"].append([self.label_to_id[int(label)] for label in row_labels])
+                result["documents"].append([self.documents[int(label)] for label in row_labels])
+                result["metadatas"].append([self.metadatas[int(label)] for label in row_labels])
+                result["distances"].append([float(d) for d in row_dists])
+            return result
+
+    def count(self):
+        return len(self.label_to_id)
+
+def get_vector_store(collection_name: str = "dataset_embeddings", kind: str = None) -> VectorStore:
+    """Build the configured vector store backend (VECTOR_STORE by default)."""
+    kind = (kind or VECTOR_STORE).lower()
+    if kind == "http":
+        import chromadb
+        return ChromaStore(chromadb.HttpClient(host=CHROMA_HOST, port=CHROMA_PORT), collection_name)
+    if kind == "persistent":
+        import chromadb
+        return ChromaStore(chromadb.PersistentClient(path=os.path.join(VECTOR_STORE_DIR, "chroma")), collection_name)
+    if kind == "hnsw":
+        return HnswStore(os.path.join(VECTOR_STORE_DIR, "hnsw", collection_name))
+    raise ValueError(f"Unknown vector store: {kind}")
@@ -1,7 +1,16 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from .api import endpoints, prompt_iq
+from fastapi.concurrency import run_in_threadpool
+from .api import endpoints, prompt_iq, debug
+from .api.prompt_iq import CONTEXT_STORE
 from .core.ws_manager import manager
+from .core.embedding_service import get_embedding_service, shutdown_embedding_service
+from .core.pdf_tables import shutdown_pdf_pool
+from .core.job_manager import job_manager
+from .core.metrics import REQUEST_DURATION, register_gauge, render_metrics
+from .core.query_cache import query_cache
+from .core.request_profiler import request_profiler
 from fastapi import WebSocket, WebSocketDisconnect
 
 app = FastAPI(title="Auto-Classification App")
@@ -13,7 +22,7 @@ async def websocket_endpoint(websocket: WebSocket, client_id: str):
         while True:
             await websocket.receive_text()
     except WebSocketDisconnect:
-        manager.disconnect(client_id)
+        manager.disconnect(client_id, websocket)
 
 # ... (middleware stays same)
 
@@ -31,8 +40,54 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def time_requests(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        # Opt-in profiling (X-Profile header or /debug/profiling toggle); a header check otherwise
+        if request_profiler.wants_profile(request):
+            response = await request_profiler.profile(request, call_next)
+        else:
+            response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # Label by route template (/api/jobs/{job_id}), not raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        REQUEST_DURATION.labels(request.method, getattr(route, "path", "unmatched"), str(status)).observe(time.perf_counter() - start)
+
 app.include_router(endpoints.router, prefix="/api")
 app.include_router(prompt_iq.router, prefix="/api/ai")
+app.include_router(debug.router, prefix="/debug")
+
+@app.on_event("startup")
+async def resume_jobs():
+    # Batch ingestions interrupted by a restart continue from their unfinished files
+    job_manager.resume_pending()
+
+@app.on_event("startup")
+async def warm_embedding_workers():
+    # Spawned workers load their model on first use; do it now instead of inside the first ingest
+    service = get_embedding_service()
+    if service is not None:
+        await run_in_threadpool(service.warmup)
+
+@app.on_event("shutdown")
+def stop_worker_pools():
+    shutdown_embedding_service()
+    shutdown_pdf_pool()
+
+register_gauge("classifier_query_cache_entries", "Cached PromptIQ answers", lambda: len(query_cache.entries))
+register_gauge("classifier_ws_queued_messages", "WebSocket progress messages waiting to be sent", lambda: manager.stats()["queued"])
+register_gauge("classifier_ws_subscribers", "Connected WebSocket subscribers", lambda: manager.stats()["subscribers"])
+register_gauge("classifier_sessions", "Live PromptIQ conversation sessions", lambda: CONTEXT_STORE.stats()["sessions"])
+register_gauge("classifier_session_bytes", "Serialized size of stored PromptIQ sessions", lambda: CONTEXT_STORE.stats()["bytes"])
+
+@app.get("/metrics")
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
 
 @app.get("/")
 def read_root():
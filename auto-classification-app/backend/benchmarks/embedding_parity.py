@@ -0,0 +1,133 @@
+"""
+Embedding backend parity check.
+
+Embeds the row documents of real datasets with a reference backend and a
+candidate backend, then checks that retrieval quality stays within tolerance:
+  - top-k neighbour overlap for row-derived queries
+  - self-retrieval hit rate (the query's source row is in the top-k)
+Also reports per-document latency and peak RSS of each backend, each measured
+in its own process.
+
+Usage (from backend/):
+    python -m benchmarks.embedding_parity uploads/customers.csv --candidate onnx-int8
+Exits non-zero when the candidate falls below --tolerance.
+"""
+import argparse
+import glob
+import multiprocessing as mp
+import os
+import random
+import resource
+import sys
+import time
+
+import numpy as np
+
+from app.core import profiler
+from app.integration.vector_client import build_row_document
+
+def load_corpus(paths, rows_per_dataset, queries_per_dataset, seed=7):
+    rng = random.Random(seed)
+    docs, queries, query_targets = [], [], []
+    for path in paths:
+        try:
+            _, df = profiler.profile_dataset(path)
+        except Exception as e:
+            print(f"Skipping {path}: {e}")
+            continue
+
+        name = os.path.basename(path)
+        sample_df = df.head(rows_per_dataset)
+        offset = len(docs)
+        for _, row in sample_df.iterrows():
+            docs.append(build_row_document(name, row))
+
+        # Queries look like what users type: a couple of field values from one row
+        for _ in range(min(queries_per_dataset, len(sample_df))):
+            pos = rng.randrange(len(sample_df))
+            values = [str(v) for v in sample_df.iloc[pos].tolist() if str(v) not in ("", "nan", "None")]
+            if not values:
+                continue
+            queries.append(" ".join(rng.sample(values, min(2, len(values)))))
+            query_targets.append(offset + pos)
+    return docs, queries, query_targets
+
+def _run_backend(backend_name, docs, queries, batch_size, out):
+    from app.core.embeddings import get_embedding_backend
+    backend = get_embedding_backend(backend_name)
+    backend.embed(docs[:batch_size]) # warmup
+
+    start = time.perf_counter()
+    doc_vecs = np.vstack([backend.embed(docs[i:i + batch_size]) for i in range(0, len(docs), batch_size)])
+    elapsed = time.perf_counter() - start
+    query_vecs = backend.embed(queries)
+
+    # ru_maxrss is KB on Linux
+    out.put({
+        "doc_vecs": doc_vecs,
+        "query_vecs": query_vecs,
+        "ms_per_doc": 1000 * elapsed / max(len(docs), 1),
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    })
+
+def embed_in_subprocess(backend_name, docs, queries, batch_size):
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    proc = ctx.Process(target=_run_backend, args=(backend_name, docs, queries, batch_size, out))
+    proc.start()
+    result = out.get()
+    proc.join()
+    return result
+
+def top_k(query_vecs, doc_vecs, k):
+    # Vectors are L2-normalized, so dot product == cosine similarity
+    scores = query_vecs @ doc_vecs.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding backend retrieval parity check")
+    parser.add_argument("paths", nargs="*", help="Dataset files (default: uploads/*)")
+    parser.add_argument("--reference", default="sentence-transformers")
+    parser.add_argument("--candidate", default="onnx-int8")
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--rows", type=int, default=100, help="Rows per dataset (matches VectorClient)")
+    parser.add_argument("--queries", type=int, default=25, help="Queries per dataset")
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--tolerance", type=float, default=0.9,
+                        help="Minimum mean top-k overlap with the reference backend")
+    args = parser.parse_args()
+
+    paths = args.paths or sorted(p for p in glob.glob(os.path.join("uploads", "*")) if os.path.isfile(p))
+    docs, queries, targets = load_corpus(paths, args.rows, args.queries)
+    if not docs or not queries:
+        print("No documents to compare. Pass dataset files explicitly.")
+        sys.exit(2)
+
+    print(f"Corpus: {len(docs)} docs, {len(queries)} queries from {len(paths)} file(s)\n")
+    ref = embed_in_subprocess(args.reference, docs, queries, args.batch_size)
+    cand = embed_in_subprocess(args.candidate, docs, queries, args.batch_size)
+
+    k = min(args.k, len(docs))
+    ref_top = top_k(ref["query_vecs"], ref["doc_vecs"], k)
+    cand_top = top_k(cand["query_vecs"], cand["doc_vecs"], k)
+
+    overlap = np.mean([len(set(r) & set(c)) / k for r, c in zip(ref_top, cand_top)])
+    ref_hits = np.mean([t in row for t, row in zip(targets, ref_top)])
+    cand_hits = np.mean([t in row for t, row in zip(targets, cand_top)])
+    cosine = float(np.mean(np.sum(ref["doc_vecs"] * cand["doc_vecs"], axis=1)))
+
+    print(f"{'backend':<24}{'ms/doc':>10}{'peak RSS MB':>14}{f'hit@{k}':>10}")
+    print(f"{args.reference:<24}{ref['ms_per_doc']:>10.2f}{ref['peak_rss_mb']:>14.0f}{ref_hits:>10.3f}")
+    print(f"{args.candidate:<24}{cand['ms_per_doc']:>10.2f}{cand['peak_rss_mb']:>14.0f}{cand_hits:>10.3f}")
+    print(f"\nMean doc cosine (ref vs candidate): {cosine:.4f}")
+    print(f"Mean top-{k} overlap: {overlap:.3f} (tolerance {args.tolerance})")
+    print(f"Latency ratio: {cand['ms_per_doc'] / ref['ms_per_doc']:.2f}x, "
+          f"memory ratio: {cand['peak_rss_mb'] / ref['peak_rss_mb']:.2f}x")
+
+    if overlap < args.tolerance or cand_hits < ref_hits - (1 - args.tolerance):
+        print("FAIL: candidate backend is outside the retrieval tolerance")
+        sys.exit(1)
+    print("PASS")
+
+if __name__ == "__main__":
+    main()
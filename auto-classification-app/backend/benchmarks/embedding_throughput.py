@@ -0,0 +1,88 @@
+"""
+Embedding throughput benchmark (CPU).
+
+Compares in-process encoding with the multi-process EmbeddingService at
+increasing worker counts and reports embeddings/sec.
+
+Usage (from backend/):
+    python -m benchmarks.embedding_throughput --docs 5000 --workers 1 2 4 --backend onnx-int8
+"""
+import argparse
+import os
+import random
+import time
+
+from app.core.embedding_service import EmbeddingService, EMBEDDING_BATCH_SIZE
+from app.core.embeddings import get_embedding_backend, EMBEDDING_BACKEND
+
+FIRST_NAMES = ["Alice", "Bob", "Charlie", "Diana", "Ethan", "Fiona", "George", "Hannah"]
+CITIES = ["Berlin", "Austin", "Pune", "Lagos", "Osaka", "Lima", "Oslo", "Perth"]
+
+def make_documents(n: int, seed: int = 42):
+    """Synthetic row documents shaped like the ones VectorClient indexes."""
+    rng = random.Random(seed)
+    docs = []
+    for i in range(n):
+        name = rng.choice(FIRST_NAMES)
+        docs.append(
+            f"Dataset: bench.csv [Tags: PII.Contact.Email] | id: {i} | full_name: {name} {rng.choice(FIRST_NAMES)}son"
+            f" | email: {name.lower()}{i}@example.com | city: {rng.choice(CITIES)} | notes: order {rng.randint(1000, 9999)}"
+        )
+    return docs
+
+def bench_in_process(docs, backend_name, batch_size):
+    backend = get_embedding_backend(backend_name)
+    backend.embed(docs[:batch_size]) # warmup
+    start = time.perf_counter()
+    for i in range(0, len(docs), batch_size):
+        backend.embed(docs[i:i + batch_size])
+    return time.perf_counter() - start
+
+def bench_service(docs, backend_name, workers, batch_size):
+    service = EmbeddingService(workers=workers, backend_name=backend_name, batch_size=batch_size)
+    try:
+        service.warmup()
+        start = time.perf_counter()
+        service.embed(docs)
+        return time.perf_counter() - start
+    finally:
+        service.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description="Embedding throughput benchmark")
+    parser.add_argument("--docs", type=int, default=5000)
+    parser.add_argument("--batch-size", type=int, default=EMBEDDING_BATCH_SIZE)
+    parser.add_argument("--backend", default=EMBEDDING_BACKEND,
+                        help="sentence-transformers | onnx | onnx-int8")
+    parser.add_argument("--workers", type=int, nargs="+", default=None,
+                        help="Worker counts to try (default: 1, 2, 4 ... up to cpu_count)")
+    args = parser.parse_args()
+
+    cpu = os.cpu_count() or 1
+    worker_counts = args.workers
+    if not worker_counts:
+        worker_counts = []
+        w = 1
+        while w <= cpu:
+            worker_counts.append(w)
+            w *= 2
+        if worker_counts[-1] != cpu:
+            worker_counts.append(cpu)
+
+    docs = make_documents(args.docs)
+    print(f"Embedding {len(docs)} docs with {args.backend} (batch={args.batch_size}, cpus={cpu})\n")
+
+    results = []
+    elapsed = bench_in_process(docs, args.backend, args.batch_size)
+    results.append(("in-process", elapsed))
+    for w in worker_counts:
+        results.append((f"service x{w}", bench_service(docs, args.backend, w, args.batch_size)))
+
+    baseline = len(docs) / results[0][1]
+    print(f"{'mode':<16}{'seconds':>10}{'emb/sec':>12}{'speedup':>10}")
+    for label, elapsed in results:
+        rate = len(docs) / elapsed
+        print(f"{label:<16}{elapsed:>10.2f}{rate:>12.1f}{rate / baseline:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
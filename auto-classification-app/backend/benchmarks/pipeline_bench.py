@@ -0,0 +1,195 @@
+"""
+Ingestion / query hot-path benchmark.
+
+For each dataset size, generates a synthetic table (benchmarks.synthetic) and runs
+each stage in a fresh process against local stand-ins (benchmarks.standins):
+  - profile : profiler.profile_dataset on the CSV
+  - classify: column classification + mapping, registered with the in-memory OM
+  - archive : endpoints._archive_to_minio (Parquet conversion + upload), with MinIO
+              swapped for the local object store
+  - index   : VectorClient.reindex_dataset into the in-process HNSW store
+              (VectorClient indexes the first 100 rows, so this is per-dataset cost)
+  - query   : PromptIQ answers over the indexed dataset
+Reports throughput and peak RSS per stage and compares with benchmarks/baselines.json.
+
+Usage (from backend/):
+    python -m benchmarks.pipeline_bench --sizes 10k,1m
+    python -m benchmarks.pipeline_bench --sizes 10k,1m,10m --save-baseline
+Exits non-zero when a stage's throughput drops more than --max-regression below baseline.
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import resource
+import shutil
+import sys
+import tempfile
+import time
+
+from benchmarks import synthetic
+from benchmarks.standins import configure_environment, HashEmbeddingBackend, LocalObjectStore, InMemoryOM
+
+STAGES = ["profile", "classify", "archive", "index", "query"]
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+QUERY_PROMPTS = [
+    "who is Alice Smith", "find customers in Berlin", "email of Bob Jones", "show pending customers",
+    "list names in Tokyo", "details for Nora King", "phone of Omar Lee", "customers with renewal due next quarter"
+]
+
+def parse_size(text: str) -> int:
+    text = text.strip().lower()
+    factor = {"k": 1_000, "m": 1_000_000}.get(text[-1], 1)
+    return int(float(text[:-1] if factor > 1 else text) * factor)
+
+def _run_stage(stage, csv_path, work_dir, embedding, queries, out):
+    configure_environment(work_dir)
+    import pandas as pd
+    from app.core import profiler
+    from app.integration.vector_client import VectorClient
+
+    if embedding == "hash":
+        VectorClient._backend = HashEmbeddingBackend()
+    dataset_name = os.path.basename(csv_path)
+    rows, nbytes, extra = 0, os.path.getsize(csv_path), {}
+
+    # Inputs are prepared outside the timed region
+    if stage != "profile":
+        profile, df = profiler.profile_dataset(csv_path)
+    if stage in ("classify", "index", "query"):
+        from app.api.endpoints import _classify_columns_sync
+    if stage == "archive":
+        import asyncio
+        from app.api import endpoints
+        object_store = LocalObjectStore(work_dir)
+        endpoints.MinioClient = lambda: object_store
+        # The production path writes <file>.parquet next to the upload; keep it in the stage dir
+        upload_path = os.path.join(work_dir, dataset_name)
+    if stage in ("index", "query"):
+        columns = _classify_columns_sync(profile["columns"])
+        tags = sorted({t["tag_fqn"] for c in columns for t in c["tags"]})
+        vector_client = VectorClient()
+    if stage == "query":
+        vector_client.reindex_dataset(dataset_name, df, tags)
+        from app.api.prompt_iq import _answer_query
+        _answer_query(QUERY_PROMPTS[0], [], None) # warm BM25 + backend
+
+    start = time.perf_counter()
+    if stage == "profile":
+        profile, df = profiler.profile_dataset(csv_path)
+        rows = profile["row_count"]
+    elif stage == "classify":
+        columns = _classify_columns_sync(profile["columns"])
+        InMemoryOM().ingest_dataset_with_all_metadata(dataset_name, columns)
+        rows = len(df)
+    elif stage == "archive":
+        asyncio.run(endpoints._archive_to_minio("benchmark", dataset_name, upload_path, df))
+        rows = len(df)
+    elif stage == "index":
+        rows = vector_client.reindex_dataset(dataset_name, df, tags)["upserted"]
+    elif stage == "query":
+        latencies = []
+        for i in range(queries):
+            q_start = time.perf_counter()
+            _answer_query(QUERY_PROMPTS[i % len(QUERY_PROMPTS)], [], None)
+            latencies.append(time.perf_counter() - q_start)
+        latencies.sort()
+        rows = queries
+        extra = {"p50_ms": 1000 * latencies[len(latencies) // 2], "p95_ms": 1000 * latencies[int(len(latencies) * 0.95) - 1]}
+    elapsed = time.perf_counter() - start
+    if stage == "archive":
+        # _archive_to_minio logs and swallows upload errors; a missing object means it failed
+        archived = os.path.join(object_store.root, os.path.splitext(dataset_name)[0] + ".parquet")
+        if not os.path.exists(archived):
+            raise RuntimeError("archive stage produced no object")
+        nbytes = os.path.getsize(archived)
+
+    # ru_maxrss is KB on Linux
+    out.put({
+        "seconds": elapsed,
+        "rows": rows,
+        "rows_per_sec": rows / elapsed if elapsed > 0 else 0.0,
+        "mb_per_sec": nbytes / (1024 * 1024) / elapsed if elapsed > 0 and stage in ("profile", "archive") else None,
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        **extra
+    })
+
+def run_stage_in_subprocess(stage, csv_path, work_dir, embedding, queries):
+    ctx = mp.get_context("spawn")
+    out = ctx.Queue()
+    proc = ctx.Process(target=_run_stage, args=(stage, csv_path, work_dir, embedding, queries, out))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0:
+        raise RuntimeError(f"stage {stage} exited with code {proc.exitcode}")
+    return out.get()
+
+def load_baselines():
+    try:
+        with open(BASELINE_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {"results": {}}
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingestion and query benchmark")
+    parser.add_argument("--sizes", default="10k,1m,10m", help="Comma-separated row counts (k/m suffixes)")
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--pii-mix", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--embedding", choices=["hash", "model"], default="hash",
+                        help="hash: model-free stand-in (default); model: the configured EMBEDDING_BACKEND")
+    parser.add_argument("--work-dir", default=os.path.join(tempfile.gettempdir(), "classifier_bench"))
+    parser.add_argument("--save-baseline", action="store_true", help=f"Write results to {BASELINE_PATH}")
+    parser.add_argument("--max-regression", type=float, default=0.25,
+                        help="Fail when throughput is this fraction below baseline")
+    args = parser.parse_args()
+
+    stages = [s for s in args.stages.split(",") if s]
+    baselines = load_baselines()
+    results, regressions = {}, []
+
+    print(f"{'rows':>10} {'stage':<9}{'seconds':>10}{'rows/s':>14}{'MB/s':>9}{'peak RSS MB':>13}{'vs baseline':>13}")
+    for size in [parse_size(s) for s in args.sizes.split(",")]:
+        csv_path = os.path.join(args.work_dir, f"synthetic_{size}x{args.columns}_pii{args.pii_mix}_s{args.seed}.csv")
+        if not os.path.exists(csv_path):
+            synthetic.write_csv(csv_path, size, args.columns, args.pii_mix, args.seed)
+
+        for stage in stages:
+            stage_dir = tempfile.mkdtemp(prefix=f"{stage}_", dir=args.work_dir)
+            try:
+                result = run_stage_in_subprocess(stage, csv_path, stage_dir, args.embedding, args.queries)
+            finally:
+                shutil.rmtree(stage_dir, ignore_errors=True)
+            results.setdefault(str(size), {})[stage] = result
+
+            base = baselines.get("results", {}).get(str(size), {}).get(stage)
+            ratio = result["rows_per_sec"] / base["rows_per_sec"] if base and base.get("rows_per_sec") else None
+            if ratio is not None and ratio < 1 - args.max_regression:
+                regressions.append(f"{stage} @ {size} rows: {ratio:.2f}x baseline throughput")
+            mb = f"{result['mb_per_sec']:.1f}" if result["mb_per_sec"] else "-"
+            vs = f"{ratio:.2f}x" if ratio is not None else "-"
+            print(f"{size:>10} {stage:<9}{result['seconds']:>10.3f}{result['rows_per_sec']:>14,.0f}{mb:>9}"
+                  f"{result['peak_rss_mb']:>13.0f}{vs:>13}")
+
+    if args.save_baseline:
+        baselines = {
+            "machine": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+            "params": {"columns": args.columns, "pii_mix": args.pii_mix, "seed": args.seed,
+                       "queries": args.queries, "embedding": args.embedding},
+            "results": {**baselines.get("results", {}), **results}
+        }
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baselines, f, indent=2)
+        print(f"\nBaseline written to {BASELINE_PATH}")
+
+    if regressions:
+        print("\nREGRESSIONS:\n  " + "\n  ".join(regressions))
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Local stand-ins for the external services, so benchmarks measure this code rather
+than the network:
+  - OpenMetadata -> InMemoryOM (records what would be registered)
+  - MinIO        -> LocalObjectStore (copies objects into a local directory)
+  - Chroma       -> the in-process hnswlib store (VECTOR_STORE=hnsw), see configure_environment()
+  - embeddings   -> optional HashEmbeddingBackend, deterministic and model-free
+"""
+import hashlib
+import os
+import shutil
+
+import numpy as np
+
+def configure_environment(work_dir: str):
+    """
+    Point every state file and the vector store at work_dir. Must run before any
+    app module is imported (their settings are read at import time).
+    """
+    os.environ["VECTOR_STORE"] = "hnsw"
+    os.environ["VECTOR_STORE_DIR"] = os.path.join(work_dir, "vector_store")
+    os.environ["VECTOR_MANIFEST_DIR"] = os.path.join(work_dir, "vector_manifests")
+    os.environ["TAG_INDEX_PATH"] = os.path.join(work_dir, "tag_index.json")
+    os.environ["SESSION_DB_PATH"] = os.path.join(work_dir, "sessions.db")
+    os.environ["JOB_DB_PATH"] = os.path.join(work_dir, "jobs.db")
+    os.environ["EMBEDDING_WORKERS"] = "0"
+    # Benchmarks measure computation, not cache hits
+    os.environ["QUERY_CACHE_SIZE"] = "0"
+
+class HashEmbeddingBackend:
+    """Hashed bag-of-words vectors: same shape as MiniLM (384-d, L2-normalized), no model download."""
+    name = "hash"
+
+    def __init__(self, dimension: int = 384):
+        self.dimension = dimension
+
+    def embed(self, texts: list) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dimension), dtype=np.float32)
+        for i, text in enumerate(texts):
+            for token in text.lower().split():
+                digest = hashlib.md5(token.encode()).digest()
+                vectors[i, int.from_bytes(digest[:4], "little") % self.dimension] += 1.0
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def __call__(self, texts):
+        return self.embed(texts)
+
+class LocalObjectStore:
+    """MinioClient stand-in: upload_file() copies into root/<bucket>/."""
+
+    def __init__(self, root: str, bucket_name: str = "raw-data"):
+        self.bucket_name = bucket_name
+        self.root = os.path.join(root, bucket_name)
+        os.makedirs(self.root, exist_ok=True)
+
+    def upload_file(self, file_path, object_name=None):
+        object_name = object_name or os.path.basename(file_path)
+        shutil.copyfile(file_path, os.path.join(self.root, object_name))
+        return f"s3://{self.bucket_name}/{object_name}"
+
+class InMemoryOM:
+    """OMClient stand-in for the ingestion path."""
+
+    def __init__(self):
+        self.tables = {}
+
+    def ingest_dataset_with_all_metadata(self, file_name, columns_with_tags):
+        table_name = file_name.replace(".", "_").replace("-", "_")
+        self.tables[table_name] = columns_with_tags
+        return table_name
+
+    def get_dataset(self, table_fqn_or_id):
+        columns = self.tables.get(table_fqn_or_id.split(".")[-1])
+        if columns is None:
+            return None
+        return {"name": table_fqn_or_id, "columns": [{"name": c["name"], "tags": c["tags"]} for c in columns]}
@@ -0,0 +1,100 @@
+"""
+Synthetic dataset generator for the benchmarks.
+
+Produces tables with a configurable number of rows and columns and a configurable
+share of PII columns (names, emails, phones, SSNs, card numbers, addresses) whose
+values match the classifier's patterns. Generation is vectorized and written in
+chunks, so 10M-row files don't need 10M rows in memory.
+
+Usage (from backend/):
+    python -m benchmarks.synthetic out.csv --rows 1000000 --columns 12 --pii-mix 0.5
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+FIRST_NAMES = np.array(["Alice", "Bob", "Charlie", "Diana", "Ethan", "Fiona", "George", "Hannah", "Ivan", "Julia",
+                        "Karim", "Lena", "Mateo", "Nora", "Omar", "Priya", "Quinn", "Rosa", "Sven", "Tara"], dtype=object)
+LAST_NAMES = np.array(["Smith", "Jones", "Brown", "Garcia", "Miller", "Davis", "Lopez", "Wilson", "Anderson", "Thomas",
+                       "Moore", "Martin", "Lee", "Perez", "White", "Harris", "Clark", "Lewis", "Young", "King"], dtype=object)
+CITIES = np.array(["Berlin", "Austin", "Paris", "Lagos", "Tokyo", "Lima", "Oslo", "Pune", "Cairo", "Denver"], dtype=object)
+STREETS = np.array(["Main St", "Oak Ave", "Pine Rd", "Maple Dr", "Cedar Ln", "Elm St", "Lake View", "Hill Rd"], dtype=object)
+STATUSES = np.array(["active", "inactive", "pending", "closed"], dtype=object)
+NOTES = np.array(["Customer requested a callback", "Preferred contact by email", "Renewal due next quarter",
+                  "No issues reported", "Escalated to support", "Discount applied"], dtype=object)
+
+PII_KINDS = ["full_name", "email", "phone", "ssn", "credit_card", "address"]
+PLAIN_KINDS = ["city", "amount", "status", "notes", "created_at"]
+
+def _digits(rng, n, width):
+    return pd.Series(rng.integers(0, 10 ** width, n)).astype(str).str.zfill(width).to_numpy(dtype=object)
+
+def _column(kind, rng, n, offset):
+    if kind == "full_name":
+        return FIRST_NAMES[rng.integers(0, len(FIRST_NAMES), n)] + " " + LAST_NAMES[rng.integers(0, len(LAST_NAMES), n)]
+    if kind == "email":
+        ids = pd.Series(np.arange(offset, offset + n)).astype(str).to_numpy(dtype=object)
+        first = np.char.lower(FIRST_NAMES[rng.integers(0, len(FIRST_NAMES), n)].astype(str)).astype(object)
+        return first + "." + ids + "@example.com"
+    if kind == "phone":
+        return _digits(rng, n, 3) + "-" + _digits(rng, n, 3) + "-" + _digits(rng, n, 4)
+    if kind == "ssn":
+        return _digits(rng, n, 3) + "-" + _digits(rng, n, 2) + "-" + _digits(rng, n, 4)
+    if kind == "credit_card":
+        return "4" + _digits(rng, n, 3) + "-" + _digits(rng, n, 4) + "-" + _digits(rng, n, 4) + "-" + _digits(rng, n, 4)
+    if kind == "address":
+        return pd.Series(rng.integers(1, 9999, n)).astype(str).to_numpy(dtype=object) + " " + STREETS[rng.integers(0, len(STREETS), n)]
+    if kind == "city":
+        return CITIES[rng.integers(0, len(CITIES), n)]
+    if kind == "amount":
+        return np.round(rng.uniform(1, 5000, n), 2)
+    if kind == "status":
+        return STATUSES[rng.integers(0, len(STATUSES), n)]
+    if kind == "notes":
+        return NOTES[rng.integers(0, len(NOTES), n)]
+    if kind == "created_at":
+        return pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365, n), unit="D")
+    raise ValueError(f"Unknown column kind: {kind}")
+
+def column_layout(columns: int = 10, pii_mix: float = 0.5) -> list:
+    """[(column_name, kind)]: an `id` key plus columns-1 columns, pii_mix of them PII."""
+    n_pii = round((columns - 1) * pii_mix)
+    kinds = [PII_KINDS[i % len(PII_KINDS)] for i in range(n_pii)]
+    kinds += [PLAIN_KINDS[i % len(PLAIN_KINDS)] for i in range(columns - 1 - n_pii)]
+    layout, seen = [("id", "id")], {}
+    for kind in kinds:
+        seen[kind] = seen.get(kind, 0) + 1
+        layout.append((kind if seen[kind] == 1 else f"{kind}_{seen[kind]}", kind))
+    return layout
+
+def generate_frame(rows: int, columns: int = 10, pii_mix: float = 0.5, seed: int = 0, offset: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed + offset)
+    data = {}
+    for name, kind in column_layout(columns, pii_mix):
+        data[name] = np.arange(offset, offset + rows) if kind == "id" else _column(kind, rng, rows, offset)
+    return pd.DataFrame(data)
+
+def write_csv(path: str, rows: int, columns: int = 10, pii_mix: float = 0.5, seed: int = 0, chunk_rows: int = 500_000):
+    """Write a synthetic CSV chunk by chunk. Returns the file size in bytes."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", newline="") as f:
+        for offset in range(0, rows, chunk_rows):
+            chunk = generate_frame(min(chunk_rows, rows - offset), columns, pii_mix, seed, offset)
+            chunk.to_csv(f, index=False, header=(offset == 0))
+    return os.path.getsize(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset")
+    parser.add_argument("path")
+    parser.add_argument("--rows", type=int, default=10_000)
+    parser.add_argument("--columns", type=int, default=10)
+    parser.add_argument("--pii-mix", type=float, default=0.5, help="Share of non-key columns holding PII")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    size = write_csv(args.path, args.rows, args.columns, args.pii_mix, args.seed)
+    print(f"Wrote {args.rows} rows x {args.columns} columns ({size / (1024 * 1024):.1f} MB) to {args.path}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,19 @@
+import pandas as pd
+import pyarrow as pa
+
+from app.core.classifier import distinct_values, classify_column_content
+
+def test_distinct_values_matches_astype_str():
+    series = pd.Series(["a@example.com", "a@example.com", None, "b@example.com"])
+    values, counts = distinct_values(series)
+    assert dict(zip(values, counts)) == {"a@example.com": 2, "b@example.com": 1}
+    assert dict(zip(*distinct_values(pa.array(series, from_pandas=True)))) == {"a@example.com": 2, "b@example.com": 1}
+
+def test_nested_arrow_columns():
+    values, counts = distinct_values(pa.array([["x", "y"], ["x", "y"], None, ["z"]]))
+    assert dict(zip(values, counts)) == {"['x', 'y']": 2, "['z']": 1}
+    values, counts = distinct_values(pa.chunked_array([pa.array([{"a": 1}, {"a": 1}])]))
+    assert dict(zip(values, counts)) == {"{'a': 1}": 2}
+
+def test_classify_nested_column():
+    assert classify_column_content(pa.array([["x"], ["y"]]), "tags") == (None, 0.0)
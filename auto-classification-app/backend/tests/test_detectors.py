@@ -0,0 +1,73 @@
+import pytest
+
+from app.core.detectors import detector_registry, NATIONAL_IDS, codice_fiscale_valid, curp_valid
+
+NATIONAL_ID = "PII.Sensitive.NationalID"
+
+# One valid value per registered format; digit-only shapes that also match Phone are included unspaced
+SAMPLES = {
+    "PII.Sensitive.SSN": ["123-45-6789"],
+    "PII.Contact.Email": ["jane.doe@example.com"],
+    "PII.Sensitive.IBAN": ["DE89 3704 0044 0532 0130 00"],
+    "IPv4": ["192.168.10.1"],
+    "IPv6": ["2001:db8::8a2e:370:7334"],
+    "US ITIN": ["912-70-1234"],
+    "UK NINO": ["AB123456C"],
+    "CA SIN": ["046 454 286", "046454286"],
+    "NL BSN": ["111222333"],
+    "ES DNI/NIE": ["12345678Z", "X1234567L"],
+    "BR CPF": ["529.982.247-25", "52998224725"],
+    "PL PESEL": ["44051401359"],
+    "NO FNR": ["01019012057"],
+    "DE Steuer-ID": ["86095742719", "86 095 742 719"],
+    "SE personnummer": ["811218-9876", "8112189876"],
+    "DK CPR": ["1204900000"],
+    "FI HETU": ["131052-308T"],
+    "BE national number": ["85.07.30-033.28"],
+    "FR NIR": ["1 84 12 76 451 089 46"],
+    "IT codice fiscale": ["RSSMRA85T10A562S"],
+    "IN Aadhaar": ["2341 2341 2346", "234123412346"],
+    "CN resident ID": ["11010519491231002X"],
+    "KR RRN": ["800101-1234560"],
+    "SG NRIC/FIN": ["S1234567D"],
+    "MX CURP": ["HEGG560427MVZRRL04"],
+    "ZA ID": ["8001015009087"],
+    "PII.Contact.Phone": ["(555) 123-4567", "555.123.4567"],
+    "PII.Sensitive.CreditCard": ["4111 1111 1111 1111"],
+    "PII.Sensitive.Passport": ["X1234567"],
+}
+# Detectors that only count in columns with a matching name
+COLUMNS = {"PII.Sensitive.Passport": "passport_no"}
+
+def test_every_detector_has_a_sample():
+    assert {d.name for d in detector_registry.detectors} == set(SAMPLES)
+
+@pytest.mark.parametrize("detector", detector_registry.detectors, ids=lambda d: d.name)
+def test_every_format_is_reachable(detector):
+    """A column made of the format's values is tagged with the detector's tag (nothing outranks it)."""
+    column = COLUMNS.get(detector.name)
+    for value in SAMPLES[detector.name]:
+        assert detector in detector_registry.matches(value, column)
+        assert detector_registry.best([value], [10], column) == (detector.tag, 1.0)
+
+def test_phone_column_stays_phone():
+    # 10-11 digit phone numbers sometimes pass a national ID check; Phone still scores highest
+    values = [f"{n:010d}" for n in range(2125550000, 2125551000)] + [f"1{n:010d}" for n in range(2125550000, 2125551000)]
+    tag, score = detector_registry.best(values, [1] * len(values))
+    assert (tag, score) == ("PII.Contact.Phone", 1.0)
+
+def test_passport_needs_a_passport_column():
+    employee_ids = [f"E{n}" for n in range(1000000, 1000100)]
+    assert detector_registry.best(employee_ids, [1] * len(employee_ids), "employee_id") == (None, 0.0)
+    assert detector_registry.best(employee_ids, [1] * len(employee_ids), "Passport Number")[0] == "PII.Sensitive.Passport"
+
+def test_check_characters():
+    assert codice_fiscale_valid("RSSMRA85T10A562S")
+    assert not codice_fiscale_valid("RSSMRA85T10A562T")
+    assert codice_fiscale_valid("RSSMRA85T10A56NH") # omocodia: trailing digit replaced by a letter
+    assert curp_valid("HEGG560427MVZRRL04")
+    assert not curp_valid("HEGG560427MVZRRL05")
+
+def test_national_ids_are_validated():
+    unvalidated = {name for name, _, validator in NATIONAL_IDS if validator is None}
+    assert unvalidated == {"US ITIN"} # no check digit exists
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("tokenizers")
+
+from app.core.embeddings import OnnxEmbeddingBackend, canonical_backend_name
+
+TEXTS = ["customer email address", "Customer: Alice, City: Berlin, IBAN: DE89370400440532013000", "x"]
+
+def _backend(quantized):
+    try:
+        return OnnxEmbeddingBackend(quantized=quantized)
+    except (ImportError, OSError) as e:
+        # First use exports the model, which needs torch/transformers and the HF weights
+        pytest.skip(f"ONNX model not available: {e}")
+
+@pytest.fixture(scope="module")
+def fp32():
+    return _backend(False)
+
+@pytest.fixture(scope="module")
+def int8():
+    return _backend(True)
+
+def test_embedding_shape_and_norm(fp32):
+    vectors = fp32.embed(TEXTS)
+    assert vectors.shape == (len(TEXTS), 384)
+    assert vectors.dtype == np.float32
+    assert np.allclose(np.linalg.norm(vectors, axis=1), 1.0, atol=1e-5)
+    assert fp32.embed([]).shape == (0, 0)
+
+def test_batching_does_not_change_vectors(fp32):
+    # Padding to the longest text in the batch must not leak into mean pooling
+    batched = fp32.embed(TEXTS)
+    single = np.vstack([fp32.embed([text]) for text in TEXTS])
+    assert np.allclose(batched, single, atol=1e-5)
+
+def test_int8_parity(fp32, int8):
+    cosine = np.sum(fp32.embed(TEXTS) * int8.embed(TEXTS), axis=1)
+    assert cosine.min() > 0.95
+
+def test_sentence_transformers_parity(fp32):
+    pytest.importorskip("sentence_transformers")
+    from app.core.embeddings import SentenceTransformerBackend
+    cosine = np.sum(fp32.embed(TEXTS) * SentenceTransformerBackend().embed(TEXTS), axis=1)
+    assert cosine.min() > 0.999
+
+def test_canonical_backend_name():
+    assert canonical_backend_name("ONNX_INT8") == "onnx-int8"
+    assert canonical_backend_name("torch") == "sentence-transformers"
+    with pytest.raises(ValueError):
+        canonical_backend_name("tensorflow")
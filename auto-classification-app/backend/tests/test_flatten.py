@@ -0,0 +1,55 @@
+import io
+
+import pytest
+import yaml
+
+from app.core.flatten import YamlRecordStream, read_yaml_records
+
+ANCHORS = """
+defaults: &defaults
+  country: DE
+  tier: basic
+contact: &contact
+  tier: gold
+  email: ops@example.com
+customers:
+  - name: Ann
+    <<: *defaults
+  - <<: [*contact, *defaults]
+    name: Bob
+  - name: Cy
+    tier: platinum
+    <<: [*defaults, *contact]
+  - &dee
+    name: Dee
+    address: {city: Berlin, <<: *defaults}
+  - <<: *dee
+    name: Eve
+  - name: Fay
+    aliases: [&f fay, *f]
+"""
+
+def test_records_match_safe_load():
+    expected = yaml.safe_load(ANCHORS)
+    stream = YamlRecordStream(io.StringIO(ANCHORS))
+    assert list(stream) == expected["customers"]
+    assert stream.found
+    # Records are yielded, not kept: the rest of the document is
+    assert stream.document == {**expected, "customers": []}
+
+@pytest.mark.parametrize("record_path", ["", "customers.item"])
+def test_merge_precedence(record_path):
+    df = read_yaml_records(io.StringIO(ANCHORS), record_path).set_index("name")
+    assert df.loc["Ann", "tier"] == "basic"
+    assert df.loc["Bob", "tier"] == "gold" # earlier mapping in the list wins
+    assert df.loc["Bob", "country"] == "DE"
+    assert df.loc["Cy", "tier"] == "platinum" # explicit key wins over every merged mapping
+    assert df.loc["Eve", "address.city"] == "Berlin"
+    assert df.loc["Eve", "address.tier"] == "basic"
+    assert "<<" not in df.columns
+
+def test_top_level_merge_list_is_not_a_record_array():
+    text = "base: &b {a: 1}\n<<: [*b, {c: 3}]\nrows:\n  - {x: 1}\n  - {x: 2}\n"
+    stream = YamlRecordStream(io.StringIO(text))
+    assert list(stream) == yaml.safe_load(text)["rows"]
+    assert stream.record_path == "rows.item"
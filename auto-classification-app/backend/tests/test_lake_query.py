@@ -0,0 +1,73 @@
+import threading
+
+import pandas as pd
+import pytest
+from pyarrow import fs as pafs
+
+pytest.importorskip("boto3")
+
+from app.core import lake_query
+from app.core.lake_query import LakeQueryEngine, format_aggregate_answer
+
+CUSTOMERS = pd.DataFrame({
+    "name": ["Alice", "Bob", "Cara", "Dan", "Eve"],
+    "city": ["Berlin", "Paris", "berlin", "New York", "Rome"],
+    "status": ["active", "active", "closed", "active", "closed"],
+    "amount": [10, 20, 30, 40, 50],
+})
+
+def _engine(root):
+    engine = object.__new__(LakeQueryEngine)
+    engine.fs = pafs.SubTreeFileSystem(str(root), pafs.LocalFileSystem())
+    engine._tables = None
+    engine._tables_loaded_at = 0
+    engine._datasets = {}
+    engine._value_indexes = {}
+    engine._lock = threading.Lock()
+    return engine
+
+@pytest.fixture
+def lake(tmp_path):
+    (tmp_path / "data-lake/sources/postgres/shop").mkdir(parents=True)
+    CUSTOMERS.to_parquet(tmp_path / "data-lake/sources/postgres/shop/customers.parquet")
+    (tmp_path / "raw-data").mkdir()
+    return tmp_path
+
+def test_count_with_value_filter(lake):
+    outcome = _engine(lake).answer("how many customers in berlin")
+    assert outcome["table"] == "postgres/shop/customers"
+    assert outcome["result"] == 2
+    assert "exactly **2**" in format_aggregate_answer(outcome)
+
+def test_same_named_tables_are_not_merged(lake):
+    pd.DataFrame({"name": ["Zed"], "city": ["Berlin"]}).to_parquet(lake / "raw-data/customers.parquet")
+    engine = _engine(lake)
+    assert set(engine.list_tables()) == {"postgres/shop/customers", "raw-data/customers"}
+
+    outcome = engine.answer("how many customers in berlin")
+    assert outcome["ambiguous"] == ["postgres/shop/customers", "raw-data/customers"]
+    assert "Which one do you mean?" in format_aggregate_answer(outcome)
+
+    assert engine.answer("how many postgres customers in berlin")["result"] == 2
+    assert engine.answer("how many customers in berlin in raw-data")["result"] == 1
+
+def test_unknown_value_falls_back(lake):
+    assert _engine(lake).answer("how many customers in tokyo") is None
+
+def test_values_bind_from_sample(lake, monkeypatch):
+    monkeypatch.setattr(lake_query, "LAKE_VALUE_MAX_DISTINCT", 4)
+    engine = _engine(lake)
+    assert engine.plan("how many customers in berlin")["filters"] == [("city", "berlin")]
+    index = engine._value_index("postgres/shop/customers")
+    assert "name" not in index["columns"]  # 5 distinct names > 4
+    assert index["complete"]
+    assert engine._value_index("postgres/shop/customers") is index
+    assert engine.plan("how many customers with status pending") is None
+
+def test_prompt_wording(lake):
+    engine = _engine(lake)
+    assert engine.answer("How many customers live in Berlin?")["result"] == 2
+    assert engine.answer("how many customers are located in new york")["filters"] == [("city", "new york")]
+    assert engine.answer("how many customers with city new york")["result"] == 1
+    assert engine.answer("How many customers.")["result"] == 5
+    assert engine.answer("how many customers older than 35") is None
@@ -0,0 +1,28 @@
+import json
+
+import pandas as pd
+import pyarrow as pa
+
+from app.core.profiler import profile_column, profile_dataset, _distinct_count
+
+def test_list_column():
+    profile = profile_column("tags", pd.Series([["x", "y"], ["x", "y"], None, ["z"]]))
+    assert profile.null_count == 1
+    assert profile.distinct_count == 2
+    assert profile.samples[:2] == ["['x', 'y']", "['x', 'y']"]
+
+def test_struct_column():
+    profile = profile_column("address", pd.Series([{"city": "Berlin"}, {"city": "Oslo"}, {"city": "Berlin"}]))
+    assert profile.distinct_count == 2
+
+def test_distinct_count_on_nested_arrow():
+    assert _distinct_count(pa.array([[1, 2], [1, 2], [3], None])) == 2
+    assert _distinct_count(pa.array([{"a": 1}, {"a": 2}, {"a": 1}])) == 2
+
+def test_json_upload_with_nested_fields(tmp_path):
+    path = tmp_path / "customers.json"
+    path.write_text(json.dumps([{"name": "Ann", "tags": ["x", "y"], "meta": {"k": [1]}},
+                                {"name": "Bob", "tags": [], "meta": {"k": [2]}}]))
+    profile, df = profile_dataset(str(path))
+    assert profile["row_count"] == 2
+    assert {c.name: c.distinct_count for c in profile["columns"]}["tags"] == 2
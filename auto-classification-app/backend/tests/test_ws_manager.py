@@ -0,0 +1,37 @@
+import asyncio
+
+from app.core.ws_manager import Subscriber
+
+class StalledSocket:
+    """Never finishes sending, so everything pushed stays in the outbox."""
+
+    async def send_text(self, text):
+        await asyncio.Event().wait()
+
+def _outbox_after(messages, max_queue=3):
+    async def run():
+        subscriber = Subscriber(StalledSocket(), max_queue=max_queue)
+        await asyncio.sleep(0)
+        for step, status in messages:
+            subscriber.push({"step": step, "status": status, "data": None})
+        outbox = [(m["step"], m["status"]) for m in subscriber.outbox]
+        subscriber.close()
+        return outbox, subscriber.dropped
+    return asyncio.run(run())
+
+def test_progress_is_coalesced_per_step():
+    outbox, dropped = _outbox_after([("a", "processing"), ("a", "processing"), ("b", "processing")])
+    assert outbox == [("a", "processing"), ("b", "processing")]
+    assert dropped == 0
+
+def test_final_messages_evict_oldest_non_final():
+    outbox, dropped = _outbox_after([
+        ("w1", "warning"), ("p", "processing"), ("w2", "warning"),
+        ("done", "complete"), ("failed", "error"), ("late", "warning"),
+    ])
+    assert outbox == [("done", "complete"), ("failed", "error"), ("late", "warning")]
+    assert dropped == 3
+
+def test_outbox_never_exceeds_bound():
+    outbox, _ = _outbox_after([(f"s{i}", "complete") for i in range(10)])
+    assert outbox == [("s7", "complete"), ("s8", "complete"), ("s9", "complete")]